@@ -59,6 +59,11 @@ setup(
     package_dir={'sleepwalker': 'sleepwalker'},
     scripts=[
     ],
+    entry_points={
+        'console_scripts': [
+            'sleepwalker-codegen = sleepwalker.codegen:main',
+        ],
+    },
     include_package_data=True,
 
     install_requires=install_requires,
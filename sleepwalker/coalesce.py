@@ -0,0 +1,147 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements coalescing of pushes, which merges the pushes
+of a resource made within a short window into a single request.
+
+Coalescing is opted into per resource with
+`Service.add_coalescing()`, or per DataRep with `DataRep.coalesce()`,
+which takes precedence:
+
+   >>> service.add_coalescing('book', 0.05)
+   >>> book = service.bind('book', id=1)
+   >>> book['title'].push('New title')     # from one thread
+   >>> book['pages'].push(250)             # from another, within 50 ms
+
+The first `push()` of a resource opens a window of `window` seconds.
+Pushes of the same root DataRep from any thread within the window
+join it, and the latest data is pushed in one ``PUT`` when the window
+closes, by a timer or by the first push after it closes, whichever
+comes first.  `flush()` pushes pending data at once.
+
+Each push waits for the request of its window, and then returns, or
+raises the exception of the request if it fails, as do all other
+pushes of the window.  A push thus returns up to `window` seconds
+later than it otherwise would, and pushes made one after another from
+a single thread are not coalesced.
+
+Requests for a DataRep are sent one after the other, so that they
+reach the server in order.  The response to a request replaces the
+data only if no later push is pending or sent, so that data set for
+that push is kept.
+
+"""
+
+import time
+import threading
+
+__all__ = ['push', 'flush']
+
+# Guards the batches of all DataReps
+_lock = threading.Lock()
+
+
+class _Batch(object):
+    """ The pushes of a root DataRep within one window. """
+
+    def __init__(self, previous, deadline):
+        # Batch whose request must complete before this one is sent
+        self.previous = previous
+        self.deadline = deadline
+        self.timer = None
+        self.error = None
+        self.done = threading.Event()
+
+
+def push(dr, window):
+    """ Push root DataRep `dr` along with other pushes within `window`.
+
+    :param dr: the root DataRep, with the data to push set
+    :param window: seconds after the first pending push to send the
+        data of all
+
+    Returns `dr` once the request of the window is complete, or raises
+    its exception.
+    """
+    now = time.monotonic()
+    with _lock:
+        batch = dr._push_batch
+        if batch is None:
+            batch = dr._push_batch = _Batch(dr._push_last, now + window)
+            batch.timer = threading.Timer(window, _expire, (dr, batch))
+            batch.timer.start()
+            send = False
+        else:
+            send = now >= batch.deadline
+            if send:
+                _take(dr, batch)
+
+    if send:
+        _send(dr, batch)
+    return _wait(dr, batch)
+
+
+def flush(dr):
+    """ Push the pending data of root DataRep `dr` at once.
+
+    Returns `dr` once all requests for it are complete, or raises the
+    exception of the request pending or in progress, if it fails.
+    """
+    with _lock:
+        batch = dr._push_batch
+        if batch is not None:
+            _take(dr, batch)
+            send = True
+        else:
+            batch = dr._push_last
+            send = False
+
+    if send:
+        _send(dr, batch)
+    if batch is None or (not send and batch.done.is_set()):
+        return dr
+    return _wait(dr, batch)
+
+
+def _wait(dr, batch):
+    """ Return `dr` once `batch` is sent, or raise its exception. """
+    batch.done.wait()
+    if batch.error is not None:
+        raise batch.error
+    return dr
+
+
+def _take(dr, batch):
+    """ Make pending `batch` the last sent, with _lock held. """
+    batch.timer.cancel()
+    dr._push_batch = None
+    dr._push_last = batch
+
+
+def _expire(dr, batch):
+    """ Send `batch` at the end of its window unless already sent. """
+    with _lock:
+        if dr._push_batch is not batch:
+            return
+        _take(dr, batch)
+    _send(dr, batch)
+
+
+def _send(dr, batch):
+    if batch.previous is not None:
+        batch.previous.done.wait()
+        batch.previous = None
+    try:
+        response = dr._put()
+    except Exception as e:
+        batch.error = e
+    else:
+        with _lock:
+            if dr._push_batch is None and dr._push_last is batch:
+                # No later push is pending or sent
+                dr._data = response
+    batch.done.set()
@@ -0,0 +1,654 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module generates Python client code ahead of time from a
+`ServiceDef`, so that resource names, link paths and schemas do not
+have to be looked up every time they are used.
+
+The generated module has one class per resource.  Each class is a
+`DataRep` subclass bound through a precompiled URI builder, with a
+method for each non-standard link and generated validators for the
+schemas the resource sends and receives:
+
+.. code-block:: none
+
+   $ sleepwalker-codegen bookstore.yml -o bookstore.py
+
+.. code-block:: python
+
+   >>> import bookstore
+   >>> service = sleepwalker.mgr.find_by_name(host, 'bookstore', '1.0')
+   >>> book = bookstore.Book.bind(service, id=1)
+   >>> book.pull()
+   >>> book.purchase({'num_copies': 2})
+
+Generated objects are ordinary `DataRep` instances in every other
+respect, so fragments, relations and the standard links (`pull()`,
+`push()`, `create()` and `delete()`) work as usual.  Link methods take
+the path variables of the link as keyword arguments, which default to
+the values in the resource data or the variables the resource was
+bound with, just like `DataRep.execute()`.
+
+Path templates made only of simple ``{var}`` and form-style query
+``{?var,...}`` expressions, with variables taken from the resource
+itself, are compiled to string concatenation.  Any other link falls
+back to `DataRep.execute()`.
+
+Generated validators only return True for values that they know to be
+valid, and anything else is passed on to the reschema validator, so
+errors are reported exactly as before.  Schemas using ``allOf``,
+``anyOf``, ``oneOf`` or ``not`` are always passed on.
+
+The generated module must be regenerated when the service definition
+changes.
+
+"""
+
+import re
+import sys
+import keyword
+import argparse
+import urllib.parse
+
+from jsonpointer import JsonPointer
+import reschema.jsonschema
+from reschema.exceptions import MissingParameter
+from reschema.servicedef import ServiceDef
+
+from sleepwalker.datarep import DataRep, DictDataRep, ListDataRep, Schema
+from sleepwalker.exceptions import ServiceException
+
+__all__ = ['generate', 'Resource', 'main']
+
+
+#
+# Runtime support for generated modules
+#
+
+class _Unset(object):
+    def __repr__(self):
+        return 'UNSET'
+
+
+UNSET = _Unset()
+
+
+def quote(value):
+    """ Expand a simple URI template variable. """
+    return urllib.parse.quote(str(value), safe='')
+
+
+def query(op, pairs):
+    """ Expand a form-style query URI template expression. """
+    parts = [name + '=' + quote(value) for name, value in pairs
+             if value is not UNSET]
+    if not parts:
+        return ''
+    return op + '&'.join(parts)
+
+
+class Resource(object):
+    """ Base class of generated resource classes. """
+
+    # Set on each generated class
+    service_id = None
+    resource_name = None
+    validators = {}
+
+    # Resource schemas by <servicedef, resource name>
+    _schemas = {}
+
+    @classmethod
+    def _schema(cls, service):
+        key = (service.servicedef, cls.resource_name)
+        jsonschema = Resource._schemas.get(key)
+        if jsonschema is None:
+            if service.servicedef.id != cls.service_id:
+                raise ServiceException(
+                    '%s was generated for %s, not %s' %
+                    (cls.__name__, cls.service_id, service.servicedef.id))
+            jsonschema = service.servicedef.find_resource(cls.resource_name)
+            Resource._schemas[key] = jsonschema
+        return jsonschema
+
+    @classmethod
+    def _bind(cls, service, path, path_vars):
+        """ Return an instance for `path` relative to the service path. """
+        return cls(service, service.servicepath + path,
+                   jsonschema=cls._schema(service), path_vars=path_vars,
+                   readonly=service.readonly)
+
+    @classmethod
+    def _bind_template(cls, service, kwargs):
+        """ Return an instance by resolving the 'self' link template. """
+        datarep = Schema(service, cls._schema(service)).bind(**kwargs)
+        return cls(service, datarep.uri, jsonschema=datarep.jsonschema,
+                   path_vars=kwargs, readonly=service.readonly)
+
+    def _var(self, name, parts, required=True):
+        """ Return the value of link variable `name` from the data.
+
+        This resolves the relative pointer ``0/<parts>`` in the same
+        way as `DataRep.execute()`, against the data if it is set,
+        otherwise against the variables this resource was bound with.
+
+        """
+        if self._data in (DataRep.UNSET, DataRep.FAIL,
+                          DataRep.FRAGMENT, DataRep.DELETED):
+            data = self.path_vars
+        else:
+            data = self.data
+        try:
+            if not data:
+                raise LookupError(name)
+            for part in parts:
+                if isinstance(data, list):
+                    data = data[int(part)]
+                else:
+                    data = data[part]
+            return data
+        except (LookupError, ValueError, TypeError):
+            if not required:
+                return UNSET
+            raise MissingParameter(
+                "Missing value for link var %s of %s" % (name, self),
+                self.jsonschema)
+
+    def _validate(self, jsonschema, value):
+        check = self.validators.get(jsonschema.id)
+        if check is None or not check(value):
+            jsonschema.validate(value)
+
+
+#
+# Code generation
+#
+
+# URI template expressions that are compiled, see _Path
+_EXPRESSION_RE = re.compile(r'\{([^}]*)\}')
+_NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+_RELP_RE = re.compile(r'^0(/.*)$')
+
+
+def _identifier(name, reserved=()):
+    """ Return `name` made into a Python identifier not in `reserved`. """
+    ident = re.sub(r'\W', '_', name)
+    if not ident or ident[0].isdigit():
+        ident = '_' + ident
+    while keyword.iskeyword(ident) or ident in reserved:
+        ident += '_'
+    return ident
+
+
+def _class_name(name):
+    return ''.join(part[:1].upper() + part[1:]
+                   for part in re.split(r'[\W_]+', name) if part)
+
+
+class _Path(object):
+    """ A link path template compiled to a Python expression.
+
+    `expr` is None if the template cannot be compiled, otherwise a
+    string concatenation building the path relative to the service
+    path from the local variables named by `names`.
+
+    """
+
+    def __init__(self, path):
+        self.template = path.template
+        self.expr = None
+        self.names = []         # template vars in order
+        self.required = set()
+        self.pointers = {}      # var -> data pointer parts, or None
+
+        template = self.template
+        if not template.startswith('$'):
+            return
+        template = template[1:]
+
+        pieces = []
+        pos = 0
+        for m in _EXPRESSION_RE.finditer(template):
+            if m.start() > pos:
+                pieces.append(repr(template[pos:m.start()]))
+            pos = m.end()
+
+            expression = m.group(1)
+            op = expression[:1]
+            if op and op in '?&':
+                names = expression[1:].split(',')
+            else:
+                op = ''
+                names = [expression]
+            if not all(_NAME_RE.match(n) and not keyword.iskeyword(n)
+                       for n in names):
+                return
+
+            if op:
+                pieces.append('_query(%r, (%s,))' % (
+                    op, ', '.join('(%r, %s)' % (n, n) for n in names)))
+            else:
+                pieces.append('_quote(%s)' % names[0])
+                self.required.add(names[0])
+            self.names.extend(names)
+        if pos < len(template):
+            pieces.append(repr(template[pos:]))
+
+        if len(set(self.names)) != len(self.names):
+            return
+        if set(self.names) & set(['self', 'cls', 'service', '_data']):
+            return
+
+        for name in self.names:
+            relp = path.vars.get(name)
+            if relp is None:
+                self.pointers[name] = None
+                continue
+            m = _RELP_RE.match(relp)
+            if not m:
+                # Only pointers relative to the resource itself
+                return
+            self.pointers[name] = JsonPointer(m.group(1)).parts
+
+        self.expr = ' + '.join(pieces) if pieces else "''"
+
+    def signature(self):
+        """ Return the keyword-only parameters for the template vars. """
+        return ', '.join('%s=_UNSET' % n for n in self.names)
+
+
+class _Validators(object):
+    """ Writes validator functions for schemas. """
+
+    def __init__(self):
+        self.names = {}     # schema -> function name
+        self.leaves = {}    # expression -> function name
+        self.regexes = {}   # pattern -> module-level name
+        self.functions = []
+        self.count = 0
+
+    def function(self, js):
+        """ Return the name of the validator function for `js`. """
+        js = self._resolve(js)
+        name = self.names.get(js)
+        if name is not None:
+            return name
+
+        if isinstance(js, (reschema.jsonschema.Object,
+                           reschema.jsonschema.Array)):
+            expr = None
+        else:
+            # Functions for simple types are shared
+            expr = self.expr(js, 'v')
+            name = self.leaves.get(expr)
+            if name is not None:
+                self.names[js] = name
+                return name
+
+        # Named before the body is written, for recursive schemas
+        name = '_v%d' % self.count
+        self.count += 1
+        self.names[js] = name
+
+        if expr is not None:
+            self.leaves[expr] = name
+            body = ['return ' + expr]
+        elif self._combined(js):
+            body = ['return False']
+        elif isinstance(js, reschema.jsonschema.Object):
+            body = self._object(js)
+        else:
+            body = self._array(js)
+
+        lines = ['def %s(v):' % name,
+                 '    # %s' % js.fullname()]
+        lines.extend('    ' + line if line else '' for line in body)
+        self.functions.append('\n'.join(lines))
+        return name
+
+    def _resolve(self, js):
+        while isinstance(js, reschema.jsonschema.DynamicSchema):
+            js = js.refschema
+        return js
+
+    def _combined(self, js):
+        return bool(js.allof or js.anyof or js.oneof or
+                    js.not_ is not None)
+
+    def expr(self, js, v):
+        """ Return an expression that is True if `v` is valid. """
+        js = self._resolve(js)
+        if self._combined(js):
+            return 'False'
+
+        if isinstance(js, (reschema.jsonschema.Object,
+                           reschema.jsonschema.Array)):
+            return '%s(%s)' % (self.function(js), v)
+
+        if isinstance(js, reschema.jsonschema.Null):
+            return '%s is None' % v
+
+        if isinstance(js, reschema.jsonschema.Boolean):
+            checks = ['%s.__class__ is bool' % v]
+
+        elif isinstance(js, reschema.jsonschema.String):
+            checks = ['%s.__class__ is str' % v]
+            if js.minLength is not None:
+                checks.append('len(%s) >= %d' % (v, js.minLength))
+            if js.maxLength is not None:
+                checks.append('len(%s) <= %d' % (v, js.maxLength))
+            if js.pattern is not None:
+                checks.append('%s.match(%s) is not None' %
+                              (self._regex(js.pattern), v))
+
+        elif isinstance(js, reschema.jsonschema.Integer):
+            checks = ['%s.__class__ is int' % v]
+            checks.extend(self._range(js, v))
+
+        elif isinstance(js, reschema.jsonschema.NumberOrInteger):
+            checks = ['(%s.__class__ is float or %s.__class__ is int)' %
+                      (v, v)]
+            checks.extend(self._range(js, v))
+
+        elif isinstance(js, (reschema.jsonschema.Timestamp,
+                             reschema.jsonschema.TimestampHP)):
+            return '(%s.__class__ is float or %s.__class__ is int)' % (v, v)
+
+        elif isinstance(js, (reschema.jsonschema.Data,
+                             reschema.jsonschema.Multi)):
+            # Anything goes, combinations were checked above
+            return 'True'
+
+        else:
+            return 'False'
+
+        if getattr(js, 'enum', None) is not None:
+            checks.append('%s in %r' % (v, list(js.enum)))
+        return ' and '.join(checks)
+
+    def _range(self, js, v):
+        checks = []
+        if js.minimum is not None:
+            checks.append('%s %s %r' % (v, '>' if js.exclusiveMinimum
+                                        else '>=', js.minimum))
+        if js.maximum is not None:
+            checks.append('%s %s %r' % (v, '<' if js.exclusiveMaximum
+                                        else '<=', js.maximum))
+        return checks
+
+    def _regex(self, pattern):
+        name = self.regexes.get(pattern)
+        if name is None:
+            name = '_r%d' % len(self.regexes)
+            self.regexes[pattern] = name
+        return name
+
+    def _object(self, js):
+        lines = ['if v.__class__ is not dict:',
+                 '    return False']
+        ap = js.additional_properties
+        count = ap is not False and self.expr(ap, 'x') != 'True'
+        if ap is False or count:
+            lines.append('n = 0')
+        for prop, pjs in js.properties.items():
+            check = self.expr(pjs, 'x')
+            if ap is False or count:
+                lines.append('x = v.get(%r, _UNSET)' % prop)
+                lines.append('if x is not _UNSET:')
+                if check != 'True':
+                    lines.append('    if not (%s):' % check)
+                    lines.append('        return False')
+                lines.append('    n += 1')
+            elif check != 'True':
+                lines.append('x = v.get(%r, _UNSET)' % prop)
+                lines.append('if x is not _UNSET and not (%s):' % check)
+                lines.append('    return False')
+
+        if ap is False:
+            lines.append('if n != len(v):')
+            lines.append('    return False')
+        elif count:
+            lines.append('if n != len(v):')
+            lines.append('    for k, x in v.items():')
+            lines.append('        if k not in %r and not (%s):' %
+                         (set(js.properties.keys()), self.expr(ap, 'x')))
+            lines.append('            return False')
+
+        for prop in (js.required or []):
+            lines.append('if %r not in v:' % prop)
+            lines.append('    return False')
+        lines.append('return True')
+        return lines
+
+    def _array(self, js):
+        lines = ['if v.__class__ is not list:',
+                 '    return False']
+        if js.minItems is not None:
+            lines.append('if len(v) < %d:' % js.minItems)
+            lines.append('    return False')
+        if js.maxItems is not None:
+            lines.append('if len(v) > %d:' % js.maxItems)
+            lines.append('    return False')
+        check = self.expr(js.items, 'x')
+        if check != 'True':
+            lines.append('for x in v:')
+            lines.append('    if not (%s):' % check)
+            lines.append('        return False')
+        lines.append('return True')
+        return lines
+
+    def source(self):
+        blocks = []
+        if self.regexes:
+            blocks.append('\n'.join('%s = _re.compile(%r)' % (name, pattern)
+                                    for pattern, name
+                                    in self.regexes.items()))
+        blocks.extend(self.functions)
+        return '\n\n\n'.join(blocks)
+
+
+# Standard links, these are accessed through DataRep methods
+_STANDARD_LINKS = ('self', 'get', 'set', 'create', 'delete')
+
+
+class _Generator(object):
+
+    def __init__(self, servicedef):
+        self.servicedef = servicedef
+        self.validators = _Validators()
+        self.validator_ids = {}     # schema id -> function name
+        self.classes = []           # (resource name, class name, source)
+
+    def _validator(self, js):
+        if js is None:
+            return
+        name = self.validators.function(js)
+        self.validator_ids.setdefault(js.id, name)
+
+    def resource(self, name, js):
+        if isinstance(js, reschema.jsonschema.DynamicSchema):
+            js = js.refschema
+
+        if isinstance(js, reschema.jsonschema.Object):
+            base = '_DictDataRep'
+        elif isinstance(js, reschema.jsonschema.Array):
+            base = '_ListDataRep'
+        else:
+            base = '_DataRep'
+
+        reserved = set(dir(DictDataRep)) | set(dir(ListDataRep))
+        reserved |= set(dir(Resource))
+        taken = set(c for _, c, _ in self.classes)
+        class_name = _identifier(_class_name(name) or name, taken)
+
+        lines = ['class %s(_Resource, %s):' % (class_name, base)]
+        description = (js.description or '').strip()
+        lines.append('    """ %s """' % (
+            description.splitlines()[0].replace('"""', "'''")
+            if description else "Resource '%s'." % name))
+        lines.append('')
+        lines.append('    resource_name = %r' % name)
+        lines.append('    service_id = SERVICE_ID')
+        lines.append('    validators = VALIDATORS')
+
+        self._validator(js)
+        if 'self' in js.links:
+            lines.append('')
+            lines.extend('    ' + line if line else ''
+                         for line in self._bind(js.links['self']))
+
+        for link_name, link in js.links.items():
+            if link_name == 'self':
+                continue
+            self._validator(link.request)
+            self._validator(link.response)
+            if link_name in _STANDARD_LINKS:
+                continue
+            method = _identifier(link_name, reserved)
+            reserved.add(method)
+            lines.append('')
+            lines.extend('    ' + line if line else ''
+                         for line in self._link(method, link_name, link))
+
+        self.classes.append((name, class_name, '\n'.join(lines)))
+
+    def _bind(self, selflink):
+        path = _Path(selflink.path)
+        lines = ['@classmethod']
+        if path.expr is None:
+            lines.append('def bind(cls, service, **kwargs):')
+            lines.append('    """ Return an instance for %s """' %
+                         path.template)
+            lines.append('    return cls._bind_template(service, kwargs)')
+            return lines
+
+        lines.append('def bind(cls, service%s):' % (
+            ', *, ' + ', '.join(n if n in path.required else n + '=_UNSET'
+                                for n in path.names)
+            if path.names else ''))
+        lines.append('    """ Return an instance for %s """' % path.template)
+        if path.names:
+            lines.append('    path_vars = {%s}' % ', '.join(
+                '%r: %s' % (n, n) for n in path.names))
+            optional = [n for n in path.names if n not in path.required]
+            if optional:
+                lines.append('    for k in %r:' % (tuple(optional),))
+                lines.append('        if path_vars[k] is _UNSET:')
+                lines.append('            del path_vars[k]')
+        else:
+            lines.append('    path_vars = {}')
+        lines.append('    return cls._bind(service, %s, path_vars)' %
+                     path.expr)
+        return lines
+
+    def _link(self, method, name, link):
+        doc = '    """ Execute link %r: %s %s """' % (
+            name, link.method, link.path.template if link.path else '')
+        path = _Path(link.path) if link.path is not None else None
+        if path is None or path.expr is None:
+            return ['def %s(self, _data=None, **kwargs):' % method,
+                    doc,
+                    '    return self.execute(%r, _data, **kwargs)' % name]
+
+        lines = ['def %s(self, _data=None%s):' % (
+            method, ', *, ' + path.signature() if path.names else ''),
+            doc]
+        for n in path.names:
+            parts = path.pointers[n]
+            if parts is None:
+                # Only from arguments, as for DataRep.execute()
+                if n in path.required:
+                    lines.append('    if %s is _UNSET:' % n)
+                    lines.append('        raise _MissingParameter('
+                                 '"Missing value for link var %s of %%s" '
+                                 '%% self, self.jsonschema)' % n)
+                continue
+            lines.append('    if %s is _UNSET:' % n)
+            lines.append('        %s = self._var(%r, %r%s)' % (
+                n, n, tuple(parts),
+                '' if n in path.required else ', required=False'))
+        lines.append('    return self._execute_link(')
+        lines.append('        self.links[%r],' % name)
+        lines.append('        self.service.servicepath + %s, _data)' %
+                     path.expr)
+        return lines
+
+    def source(self):
+        sd = self.servicedef
+        for name, js in sd.resources.items():
+            self.resource(name, js)
+
+        header = [
+            '"""',
+            "Client classes for the '%s' service, version %s." %
+            (sd.name, sd.version),
+            '',
+            'Generated by sleepwalker.codegen from %s, do not edit.' % sd.id,
+            '"""',
+            '',
+            'import re as _re',
+            '',
+            'from reschema.exceptions import '
+            'MissingParameter as _MissingParameter',
+            '',
+            'from sleepwalker.codegen import (Resource as _Resource, '
+            'UNSET as _UNSET,',
+            '                                 quote as _quote, '
+            'query as _query)',
+            'from sleepwalker.datarep import (DataRep as _DataRep, '
+            'DictDataRep as _DictDataRep,',
+            '                                 ListDataRep as _ListDataRep)',
+            '',
+            'SERVICE_ID = %r' % sd.id,
+            '',
+            '',
+            '# Validators return True for values known to be valid, any '
+            'other value',
+            '# is passed on to the schema.',
+            '',
+        ]
+        parts = ['\n'.join(header),
+                 self.validators.source(),
+                 '\n\nVALIDATORS = {\n%s}' % ''.join(
+                     '    %r: %s,\n' % item
+                     for item in sorted(self.validator_ids.items()))]
+        for _, _, source in self.classes:
+            parts.append('\n\n' + source)
+        parts.append('\n\nRESOURCES = {\n%s}\n' % ''.join(
+            '    %r: %s,\n' % (name, class_name)
+            for name, class_name, _ in self.classes))
+        return '\n'.join(parts)
+
+
+def generate(servicedef):
+    """ Return the source of a client module for `servicedef`.
+
+    :param servicedef: a `reschema.servicedef.ServiceDef`
+
+    """
+    return _Generator(servicedef).source()
+
+
+def main(argv=None):
+    """ Command line entry point, see ``sleepwalker-codegen --help``. """
+    parser = argparse.ArgumentParser(
+        prog='sleepwalker-codegen',
+        description='Generate a Python client module from a service '
+                    'definition.')
+    parser.add_argument('servicedef',
+                        help='service definition file, YAML or JSON')
+    parser.add_argument('-o', '--output',
+                        help='file to write, by default standard output')
+    args = parser.parse_args(argv)
+
+    source = generate(ServiceDef.create_from_file(args.servicedef))
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(source)
+    else:
+        sys.stdout.write(source)
+    return 0
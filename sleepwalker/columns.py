@@ -0,0 +1,168 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module converts arrays of objects, such as the items of a metrics
+`ListDataRep`, into columns of compact typed storage.
+
+Use `ListDataRep.to_columns()` for the whole array, or
+`ListDataRep.iter_columns()` to convert a very large array in chunks:
+
+   >>> samples = service.bind('samples')
+   >>> columns = samples.to_columns('timestamp', 'value')
+   >>> columns['value']
+   array('d', [0.5, 0.25, ...])
+   >>> for chunk in samples.iter_columns(100000):
+   ...     process(chunk['timestamp'], chunk['value'])
+
+The storage for each column is chosen from the item schema:
+
+* ``integer`` - `array.array` of signed 64-bit integers
+* ``number`` - `array.array` of doubles
+* ``string`` - list of interned strings
+* anything else - list of values
+
+If NumPy is installed, integer and number columns are returned as
+NumPy arrays instead, unless ``numpy=False`` is passed.  If a value in
+a typed column is missing, null, a boolean or does not fit the type,
+that column falls back to a list of values so that no data is lost.
+
+"""
+
+import sys
+import array
+import itertools
+
+from jsonpointer import JsonPointer
+import reschema.jsonschema
+
+from sleepwalker.records import OBJECT_TYPES
+
+try:
+    import numpy as _numpy
+except ImportError:
+    _numpy = None
+
+__all__ = ['ColumnBuilder']
+
+
+class ColumnBuilder(object):
+    """ Converts items into columns of typed storage.
+
+    Each column is extracted with one comprehension over the items,
+    which in CPython is considerably faster than appending to every
+    column while walking the items once.
+    """
+
+    # array.array typecodes and NumPy dtypes by schema type
+    TYPECODES = {'integer': 'q', 'number': 'd'}
+    DTYPES = {'q': 'int64', 'd': 'float64'}
+
+    def __init__(self, item_schema, keys=None, numpy=None):
+        """ Create a builder for items described by `item_schema`.
+
+        :param item_schema: json-schema of each item
+        :param keys: property names or item-relative JSON pointers of
+            the columns to build, by default all properties of the
+            item schema
+        :param numpy: return NumPy arrays for numeric columns; by
+            default this is done when NumPy is installed
+        """
+        if isinstance(item_schema, reschema.jsonschema.DynamicSchema):
+            item_schema = item_schema.refschema
+
+        if not keys:
+            properties = getattr(item_schema, 'properties', None)
+            if not properties:
+                raise ValueError('Column keys are required for items '
+                                 'without declared properties')
+            keys = list(properties.keys())
+
+        if numpy is None:
+            numpy = _numpy is not None
+        elif numpy and _numpy is None:
+            raise ImportError('NumPy is not installed')
+        self.numpy = numpy
+
+        self.keys = list(keys)
+        self.types = [self._type_of(item_schema, key) for key in self.keys]
+        self._parts = [JsonPointer(key).parts if key.startswith('/')
+                       else None for key in self.keys]
+
+    def _type_of(self, item_schema, key):
+        try:
+            js = item_schema.by_pointer(key if key.startswith('/')
+                                        else '/' + key)
+        except Exception:
+            return None
+        if isinstance(js, reschema.jsonschema.DynamicSchema):
+            js = js.refschema
+        return getattr(js, 'typestr', None)
+
+    def _get(self, item, key, parts):
+        """ Return the value of `key` in `item`, None if missing. """
+        if parts is None:
+            if isinstance(item, OBJECT_TYPES):
+                return item.get(key)
+            return None
+        for part in parts:
+            if isinstance(item, OBJECT_TYPES):
+                item = item.get(part)
+            elif isinstance(item, list):
+                try:
+                    item = item[int(part)]
+                except (ValueError, IndexError):
+                    return None
+            else:
+                return None
+        return item
+
+    def _column(self, items, key, parts, typestr):
+        if parts is None:
+            try:
+                values = [item.get(key) for item in items]
+            except AttributeError:
+                # Not all items are objects
+                values = [self._get(item, key, None) for item in items]
+        else:
+            values = [self._get(item, key, parts) for item in items]
+
+        if typestr == 'string':
+            intern = sys.intern
+            values = [intern(v) if v.__class__ is str else v for v in values]
+
+        typecode = self.TYPECODES.get(typestr)
+        if typecode:
+            if bool in set(map(type, values)):
+                # array.array takes True and False as 1 and 0, but JSON
+                # booleans are not numbers
+                return values
+            try:
+                column = array.array(typecode, values)
+            except (TypeError, OverflowError):
+                # Does not fit the typed array, keep values as is
+                return values
+            if self.numpy:
+                return _numpy.frombuffer(column, dtype=self.DTYPES[typecode])
+            return column
+        return values
+
+    def build(self, items):
+        """ Return a dict of columns by key for a sequence of items. """
+        if not isinstance(items, (list, tuple)):
+            items = list(items)
+        return dict((key, self._column(items, key, parts, typestr))
+                    for key, parts, typestr in zip(self.keys, self._parts,
+                                                   self.types))
+
+    def iter_build(self, items, chunk_size):
+        """ Yield dicts of columns for successive chunks of `items`. """
+        items = iter(items)
+        while True:
+            chunk = list(itertools.islice(items, chunk_size))
+            if not chunk:
+                return
+            yield self.build(chunk)
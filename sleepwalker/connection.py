@@ -24,6 +24,8 @@ import urllib.parse
 import logging
 import requests
 import requests.exceptions
+import threading
+import collections
 from requests.adapters import HTTPAdapter
 from requests.structures import CaseInsensitiveDict
 from requests.packages.urllib3.util import parse_url
@@ -31,9 +33,19 @@ from requests.packages.urllib3.poolmanager import PoolManager
 from collections.abc import Iterable
 
 from sleepwalker.exceptions import URLError, HTTPError, ConnectionError
+from sleepwalker.lazyjson import LazyJson
+from sleepwalker import spill
 
 logger = logging.getLogger(__name__)
 
+JsonResult = collections.namedtuple('JsonResult', 'data status_code headers')
+JsonResult.__doc__ = """ The decoded data of a response with its status
+and headers, as returned by JSON requests with result=True.
+
+Unlike `Connection.response`, which is the last response of any
+request on the connection, a result belongs to its own request.
+"""
+
 
 class SSLAdapter(HTTPAdapter):
     """ An HTTPS Transport Adapter that uses an arbitrary SSL version. """
@@ -147,8 +159,19 @@ class ConnectionManager(object):
 class Connection(object):
 
     """ Handle authentication and communication to remote machines. """
+
+    # Headers set on every JSON request
+    JSON_HEADERS = {'Content-Type': 'application/json',
+                    'Accept': 'application/json'}
+
+    # JSON requests accept lazy=True to return responses undecoded
+    LAZY_JSON = True
+
+    # JSON requests accept result=True to return a JsonResult
+    JSON_RESULTS = True
+
     def __init__(self, hostname, auth=None, port=None, verify=True,
-                 timeout=None):
+                 timeout=None, intern=None, spill_threshold=None):
         """ Initialize new connection and setup authentication
 
             `hostname` - include protocol, e.g. 'https://host.com'
@@ -157,6 +180,11 @@ class Connection(object):
             `verify` - require SSL certificate validation.
             `timeout` - float connection timeout in seconds, or tuple
                         (connect timeout, read timeout)
+            `intern` - optional `sleepwalker.interning.InternTable`
+                       to share the object keys of JSON responses
+            `spill_threshold` - optional size in bytes above which
+                       responses requested with lazy=True are kept
+                       in a temporary file, see sleepwalker.spill
 
             Authentication:
             For simple basic auth, passing a tuple of (user, pass) is
@@ -194,12 +222,18 @@ class Connection(object):
             self.timeout = float(timeout) / 2.0
 
         self.hostname = hostname
+        self.intern = intern
+        self.spill_threshold = spill_threshold
         self._ssladapter = False
 
         self.conn = requests.session()
         self.conn.auth = auth
         self.conn.verify = verify
 
+        # Serializes requests on the session from concurrent threads,
+        # such as the prefetch of sleepwalker.paging
+        self._lock = threading.RLock()
+
         # store last full response
         self.response = None
 
@@ -209,27 +243,47 @@ class Connection(object):
         return urllib.parse.urljoin(self.hostname, uri)
 
     def _request(self, method, uri, body=None, params=None,
-                 extra_headers=None):
+                 extra_headers=None, stream=False):
         p = parse_url(uri)
         if not p.host:
             uri = self.get_url(uri)
 
+        return self._send(method, uri, body, params, extra_headers, stream)
+
+    def _send(self, method, url, body=None, params=None, headers=None,
+              stream=False):
+        """ Issue a request to a fully qualified `url`.
+
+        If `stream` is True, the response content is only read when
+        accessed, see `requests.Response.iter_content()`.
+
+        Requests may be issued from any thread, and are sent one at a
+        time.
+        """
+        with self._lock:
+            return self._send_locked(method, url, body, params, headers,
+                                     stream)
+
+    def _send_locked(self, method, url, body, params, headers, stream):
+        kwargs = {'stream': True} if stream else {}
         try:
-            r = self.conn.request(method, uri, data=body, params=params,
-                                  headers=extra_headers, timeout=self.timeout)
+            r = self.conn.request(method, url, data=body, params=params,
+                                  headers=headers, timeout=self.timeout,
+                                  **kwargs)
         except (requests.exceptions.SSLError,
                 requests.exceptions.ConnectionError) as e:
             if self._ssladapter:
                 # If we've already applied an adapter, this is another problem
                 # Raise the corresponding sleepwaker exception.
                 raise ConnectionError("Could not connect to uri %s: %s",
-                                      uri, e)
+                                      url, e)
 
             # Otherwise, mount adapter and retry the request
             self.conn.mount('https://', SSLAdapter(ssl.PROTOCOL_TLSv1))
             self._ssladapter = True
-            r = self.conn.request(method, uri, data=body, params=params,
-                                  headers=extra_headers, timeout=self.timeout)
+            r = self.conn.request(method, url, data=body, params=params,
+                                  headers=headers, timeout=self.timeout,
+                                  **kwargs)
 
         self.response = r
 
@@ -252,19 +306,84 @@ class Connection(object):
             return res
 
     def json_request(self, method, uri, body=None, params=None,
-                     extra_headers=None):
-        """ Send a JSON request and receive JSON response. """
+                     extra_headers=None, lazy=False, result=False):
+        """ Send a JSON request and receive JSON response.
+
+        If `lazy` is True, the response is returned undecoded as a
+        `sleepwalker.lazyjson.LazyJson`.
+
+        If `result` is True, a `JsonResult` is returned holding the
+        response along with its status code and headers.
+        """
         if extra_headers:
             extra_headers = CaseInsensitiveDict(extra_headers)
         else:
             extra_headers = CaseInsensitiveDict()
-        extra_headers['Content-Type'] = 'application/json'
-        extra_headers['Accept'] = 'application/json'
+        extra_headers.update(self.JSON_HEADERS)
+        if body is not None:
+            body = json.dumps(body, cls=self.JsonEncoder)
+        r = self._request(method, uri, body, params, extra_headers,
+                          stream=self._spilling(lazy))
+        if result:
+            return JsonResult(self._json_response(r, lazy), r.status_code,
+                              r.headers)
+        return self._json_response(r, lazy)
+
+    def prepared_json_request(self, method, url, body=None, params=None,
+                              headers=None, lazy=False, result=False):
+        """ Send a JSON request with no per-request URL or header handling.
+
+        This is the fast path for callers that have precomputed the
+        request: `url` must be fully qualified and `headers` must
+        already include `JSON_HEADERS`.  The `headers` object is
+        not modified and may be shared across requests.
+
+        """
         if body is not None:
             body = json.dumps(body, cls=self.JsonEncoder)
-        r = self._request(method, uri, body, params, extra_headers)
-        if r.status_code == 204 or len(r.content) == 0:
+        r = self._send(method, url, body, params, headers,
+                       stream=self._spilling(lazy))
+        if result:
+            return JsonResult(self._json_response(r, lazy), r.status_code,
+                              r.headers)
+        return self._json_response(r, lazy)
+
+    def stream_request(self, uri, headers=None):
+        """ Open a streaming GET request and return the response.
+
+        The response content is read as it arrives, see
+        sleepwalker.events.  Unlike other requests, the response is
+        not kept as `self.response`, since it stays open while other
+        requests are issued.  Only opening the request takes the lock
+        of the connection, as reading the content does not use the
+        session.
+        """
+        p = parse_url(uri)
+        if not p.host:
+            uri = self.get_url(uri)
+        with self._lock:
+            r = self.conn.request('GET', uri, headers=headers, stream=True,
+                                  timeout=self.timeout)
+        if not r.ok:
+            HTTPError.raise_by_status(r)
+        return r
+
+    def _spilling(self, lazy):
+        # Responses that may be spilled are streamed
+        return lazy and self.spill_threshold is not None
+
+    def _json_response(self, r, lazy=False):
+        if r.status_code == 204:
+            return None  # no data
+        if self._spilling(lazy):
+            return spill.spill(r.iter_content(spill.CHUNK_SIZE),
+                               self.spill_threshold, self.intern)
+        if len(r.content) == 0:
             return None  # no data
+        if lazy:
+            return LazyJson(r.content, self.intern)
+        if self.intern is not None:
+            return self.intern.loads(r.content)
         return r.json()
 
     def add_headers(self, headers):
@@ -235,14 +235,68 @@ fragment is created.  This fragment is still associated with the same
 URI because it is merely a piece of the data at that URI based
 on the JSON pointer following the hash mark '#'.
 
+Copy-on-write
+-------------
+
+Data that reaches several DataReps, for example by assigning the data
+of one DataRep to another, is normally shared, so that a change made
+through one is seen by all.  Setting ``COPY_ON_WRITE`` to True makes
+the data of each root DataRep a snapshot that is never changed in
+place by setting the `data` of a fragment.  Instead, the first such
+change copies just the objects and arrays on the path to the fragment,
+which the root DataRep then owns and changes in place from then on::
+
+   >>> datarep.COPY_ON_WRITE = True
+   >>> draft = bookstore.bind('book', id=1)
+   >>> draft.data = book.data
+   >>> draft['title'].data = 'Draft title'
+   >>> book.data['title']
+   'My First Book - Using Python'
+
+The cost of a change is proportional to the size of the objects and
+arrays on its path, not to the size of the data.  Copy-on-write does
+not apply to changes made directly to the objects returned by `data`,
+such as ``book.data['title'] = ...``.
+
+Revalidation
+------------
+
+A root DataRep keeps the ETag, if any, that the server returned with
+the data of the last `pull()`.  Setting ``REVALIDATE`` to True sends
+that ETag in an ``If-None-Match`` header on the next `pull()`, and if
+the server answers ``304 Not Modified`` the data is kept as it is
+rather than transferred and decoded again::
+
+   >>> datarep.REVALIDATE = True
+   >>> book.pull()     # 304 if the book is unchanged on the server
+
+The ETag is dropped once the data is replaced or changed through a
+fragment, but changes made directly to the objects returned by `data`
+cannot be told apart from the pulled data, and are kept by a pull that
+is answered with 304.  Data restored from a snapshot, see
+sleepwalker.snapshot, is always revalidated this way.
+
 """
 
+import copy
 import logging
+import weakref
 import urllib.parse
+import collections.abc
 import uritemplate
-from jsonpointer import resolve_pointer, set_pointer
+from jsonpointer import (JsonPointer, JsonPointerException,
+                         resolve_pointer, set_pointer)
 import reschema.jsonschema
-
+from reschema.exceptions import MissingParameter
+from reschema.util import uritemplate_required_variables
+
+from sleepwalker import selector, records, events, paging, sync, coalesce
+from sleepwalker.lazyjson import LazyJson
+from sleepwalker.frozen import freeze
+from sleepwalker.index import Index
+from sleepwalker.columns import ColumnBuilder
+from sleepwalker.query import Query
+from sleepwalker.watch import default_watcher
 from sleepwalker.exceptions import (MissingVariable, InvalidParameter,
                                     RelationError, FragmentError, HTTPError,
                                     DataPullError, LinkError, DataNotSetError)
@@ -252,6 +306,46 @@ logger = logging.getLogger(__name__)
 VALIDATE_REQUEST = True
 VALIDATE_RESPONSE = False
 
+# Hold JSON objects in schema-generated record classes rather than
+# dicts, see sleepwalker.records
+DECODE_RECORDS = False
+
+# Keep responses undecoded until the data is accessed, see
+# sleepwalker.lazyjson
+DECODE_LAZY = False
+
+# Copy the objects on the path of a change made through a fragment
+# rather than changing shared data in place, see "Copy-on-write" above
+COPY_ON_WRITE = False
+
+# Root DataRep owning each object copied for copy-on-write, by id
+_owners = weakref.WeakValueDictionary()
+
+# Send the ETag of the data of the last pull() with the next one, and
+# keep the data if the server answers 304 Not Modified, see
+# "Revalidation" above
+REVALIDATE = False
+
+# Root DataReps holding data with an ETag, see sleepwalker.snapshot
+_validated = weakref.WeakSet()
+
+# <ETag, undecoded data, schema id, path_vars> by URI by Service,
+# restored from a snapshot for the first pull() of each URI, see
+# sleepwalker.snapshot
+_restored = weakref.WeakKeyDictionary()
+
+
+def _readonly_kwargs(readonly):
+    # Only pass readonly when set, leaving other calls unchanged
+    return {'readonly': True} if readonly else {}
+
+
+def _lazy_kwargs():
+    # Lazy decode only applies when the response need not be validated
+    if DECODE_LAZY and not VALIDATE_RESPONSE:
+        return {'lazy': True}
+    return {}
+
 
 class Schema(object):
     """ A Schema object represents the jsonschema for a resource or type.
@@ -298,7 +392,7 @@ class Schema(object):
         s = s + ' type:' + self.jsonschema.fullname()
         return '<' + s + '>'
 
-    def bind(self, **kwargs):
+    def bind(self, _readonly=False, **kwargs):
         """ Return a DataRep object by binding variables in the 'self' link.
 
         This method is used to instantiate concreate DataRep objects
@@ -306,6 +400,8 @@ class Schema(object):
         with the jsonschema for this object.  The `**kwargs` must match
         the parameters defined in the self link, if any.
 
+        If `_readonly` is True, the DataRep is read-only, see `DataRep`.
+
         Example::
 
            >>> book_schema = Schema(bookstore, book_jsonschema)
@@ -326,7 +422,8 @@ class Schema(object):
         uri = self.service.servicepath + uri_path[1:]
         return DataRep.from_schema(self.service, uri,
                                    jsonschema=self.jsonschema,
-                                   path_vars=kwargs)
+                                   path_vars=kwargs,
+                                   **_readonly_kwargs(_readonly))
 
 
 class _DataRepValue(object):
@@ -339,6 +436,145 @@ class _DataRepValue(object):
         return "<_DataRepValue %s>" % self.label
 
 
+def _disown(value):
+    """ Stop changing `value` in place, as it is about to be shared. """
+    owner = _owners.get(id(value))
+    if (owner is not None and owner._owned is not None and
+            owner._owned.get(id(value)) is value):
+        # Objects below `value` are shared as well
+        owner._owned = None
+
+
+def _restored_validator(service, uri):
+    """ Return and forget the validator restored for `uri`, if any. """
+    entries = _restored.get(service)
+    if not entries:
+        return None
+    entry = entries.pop(uri, None)
+    return None if entry is None else entry[:2]
+
+
+def _pointer_parts(pointer):
+    """ Split a JSON pointer into its unescaped reference tokens. """
+    if not pointer:
+        return []
+    if '~' in pointer:
+        return JsonPointer(pointer).parts
+    return pointer.split('/')[1:]
+
+
+class _CompiledRelation(object):
+    """ Internal class caching the work needed to follow a relation.
+
+    Resolving a relation through `reschema` re-parses the relative
+    pointer for each var and the target 'self' template on every call.
+    None of that depends on the data, only on the relation and on the
+    depth of the fragment the relation is followed from, so it is done
+    once per <relation, fragment depth> and cached on the source
+    `Service`.  The target service is not cached, as it may depend on
+    the data or on the values passed to `DataRep.follow()`, and other
+    services are looked up through the `ServiceManager` each time.
+
+    """
+
+    def __init__(self, service, relation, depth):
+        self.relation = relation
+        self.jsonschema = relation.resource
+
+        template = self.jsonschema.links['self'].path.template
+        self.template = uritemplate.URITemplate(template)
+        self.required = uritemplate_required_variables(template)
+
+        # Each var is compiled to the number of leading fragment parts
+        # to keep and the parts to append, or None if the relative
+        # pointer goes above the root at this depth.
+        self.vars = []
+        for var, relp in (relation.vars or {}).items():
+            uplevels, _, relpath = relp.partition('/')
+            is_hash = uplevels.endswith('#')
+            uplevels = int(uplevels.rstrip('#'))
+            keep = depth - uplevels
+            if keep < 0 or (is_hash and keep == 0):
+                keep = None
+            relparts = _pointer_parts('/' + relpath) if relpath else []
+            self.vars.append((var, relp, keep, relparts, is_hash))
+
+        self._service = service
+        self._target_id = self.jsonschema.servicedef.id
+
+    @classmethod
+    def lookup(cls, service, relation, fragment):
+        """ Return the cached compiled `relation` for `fragment`. """
+        depth = fragment.count('/')
+        key = (relation, depth)
+        compiled = service._relation_cache.get(key)
+        if compiled is None:
+            compiled = cls(service, relation, depth)
+            service._relation_cache[key] = compiled
+        return compiled
+
+    def target_service(self, values):
+        """ Return the service hosting the target of this relation. """
+        service = self._service
+        target_host = values.get('$host') or service.host
+        target_instance = values.get('$instance') or service.instance
+
+        if ((service.servicedef.id == self._target_id) and
+                (service.host == target_host) and
+                (service.instance == target_instance)):
+            return service
+
+        return service.service_manager.find_by_id(
+            target_host, self._target_id, target_instance,
+            auth=service.auth)
+
+    def resolve(self, data, fragment, kvs=None):
+        """ Resolve the relation, equivalent to `Relation.resolve()`. """
+        values = dict(kvs) if kvs else {}
+        parts = None
+        for var, relp, keep, relparts, is_hash in self.vars:
+            if var in values:
+                continue
+
+            if data is None:
+                raise MissingParameter(
+                    "Missing value for relation '%s' var: %s" %
+                    (str(self.relation), var), self.relation)
+
+            if parts is None:
+                parts = _pointer_parts(fragment)
+
+            try:
+                if keep is None:
+                    raise ValueError(relp)
+                ptr = parts[:keep] + relparts
+                if is_hash:
+                    value = parent = records.walk(data, ptr[:-1])
+                    if parent is not records.MISSING:
+                        value = (int(ptr[-1]) if isinstance(parent, list)
+                                 else ptr[-1])
+                else:
+                    value = records.walk(data, ptr)
+                if value is records.MISSING:
+                    raise LookupError(relp)
+            except (LookupError, ValueError, TypeError):
+                raise MissingParameter(
+                    ("Relation %s failed to assign var %s from data "
+                     "using rel pointer %s") %
+                    (self.relation.fullname(), var, relp), self.relation)
+            values[var] = value
+
+        if not self.required.issubset(values):
+            raise MissingParameter(
+                "Missing parameters for relation '%s' path template '%s': %s" %
+                (self.relation.fullname(), self.template.uri,
+                 list(self.required.difference(values))), self.relation)
+
+        uri = self.template.expand(dict((k, str(v))
+                                        for k, v in values.items()))
+        return uri, values
+
+
 class DataRep(object):
     """ A concrete representation of a resource at a fully defined address.
 
@@ -353,6 +589,52 @@ class DataRep(object):
     DELETED = _DataRepValue('DELETED')
     FRAGMENT = _DataRepValue('FRAGMENT')
 
+    # Incremented each time the data of a root DataRep is replaced,
+    # for example by pull() or push(), so that derived state such as
+    # indexes can tell that it is stale.
+    _data_version = 0
+
+    # Indexes over the data of a root DataRep, see build_index()
+    _indexes = None
+
+    # Objects copied for copy-on-write by id, see _set_pointer()
+    _owned = None
+
+    # <ETag, data> of the last pull() if the data is unchanged since
+    _validator = None
+
+    # Token of the last ListDataRep.sync(), see sleepwalker.sync
+    _sync_token = None
+
+    # Projection recording reads of a root DataRep once pulled, and the
+    # fields of its data if pulled with a projection, see
+    # sleepwalker.projection
+    _projection = None
+    _projected = None
+
+    # Seconds to coalesce pushes of a root DataRep over, the batch of
+    # pushes pending and the last batch sent, see sleepwalker.coalesce
+    _push_window = None
+    _push_batch = None
+    _push_last = None
+
+    # True if the data is frozen and may not be changed or pushed
+    readonly = False
+
+    @property
+    def _data(self):
+        return self._data_value
+
+    @_data.setter
+    def _data(self, value):
+        if self.readonly:
+            value = freeze(value)
+        self._data_value = value
+        self._data_version += 1
+        self._owned = None
+        self._validator = None
+        self._projected = None
+
     @classmethod
     def from_schema(cls, service=None, uri=None, jsonschema=None,
                     root=None, fragment='', **kwargs):
@@ -370,6 +652,12 @@ class DataRep(object):
 
         js = jsonschema if jsonschema else root.jsonschema.by_pointer(fragment)
 
+        return cls._class_for(js)(service, uri, jsonschema=jsonschema,
+                                  root=root, fragment=fragment, **kwargs)
+
+    @staticmethod
+    def _class_for(js):
+        """ Return the DataRep class matching json-schema `js`. """
         if isinstance(js, reschema.jsonschema.DynamicSchema):
             # Handles references, merges, and potentially any future
             # indirect schema typing.
@@ -384,17 +672,14 @@ class DataRep(object):
             raise NotImplementedError
 
         if isinstance(js, reschema.jsonschema.Object):
-            return DictDataRep(service, uri, jsonschema=jsonschema,
-                               root=root, fragment=fragment, **kwargs)
+            return DictDataRep
         elif isinstance(js, reschema.jsonschema.Array):
-            return ListDataRep(service, uri, jsonschema=jsonschema,
-                               root=root, fragment=fragment, **kwargs)
-        return DataRep(service, uri, jsonschema=jsonschema,
-                       root=root, fragment=fragment, **kwargs)
+            return ListDataRep
+        return DataRep
 
     def __init__(self, service=None, uri=None, jsonschema=None,
                  fragment='', root=None,
-                 data=UNSET, path_vars=None):
+                 data=UNSET, path_vars=None, readonly=False):
         """ Creata a new DataRep object associated with the resource at `uri`.
 
         :param service: the service of which this resource is a part.
@@ -425,6 +710,13 @@ class DataRep(object):
 
         Param path_vars: optional, variables to resolve paths of links
         :type path_vars: dict
+
+        :param readonly: if True, the data is frozen as described in
+            `sleepwalker.frozen`, and `push()`, `create()` and
+            `delete()` raise LinkError.  Fragments and DataReps
+            reached via `follow()` and `execute()` are read-only as
+            well.  May not be used with `fragment`.
+        :type readonly: bool
         """
         self.uri = uri
         self.service = service
@@ -441,22 +733,21 @@ class DataRep(object):
             elif not fragment:
                 raise FragmentError("Must supply fragment with root")
 
-            if (service or uri or jsonschema or
+            if (service or uri or jsonschema or readonly or
                     data is not DataRep.UNSET):
                 raise FragmentError(
                     "'fragment' and 'root' are the only valid arguments "
                     "when instantiating a fragment.")
-            self._data = DataRep.FRAGMENT
-            self.jsonschema = root.jsonschema.by_pointer(fragment)
-            self.service = root.service
-            self.uri = root.uri
-            self.has_query_vars = root.has_query_vars
+            self._init_fragment(root, fragment,
+                                root.jsonschema.by_pointer(fragment))
+            return
 
         elif not (service and uri and jsonschema):
             raise TypeError(
                 "service, uri and jsonschema are required parameters")
         else:
             # This is a root resource, and therefore owns the data directly.
+            self.readonly = readonly
             self._data = data
             self.has_query_vars = bool(urllib.parse.urlsplit(uri).query)
 
@@ -466,9 +757,7 @@ class DataRep(object):
         # Check if the 'get' link is supported and the link response
         # matches the jsonschema
         self._getlink = True
-        if self.fragment:
-            self._getlink = self.root._getlink
-        elif 'get' in self.links:
+        if 'get' in self.links:
             l = self.links['get']
             resp = l.response
             if (not self.jsonschema.matches(resp)):
@@ -478,12 +767,15 @@ class DataRep(object):
         else:
             self._getlink = "No 'get' link for this resource"
 
+        if readonly:
+            self._setlink = self._createlink = self._deletelink = (
+                "DataRep is readonly")
+            return
+
         # Check if the 'set' link is supported and the link request and
         # response match the jsonschema
         self._setlink = True
-        if self.fragment:
-            self._setlink = self.root._setlink
-        elif 'set' in self.links:
+        if 'set' in self.links:
             l = self.links['set']
             req = l.request
             resp = l.response
@@ -497,9 +789,7 @@ class DataRep(object):
         # Check if the 'create' link is supported and the link request and
         # response match the jsonschema
         self._createlink = True
-        if self.fragment:
-            self._createlink = self.root._createlink
-        elif 'create' in self.links:
+        if 'create' in self.links:
             l = self.links['create']
             req = l.request
             resp = l.response
@@ -514,11 +804,141 @@ class DataRep(object):
 
         # Check if the 'delete' link is supported
         self._deletelink = True
-        if self.fragment:
-            self._deletelink = self.root._deletelink
-        elif 'delete' not in self.links:
+        if 'delete' not in self.links:
             self._deletelink = "No 'delete' link for this resource"
 
+    def _init_fragment(self, root, fragment, jsonschema):
+        """ Initialize this instance as a fragment of `root`.
+
+        Fragments share everything but their schema with the root, so
+        this bypasses the argument checks and link analysis of
+        `__init__` for callers that already know `jsonschema`.
+        """
+        self.uri = root.uri
+        self.service = root.service
+        self.jsonschema = jsonschema
+        self.fragment = fragment
+        self.root = root
+        self.path_vars = None
+        self.readonly = root.readonly
+        self._data = DataRep.FRAGMENT
+        self.has_query_vars = root.has_query_vars
+
+        self.relations = jsonschema.relations
+        self.links = jsonschema.links
+
+        self._getlink = root._getlink
+        self._setlink = root._setlink
+        self._createlink = root._createlink
+        self._deletelink = root._deletelink
+
+    @staticmethod
+    def _make_fragment(root, fragment, jsonschema):
+        """ Create a fragment of `root` at `fragment` with a known schema. """
+        cls = DataRep._class_for(jsonschema)
+        dr = cls.__new__(cls)
+        dr._init_fragment(root, fragment, jsonschema)
+        return dr
+
+    def at(self, pointer):
+        """ Return a fragment DataRep for a JSON pointer into the resource.
+
+        :param pointer: JSON pointer relative to the data of the root
+            resource, as yielded by `iter_raw()`.  An empty pointer
+            returns the root DataRep itself.
+        """
+        root = self if self.root is None else self.root
+        if not pointer:
+            return root
+        return DataRep._make_fragment(root, pointer,
+                                      root.jsonschema.by_pointer(pointer))
+
+    def select(self, expr):
+        """ Return an iterator of fragment DataReps matching a selector.
+
+        :param expr: selector expression, see `sleepwalker.selector`.
+            The expression is applied to the data of this DataRep.
+
+        The search runs over the raw data, and fragments are created
+        only for matching values, so links and relations may be used
+        on the results as with any other fragment.
+
+        :raises SelectorError: if `expr` is not a valid selector.
+        """
+        compiled = selector.compile(expr)
+        return (self.at(pointer)
+                for pointer, _ in compiled.find(self.data, self.fragment))
+
+    def watch(self, callback, interval=60, watcher=None, **kwargs):
+        """ Pull this DataRep periodically and call back on changes.
+
+        :param callback: called as ``callback(datarep, pointers)`` after
+            each pull that changed the data, with the JSON pointers of
+            the values that changed, relative to the root resource
+        :param interval: initial seconds between pulls, adapted to how
+            often the data changes
+        :param watcher: the `sleepwalker.watch.Watcher` to pull with,
+            by default one shared by the process
+
+        Other keyword arguments are passed to `Watcher.watch()`.
+        Returns a `sleepwalker.watch.Watch`, whose `cancel()` stops
+        watching.
+        """
+        if watcher is None:
+            watcher = default_watcher()
+        return watcher.watch(self, callback, interval, **kwargs)
+
+    def coalesce(self, window):
+        """ Coalesce the pushes of this resource within `window` seconds.
+
+        :param window: seconds after the first pending push to push
+            the data once for all, or 0 to push each at once.  This
+            overrides any window declared via `Service.add_coalescing()`.
+
+        Applies to all fragments of the root resource, see
+        sleepwalker.coalesce.
+        """
+        root = self if self.root is None else self.root
+        root._push_window = window
+
+    def flush(self):
+        """ Push the data of coalesced pushes pending, if any, at once.
+
+        Returns self once all pushes of the resource are complete, or
+        raises the exception of the push pending or in progress, if it
+        fails, see sleepwalker.coalesce.
+        """
+        root = self if self.root is None else self.root
+        coalesce.flush(root)
+        return self
+
+    def subscribe(self, callback=None, link='events'):
+        """ Apply changes pushed by the server to this DataRep.
+
+        :param callback: optional, called as ``callback(datarep,
+            event)`` after each event for this resource is applied
+        :param link: name of the link of the root resource to the
+            event stream
+
+        Returns a subscription whose `cancel()` stops applying events,
+        see sleepwalker.events.
+
+        :raises LinkError: if the root resource has no such link, or if
+            the stream of the connection is from another URI
+        """
+        root = self if self.root is None else self.root
+        if link not in root.jsonschema.links:
+            raise LinkError("%s has no link '%s'" % (root, link))
+        uri = root._resolve_path(root.jsonschema.links[link].path)
+        stream = events.stream_for(root.service, uri)
+        if callback is not None and root is not self:
+            # Hold the pointer rather than this fragment, which would
+            # keep the root alive
+            def fragment_callback(dr, event, fragment=self.fragment):
+                callback(dr.at(fragment), event)
+            return stream.subscribe(root, fragment_callback)
+        return stream.subscribe(root, callback)
+
     def __repr__(self):
         s = "DataRep '%s" % self.uri
         if self.fragment:
@@ -606,10 +1026,58 @@ class DataRep(object):
         will be the result of following the fragment (as a JSON
         pointer) from the full data representation as the full URI.
 
-        """
-        if self.fragment:
-            return resolve_pointer(self.root.data, self.fragment)
+        If a projection is declared for the resource, reading the data
+        of the root DataRep reads all fields, see sleepwalker.projection.
 
+        """
+        root = self if self.root is None else self.root
+        if root._projection is not None or root._data is DataRep.UNSET:
+            root._project(self.fragment)
+        return self._peek()
+
+    def _peek(self):
+        """ Return the data without recording a read of it. """
+        if not self.fragment:
+            return self._decoded_data()
+        lazy = self._lazy_data()
+        if lazy is not None:
+            try:
+                return lazy.decode_pointer(_pointer_parts(self.fragment))
+            except (LookupError, ValueError):
+                pass
+        return resolve_pointer(self.root._decoded_data(), self.fragment)
+
+    def _decoded_data(self):
+        """ Return the data of this root DataRep, decoded if undecoded. """
+        data = self._pulled_data()
+        if isinstance(data, LazyJson):
+            data = self._decode_lazy(data)
+        return data
+
+    def _project(self, pointer):
+        """ Record a read at `pointer` into the data of this root DataRep.
+
+        Pulls the data if unset, and pulls all fields if the data is
+        projected without the field read, see sleepwalker.projection.
+        """
+        if self._data is DataRep.UNSET:
+            if self._getlink is True:
+                # Record the read first, so that the pull requests it
+                projection = self.service.declared_projection(
+                    self.jsonschema)
+                if projection is not None:
+                    projection.record(pointer, isinstance(self, ListDataRep))
+            self._pulled_data()
+        projection = self._projection
+        if projection is None:
+            return
+        field = projection.record(pointer, isinstance(self, ListDataRep))
+        projected = self._projected
+        if projected is not None and field not in projected:
+            self._pull()
+
+    def _pulled_data(self):
+        """ Return the data of this root DataRep, pulling it if unset. """
         if self._data is DataRep.FAIL:
             raise DataPullError("Last attempt to pull failed")
 
@@ -627,6 +1095,44 @@ class DataRep(object):
 
         return self._data
 
+    def _lazy_data(self):
+        """ Return the root data if still undecoded and worth scanning.
+
+        Returns None once the data is decoded, see sleepwalker.lazyjson.
+        """
+        root = self if self.root is None else self.root
+        data = root._pulled_data()
+        if isinstance(data, LazyJson) and not data.exhausted():
+            return data
+        return None
+
+    def _lazy_length(self):
+        """ Return the length of the data if known while undecoded.
+
+        Returns None otherwise, see `sleepwalker.spill`.
+        """
+        lazy = self._lazy_data()
+        if lazy is not None:
+            try:
+                return lazy.length(_pointer_parts(self.fragment))
+            except (LookupError, ValueError):
+                pass
+        return None
+
+    def _decode_lazy(self, lazy):
+        """ Decode and keep the undecoded response `lazy`. """
+        data = lazy.decode()
+        if DECODE_RECORDS:
+            data = records.decode(self.jsonschema, data)
+        if self.readonly:
+            data = freeze(data)
+        # The data is unchanged, so bypass the setter to keep derived
+        # state such as indexes
+        self._data_value = data
+        if self._validator is not None:
+            self._validator = (self._validator[0], data)
+        return data
+
     @data.setter
     def data(self, value):
         """ Modify the data associated for this resource.
@@ -634,13 +1140,68 @@ class DataRep(object):
         Note that while a root DataRep can be set without triggering a pull,
         setting a fragment requires accessing the fragment's root.data.
         """
+        if self.readonly and self.fragment:
+            raise TypeError('DataRep is readonly')
+        if COPY_ON_WRITE:
+            _disown(value)
         if self.fragment:
-            # Access .root.data rather than ._data to ensure that
-            # we have pulled it at least once.
-            set_pointer(self.root.data, self.fragment, value)
+            if self.root._projected is not None:
+                # Complete the data so that it can be pushed
+                self.root._pull()
+            self.root._set_pointer(self.fragment, value)
+            self.root._data_changed(self.fragment)
         else:
             self._data = value
 
+    def _set_pointer(self, pointer, value):
+        """ Set the value at `pointer` in the data of this root DataRep. """
+        # Access the data rather than ._data to ensure that we have
+        # pulled it at least once.
+        data = self._decoded_data()
+        if not COPY_ON_WRITE:
+            set_pointer(data, pointer, value)
+            return
+
+        owned = self._owned
+        if owned is None:
+            owned = self._owned = {}
+        if owned.get(id(data)) is not data:
+            data = self._own(copy.copy(data))
+            # The copy holds the same data, so keep derived state
+            self._data_value = data
+
+        parts = _pointer_parts(pointer)
+        doc = data
+        try:
+            for part in parts[:-1]:
+                key = int(part) if doc.__class__ is list else part
+                child = doc[key]
+                if owned.get(id(child)) is not child:
+                    child = doc[key] = self._own(copy.copy(child))
+                doc = child
+
+            part = parts[-1]
+            if doc.__class__ is not list:
+                doc[part] = value
+            elif part == '-':
+                doc.append(value)
+            else:
+                doc[int(part)] = value
+        except (LookupError, ValueError, TypeError) as e:
+            raise JsonPointerException('Cannot set %s: %s' % (pointer, e))
+
+    def _own(self, obj):
+        self._owned[id(obj)] = obj
+        _owners[id(obj)] = self
+        return obj
+
+    def _data_changed(self, pointer):
+        """ Update derived state after the data at `pointer` was set. """
+        self._validator = None
+        if self._indexes:
+            for index in self._indexes.values():
+                index._changed(pointer)
+
     def pull(self):
         """ Update the data representation from the server.
 
@@ -650,6 +1211,10 @@ class DataRep(object):
 
         On success, the result is cached in `self.data` and `self` is returned.
 
+        If a projection is declared for the resource with
+        `Service.add_projection()`, only the fields read so far are
+        requested, see sleepwalker.projection.
+
         """
 
         if self.fragment:
@@ -659,13 +1224,56 @@ class DataRep(object):
         if self._getlink is not True:
             raise LinkError(self._getlink)
 
-        response = self._request('GET', self.uri)
+        projection = self.service.declared_projection(self.jsonschema)
+        self._projection = projection
+        if projection is not None:
+            return self._pull(projection.requested())
+        return self._pull()
+
+    def _pull(self, fields=None):
+        """ Pull the data, with only `fields` of it unless None. """
+        kwargs = _lazy_kwargs()
+        if fields is not None:
+            # The ETag of a projection does not validate full data, so
+            # projected pulls are never revalidated
+            kwargs['params'] = self._projection.params(fields)
+            validator = None
+        else:
+            validator = self._validator
+            if self._data is DataRep.UNSET and validator is None:
+                validator = _restored_validator(self.service, self.uri)
+        if validator is not None and (REVALIDATE or
+                                      self._data is DataRep.UNSET):
+            kwargs['headers'] = {'If-None-Match': validator[0]}
+
+        # The status and headers are those of this request, not the last
+        # response on the connection, which other threads may share
+        response, status_code, headers = self._request(
+            'GET', self.uri, link=self.links.get('get'), result=True,
+            **kwargs)
+
+        if 'headers' in kwargs and status_code == 304:
+            if self._data is not validator[1]:
+                self._data = validator[1]
+            self._validator = validator
+            _validated.add(self)
+            return self
 
-        if VALIDATE_RESPONSE:
-            response_schema = self.links['get'].response
-            response_schema.validate(response)
+        if VALIDATE_RESPONSE and fields is None:
+            # Projected data may lack required properties
+            self._validate(self.links['get'].response, response)
+
+        if DECODE_RECORDS and not isinstance(response, LazyJson):
+            response = records.decode(self.jsonschema, response)
 
         self._data = response
+        if fields is not None:
+            self._projected = fields
+            return self
+        etag = headers.get('ETag') if headers is not None else None
+        if etag.__class__ is str:
+            self._validator = (etag, self._data)
+            _validated.add(self)
         return self
 
     def push(self, obj=UNSET):
@@ -682,6 +1290,11 @@ class DataRep(object):
         full data representation will be pulled if necessary,
         and the full modified data will then be pushed to the server.
 
+        If pushes of the resource are coalesced, see `coalesce()`, the
+        data is pushed once along with other pushes within the window,
+        and this returns once it is, or raises the same exception as
+        the other pushes.
+
         :return: self
 
         :raises DataNotSetError: if no data exists or has been supplied
@@ -692,6 +1305,9 @@ class DataRep(object):
         :raises ValidationError: if validation was requested and the
             value to be pushed fails validation.
         """
+        if self.readonly:
+            raise LinkError(self._setlink)
+
         if self.fragment:
             if obj is not DataRep.UNSET:
                 # Set the data via the property, as this will
@@ -714,19 +1330,38 @@ class DataRep(object):
         if (not self.data_valid()):
             raise DataNotSetError("No data to push")
 
+        if self._projected is not None:
+            raise DataNotSetError("Data pulled with only fields %s" %
+                                  sorted(self._projected))
+
+        window = self._push_window
+        if window is None:
+            window = self.service.declared_coalescing(self.jsonschema)
+        if window:
+            return coalesce.push(self, window)
+
+        self._data = self._put()
+        return self
+
+    def _put(self):
+        """ Send the data via the 'set' link and return the response. """
+        body = self._decoded_data()
+        if DECODE_RECORDS:
+            body = records.encode(body)
+
         if VALIDATE_REQUEST:
-            request_schema = self.links['set'].request
-            request_schema.validate(self._data)
+            self._validate(self.links['set'].request, body)
 
-        response = self._request('PUT', self.uri, self._data)
+        response = self._request('PUT', self.uri, body,
+                                 link=self.links.get('set'),
+                                 **_lazy_kwargs())
 
         if VALIDATE_RESPONSE:
-            response_schema = self.links['set'].response
-            response_schema.validate(response)
-
-        self._data = response
+            self._validate(self.links['set'].response, response)
 
-        return self
+        if DECODE_RECORDS and not isinstance(response, LazyJson):
+            response = records.decode(self.jsonschema, response)
+        return response
 
     def full(self):
         """ Return a DataRep representing the full item for this fragment. """
@@ -760,18 +1395,24 @@ class DataRep(object):
 
         link = self.links['create']
 
+        if DECODE_RECORDS:
+            obj = records.encode(obj)
+
         if VALIDATE_REQUEST:
-            link.request.validate(obj)
+            self._validate(link.request, obj)
 
-        response = self._request('POST', self.uri, obj)
+        response = self._request('POST', self.uri, obj, link=link)
         logger.debug("create response: %s" % response)
 
         if VALIDATE_RESPONSE:
-            link.response.validate(response)
+            self._validate(link.response, response)
 
         (uri_path, values) = link.response.links['self'].path.resolve(response)
         uri = (self.service.servicepath + uri_path[1:])
 
+        if DECODE_RECORDS:
+            response = records.decode(link.response, response)
+
         return DataRep.from_schema(self.service, uri, jsonschema=link.response,
                                    data=response)
 
@@ -796,11 +1437,12 @@ class DataRep(object):
         if self._deletelink is not True:
             raise LinkError(self._deletelink)
 
-        response = self._request('DELETE', self.uri)
+        response = self._request('DELETE', self.uri,
+                                 link=self.links.get('delete'),
+                                 **_lazy_kwargs())
 
         if VALIDATE_RESPONSE:
-            response_schema = self.links['delete'].response
-            response_schema.validate(response)
+            self._validate(self.links['delete'].response, response)
 
         self._data = DataRep.DELETED
         return self
@@ -824,7 +1466,7 @@ class DataRep(object):
         # Otherwise, use path_vars to resolve path
         if root._data not in [DataRep.UNSET, DataRep.FAIL,
                               DataRep.FRAGMENT, DataRep.DELETED]:
-            data = root._data
+            data = root.data
         else:
             data = root.path_vars
 
@@ -862,33 +1504,23 @@ class DataRep(object):
         else:
             fulldata = None
 
-        # Resolve the relative path component based on fulldata
-        (uri_path, values) = relation.resolve(
-            fulldata, self.fragment, kvs=kwargs)
-        values = values or {}
+        # Resolve the relative path component based on fulldata, using
+        # the cached compiled form of this relation
+        compiled = _CompiledRelation.lookup(self.service, relation,
+                                            self.fragment)
+        (uri_path, values) = compiled.resolve(fulldata, self.fragment,
+                                              kvs=kwargs)
 
         logger.debug('follow: uri=%s, values=%s' %
                      (uri_path, values))
 
-        # See if the target link is on the same service
-        target_host = values.get('$host') or self.service.host
-        target_instance = values.get('$instance') or self.service.instance
-        target_service_id = relation.resource.servicedef.id
-
-        if ((self.service.servicedef.id != target_service_id) or
-                (self.service.host != target_host) or
-                (self.service.instance != target_instance)):
-            target_service = self.service.service_manager.find_by_id(
-                target_host, target_service_id, target_instance,
-                auth=self.service.auth)
-        else:
-            target_service = self.service
-
+        target_service = compiled.target_service(values)
         uri = target_service.servicepath + uri_path[1:]
 
         return DataRep.from_schema(target_service, uri,
-                                   jsonschema=relation.resource,
-                                   path_vars=values)
+                                   jsonschema=compiled.jsonschema,
+                                   path_vars=values,
+                                   **_readonly_kwargs(self.readonly))
 
     def execute(self, _name, _data=None, **kwargs):
         """ Execute a link by name.
@@ -904,6 +1536,56 @@ class DataRep(object):
 
         link = self.jsonschema.links[_name]
         uri = self._resolve_path(link.path, **kwargs)
+        return self._execute_link(link, uri, _data)
+
+    def paginate(self, _name='get', pager=None, prefetch=1, **kwargs):
+        """ Iterate over the items of all pages of a paged link.
+
+        :param _name: the link to execute for each page
+        :param pager: the `sleepwalker.paging.Pager` of the link, by
+            default the one declared via `Service.add_pager()`
+        :param prefetch: number of pages requested ahead in the
+            background while a page is consumed
+
+        Additional keyword arguments resolve path variables, as for
+        `execute()`, and are the parameters of the first page along
+        with the path variables this DataRep was bound with.  The
+        paging parameters are path variables as well, typically query
+        parameters declared by the `params` of the 'self' link.
+        Returns an iterator of fragment DataReps for the items, see
+        sleepwalker.paging.
+
+        :raises LinkError: if there is no such link, no pager for it,
+            or if the path of the link lacks the paging parameters
+        """
+        if _name not in self.jsonschema.links:
+            raise LinkError("%s has no link '%s'" % (self, _name))
+        if pager is None:
+            pager = self.service.declared_pager(self.jsonschema, _name)
+            if pager is None:
+                raise LinkError("%s has no pager for link '%s'" %
+                                (self, _name))
+
+        link = self.jsonschema.links[_name]
+        # Variables missing from the template would be dropped, and
+        # the same page requested over and over
+        names = uritemplate.URITemplate(link.path.template).variable_names
+        missing = [p for p in pager.params if p not in names]
+        if missing:
+            raise LinkError("Link '%s' of %s has no variables %s to page with"
+                            % (_name, self, missing))
+
+        params = dict(self.path_vars or {})
+        params.update(kwargs)
+
+        def fetch(params):
+            return self._execute_link(
+                link, self._resolve_path(link.path, **params))
+        return paging.items(fetch, pager, params, prefetch)
+
+    def _execute_link(self, link, uri, _data=None):
+        """ Issue the request for `link` against the resolved `uri`. """
+        _name = link.name
         method = link.method
         request_sch = link.request
         response_sch = link.response
@@ -913,9 +1595,12 @@ class DataRep(object):
                 "%s: Unable to follow link '%s', no method defined" %
                 (self, _name))
 
+        if DECODE_RECORDS:
+            _data = records.encode(_data)
+
         if VALIDATE_REQUEST and request_sch is not None:
             # Validate the request
-            request_sch.validate(_data)
+            self._validate(request_sch, _data)
 
         # Performing an HTTP transaction
         if method == "GET":
@@ -929,24 +1614,40 @@ class DataRep(object):
             params = None
             body = None
 
-        response = self._request(method, uri, body, params)
+        response = self._request(method, uri, body, params, link=link,
+                                 **_lazy_kwargs())
 
         # Validate response
         if VALIDATE_RESPONSE and response_sch is not None:
-            response_sch.validate(response)
+            self._validate(response_sch, response)
+
+        if (DECODE_RECORDS and response_sch is not None and
+                not isinstance(response, LazyJson)):
+            response = records.decode(response_sch, response)
 
         if 'self' in response_sch.links:
             # This is a resource, make it as such
             return DataRep.from_schema(self.service, uri,
-                                       jsonschema=response_sch, data=response)
+                                       jsonschema=response_sch, data=response,
+                                       **_readonly_kwargs(self.readonly))
         else:
             # Create a DataRep for the response
             return DataRep.from_schema(self.service, uri,
-                                       jsonschema=response_sch, data=response)
-
-    def _request(self, method, uri, body=None, params=None, headers=None):
+                                       jsonschema=response_sch, data=response,
+                                       **_readonly_kwargs(self.readonly))
+
+    def _validate(self, jsonschema, value):
+        """ Validate `value` against `jsonschema`, raising ValidationError. """
+        jsonschema.validate(value)
+
+    def _request(self, method, uri, body=None, params=None, headers=None,
+                 link=None, lazy=False, result=False):
+        kwargs = {'lazy': True} if lazy else {}
+        if result:
+            kwargs['result'] = True
         try:
-            return self.service.request(method, uri, body, params, headers)
+            return self.service.request(method, uri, body, params, headers,
+                                        link=link, **kwargs)
         except HTTPError as e:
             # At this level, we can add a datarep for the error to the
             # exception if it has json content, and then let it keep
@@ -992,7 +1693,10 @@ class ContainerDataRep(DataRep):
         return key in self.data
 
     def __len__(self):
-        return len(self.data)
+        length = self._lazy_length()
+        if length is None:
+            return len(self.data)
+        return length
 
 
 class DictDataRep(ContainerDataRep):
@@ -1003,17 +1707,30 @@ class DictDataRep(ContainerDataRep):
     """
 
     class ValuesIterator(ContainerDataRep.Iterator):
+        def __init__(self, dr):
+            super(DictDataRep.ValuesIterator, self).__init__(dr)
+            self.root = dr if dr.root is None else dr.root
+            self.prefix = dr.fragment + '/'
+
+        def fragment(self, key):
+            # Resolve the property schema one level down from this
+            # object rather than from the root of the resource.
+            key = str(key)
+            return DataRep._make_fragment(
+                self.root, self.prefix + key,
+                self.datarep.jsonschema.by_pointer('/' + key))
+
         def __next__(self):
             # Return a fragment using the same key that would have been
             # used to iterate over the normal data.
-            return self.datarep[next(self.base_iter)]
+            return self.fragment(next(self.base_iter))
 
-    class ItemsIterator(ContainerDataRep.Iterator):
+    class ItemsIterator(ValuesIterator):
         def __next__(self):
             # Use the same key what would have been used to iterate
             # over the normal data.
             key = next(self.base_iter)
-            return key, self.datarep[key]
+            return key, self.fragment(key)
 
     def __getitem__(self, key):
         """ Index into the datarep based on an object key.
@@ -1036,10 +1753,24 @@ class DictDataRep(ContainerDataRep):
            { 'book_ids': [ 30, 42, 77] }
 
         """
-        if key not in self.data:
+        new_root = self if self.root is None else self.root
+        if (new_root._projection is not None or
+                new_root._data is DataRep.UNSET):
+            new_root._project(self.fragment + '/' + str(key))
+
+        lazy = self._lazy_data()
+        if lazy is not None:
+            # Look the key up without decoding all of the data
+            try:
+                found = lazy.has_pointer(_pointer_parts(self.fragment) +
+                                         [str(key)])
+            except ValueError:
+                found = key in self._peek()
+        else:
+            found = key in self._peek()
+        if not found:
             raise KeyError(key)
 
-        new_root = self if self.root is None else self.root
         return DataRep.from_schema(fragment=self.fragment + '/' + str(key),
                                    root=new_root)
 
@@ -1063,6 +1794,17 @@ class DictDataRep(ContainerDataRep):
         # TODO: Coming back to this in a separate commit.
         raise NotImplementedError
 
+    def iter_raw(self):
+        """ Iterate over (pointer, value) pairs without creating DataReps.
+
+        The pointer is relative to the root resource and may be passed
+        to `at()` to obtain a fragment DataRep for the value if links
+        or relations are needed.
+        """
+        prefix = self.fragment + '/'
+        for key, value in self.data.items():
+            yield prefix + str(key), value
+
 
 class ListDataRep(ContainerDataRep):
     """ A DataRep for a JSON array resource as a Python list
@@ -1072,22 +1814,245 @@ class ListDataRep(ContainerDataRep):
     """
 
     class Iterator(ContainerDataRep.Iterator):
+        # Each item is a fragment DataRep created as it is reached.  A
+        # proxy deferring the fragment until its links are used would
+        # save little, as creating a fragment only copies attributes of
+        # the root, see _init_fragment(), and would add an indirection
+        # to every use of the item, which is then no DataRep.
         def __init__(self, dr):
-            super(ListDataRep.Iterator, self).__init__(dr)
+            self.datarep = dr
+            length = dr._lazy_length()
+            if length is None:
+                self.base_iter = iter(dr._items())
+            else:
+                # Count the items without decoding them
+                self.base_iter = iter(range(length))
             self.counter = -1
-            self.length = len(dr)
+            self.item = dr._item_factory()
 
         def __next__(self):
+            next(self.base_iter)
             self.counter += 1
-            if self.counter >= self.length:
-                raise StopIteration()
-            return self.datarep[self.counter]
+            return self.item(self.counter)
+
+    class Slice(collections.abc.Sequence):
+        """ A lazy view of a range of items of a ListDataRep.
+
+        Slicing a ListDataRep returns one of these rather than a list
+        of fragments.  It supports the read-only sequence protocol,
+        including further slicing, and only creates a fragment DataRep
+        for an item when that item is indexed or iterated over.
+
+        The indices are fixed when the slice is taken, as they would be
+        for a list of fragments.
+        """
+        def __init__(self, dr, indices):
+            self.datarep = dr
+            self.indices = indices
+            self._item = dr._item_factory()
+
+        def __len__(self):
+            return len(self.indices)
+
+        def __getitem__(self, key):
+            if isinstance(key, slice):
+                return ListDataRep.Slice(self.datarep, self.indices[key])
+            try:
+                index = int(key)
+            except ValueError:
+                raise TypeError(key)
+            return self._item(self.indices[index])
+
+        def __iter__(self):
+            for index in self.indices:
+                yield self._item(index)
+
+        def __repr__(self):
+            return '<%s %s[%d:%d:%d]>' % (
+                self.__class__.__name__, self.datarep.fragment or '#',
+                self.indices.start, self.indices.stop, self.indices.step)
+
+    def build_index(self, key, unique=True):
+        """ Return a hash index of the items of this array by `key`.
+
+        :param key: name of a property of each item, or a JSON pointer
+            relative to each item for nested keys
+        :param unique: if True, the index maps each key to a single
+            item fragment, otherwise to a list of item fragments
+
+        Indexes are shared by all DataReps for the same array of the
+        same root and kept up to date as described in
+        `sleepwalker.index`.  Lookups are O(1) once built.
+
+        Example:
+           >>> by_id = books.build_index('id')
+           >>> by_id[42].data
+           { 'id': 42, 'title': 'My book' }
+
+        """
+        root = self if self.root is None else self.root
+        if root._indexes is None:
+            root._indexes = {}
+
+        index = root._indexes.get((self.fragment, key))
+        if index is None or index.unique != unique:
+            index = Index(self, key, unique)
+            root._indexes[(self.fragment, key)] = index
+        return index
+
+    def _index(self, key):
+        """ Return the built or declared index by `key`, or None.
+
+        Unlike `indexes`, this leaves the indexes by other keys alone.
+        """
+        root = self if self.root is None else self.root
+        if root._indexes and (self.fragment, key) in root._indexes:
+            return root._indexes[(self.fragment, key)]
+
+        for declared, unique in self.service.declared_indexes(
+                root.jsonschema, self.fragment):
+            if declared == key:
+                return self.build_index(key, unique)
+        return None
+
+    @property
+    def indexes(self):
+        """ Dict of the indexes of this array by key.
+
+        This includes any index declared with `Service.add_index()` for
+        the resource as well as those created with `build_index()`.
+        """
+        root = self if self.root is None else self.root
+        for key, unique in self.service.declared_indexes(root.jsonschema,
+                                                         self.fragment):
+            self.build_index(key, unique)
+
+        if not root._indexes:
+            return {}
+        return dict((key, index)
+                    for (fragment, key), index in root._indexes.items()
+                    if fragment == self.fragment)
+
+    def sync(self, _name='get', delta=None, **kwargs):
+        """ Update the items of this collection with their changes.
+
+        :param _name: the link returning the changes
+        :param delta: the `sleepwalker.sync.Delta` of the link, by
+            default the one declared via `Service.add_delta()`
+
+        Additional keyword arguments resolve path variables, as for
+        `execute()`, along with the path variables this DataRep was
+        bound with.  If the data is set by a previous sync, only the
+        items changed or deleted since are requested and merged into
+        the data, otherwise all items are requested.  The parameters
+        requesting the changes are path variables, see `paginate()`.
+        Returns self, see sleepwalker.sync.
+
+        :raises FragmentError: if this is a fragment
+        :raises LinkError: if there is no such link, no delta for it,
+            or if the path of the link lacks the delta parameters
+        """
+        if self.fragment:
+            raise FragmentError("Cannot sync fragment %s" % self)
+        if _name not in self.jsonschema.links:
+            raise LinkError("%s has no link '%s'" % (self, _name))
+        if delta is None:
+            delta = self.service.declared_delta(self.jsonschema, _name)
+            if delta is None:
+                raise LinkError("%s has no delta for link '%s'" %
+                                (self, _name))
+
+        link = self.jsonschema.links[_name]
+        names = uritemplate.URITemplate(link.path.template).variable_names
+        missing = [p for p in delta.params if p not in names]
+        if missing:
+            raise LinkError("Link '%s' of %s has no variables %s to sync with"
+                            % (_name, self, missing))
+
+        token = self._sync_token if self.data_valid() else None
+        params, headers = delta.request(token)
+        variables = dict(self.path_vars or {})
+        variables.update(kwargs)
+        variables.update(params)
+        # The items supply no path variables, and resolving against
+        # them would walk all of them
+        uri_path, _ = link.path.resolve(None, kvs=variables)
+        uri = self.service.servicepath + uri_path[1:]
+        # Headers are those of this request, as for pull()
+        response, _, response_headers = self._request(
+            'GET', uri, headers=headers, link=link, result=True)
+
+        if (VALIDATE_RESPONSE and response is not None and
+                link.response is not None):
+            self._validate(link.response, response)
+
+        items, deleted, new_token = delta.changes(
+            response, response_headers or {})
+        if DECODE_RECORDS:
+            schema = self.jsonschema.by_pointer('/0')
+            items = [records.decode(schema, item) for item in items]
+
+        if token is None:
+            self._data = list(items)
+        else:
+            sync.merge(self, delta.key, items, deleted)
+        if new_token is not None:
+            self._sync_token = new_token
+        return self
+
+    def query(self):
+        """ Return a `Query` over the items of this array.
+
+        See `sleepwalker.query` for filtering, sorting, grouping and
+        projecting the pulled items locally.
+        """
+        return Query(self)
+
+    def to_columns(self, *keys, numpy=None):
+        """ Return the items of this array as a dict of columns by key.
+
+        :param keys: property names or item-relative JSON pointers of
+            the columns, by default all properties of the item schema
+        :param numpy: return NumPy arrays for numeric columns, by
+            default when NumPy is installed
+
+        The storage of each column is chosen from the item schema as
+        described in `sleepwalker.columns`.
+        """
+        builder = ColumnBuilder(self.jsonschema.by_pointer('/0'), keys,
+                                numpy=numpy)
+        return builder.build(self.data)
+
+    def iter_columns(self, chunk_size, *keys, numpy=None):
+        """ Yield dicts of columns for every `chunk_size` items.
+
+        This is `to_columns()` for arrays too large to convert at once.
+        """
+        builder = ColumnBuilder(self.jsonschema.by_pointer('/0'), keys,
+                                numpy=numpy)
+        return builder.iter_build(self.data, chunk_size)
+
+    def _item_factory(self):
+        """ Return a function that creates the fragment for an item index. """
+        # All items share one schema, so resolve it and the DataRep
+        # class once rather than once per item.
+        root = self if self.root is None else self.root
+        prefix = self.fragment + '/'
+        schema = self.jsonschema.by_pointer('/0')
+        cls = DataRep._class_for(schema)
+
+        def item(index):
+            dr = cls.__new__(cls)
+            dr._init_fragment(root, prefix + str(index), schema)
+            return dr
+        return item
 
     def __getitem__(self, key):
         """ Index into the datarep based on an index or slice.
 
         This method allows indexing and slicing into a single datarep
-        to allow accessing nested links and data.
+        to allow accessing nested links and data.  Slicing returns a
+        lazy `ListDataRep.Slice` view rather than a list of fragments.
 
         Example (the author_ids DataRep may represent the '#/items' fragment
         from a collection of authors):
@@ -1104,24 +2069,18 @@ class ListDataRep(ContainerDataRep):
         """
         # Function for converting to positive indices for json-pointer.
         def forward_index(i):
-            fi = i if i >= 0 else len(self.data) + i
-            if fi < 0 or fi >= len(self.data):
+            length = len(self)
+            fi = i if i >= 0 else length + i
+            if fi < 0 or fi >= length:
                 raise IndexError(i)
             return fi
 
-        # Function for making the URI fragement by appending the pointer.
-        make_fragment = lambda i: self.fragment + '/' + str(i)
-
         if isinstance(key, slice):
             # Despite the name, slice.indices() returns start, stop, stride
             # rather than the literal indices, so we call range() on that.
-            indices = [forward_index(i) for i in
-                       range(*key.indices(len(self.data)))]
-            make_fragment = lambda i: self.fragment + '/' + str(i)
-            new_root = self if self.root is None else self.root
-            return [DataRep.from_schema(fragment=make_fragment(i),
-                                        root=new_root)
-                    for i in indices]
+            # The resulting indices are always in bounds and non-negative.
+            return ListDataRep.Slice(self,
+                                     range(*key.indices(len(self))))
 
         # If it wasn't a slice, it had better be an int.  The Python data
         # model specifies that a TypeError should be thrown here, never
@@ -1139,5 +2098,32 @@ class ListDataRep(ContainerDataRep):
     def __iter__(self):
         return ListDataRep.Iterator(self)
 
+    def __len__(self):
+        length = self._lazy_length()
+        if length is None:
+            return len(self._items())
+        return length
+
+    def _items(self):
+        """ Return the list of items, without recording a read of it.
+
+        The items of the root DataRep are the same whichever of their
+        fields are projected, so counting them reads none.
+        """
+        if self.fragment:
+            return self.data
+        return self._peek()
+
+    def iter_raw(self):
+        """ Iterate over (pointer, value) pairs without creating DataReps.
+
+        The pointer is relative to the root resource and may be passed
+        to `at()` to obtain a fragment DataRep for the value if links
+        or relations are needed.
+        """
+        prefix = self.fragment + '/'
+        for i, value in enumerate(self.data):
+            yield prefix + str(i), value
+
     def index(self, value):
         return self.data.index(value)
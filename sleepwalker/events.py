@@ -0,0 +1,401 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements subscriptions to changes pushed by the server
+as a stream of server-sent events, as an alternative to polling.
+
+A resource whose schema has an ``events`` link, which must be a GET
+of a ``text/event-stream`` response, can subscribe to changes:
+
+   >>> book = bookstore.bind('book', id=1)
+   >>> book.subscribe(lambda book, event: print(event.type))
+
+Subscribing opens the event stream in a background thread, unless it
+is already open.  There is one stream per connection, so all
+subscribed resources of services on the same host share one streaming
+request.  Their ``events`` links must therefore address the same
+stream, which carries the events of every resource on the host, and
+subscribing with another raises LinkError.
+
+Events are read as they arrive and applied to the subscribed
+DataReps of the resource they address.  The data of each event is a
+JSON object with the URI of the resource in ``href``:
+
+* ``update`` events carry the new ``data`` of the resource, or of the
+  value at the JSON pointer ``pointer`` within the resource, which
+  replaces the data held by the DataReps without issuing any request.
+  Updates of a value within data that is not pulled yet, or that is
+  read-only, invalidate the data instead.
+
+* ``invalidate`` events reset the data of the DataReps, so that their
+  next access pulls it again.
+
+Callbacks are then called with the subscribed DataRep and the `Event`,
+for these and any other events that have an ``href``.  Events are
+applied and callbacks called in the stream thread.  Each event is
+applied while holding `EventStream.lock`, which other threads may
+hold to read the data of subscribed DataReps between events:
+
+   >>> subscription = book.subscribe()
+   >>> with subscription.stream.lock:
+   ...     title, pages = book['title'].data, book['pages'].data
+
+If the stream ends or fails, it is reopened after a delay that the
+server may set with a ``retry`` field, doubled after each failure up to
+`EventStream.max_retry`.  The id of the last event received is sent in
+a ``Last-Event-ID`` header so that the server can resume the stream.
+If the server sends no event ids, the subscribed DataReps are
+invalidated on reconnection, since events may have been missed.
+
+"""
+
+import re
+import json
+import codecs
+import logging
+import weakref
+import threading
+import collections
+import urllib.parse
+
+from jsonpointer import JsonPointerException
+
+from sleepwalker import datarep, records
+from sleepwalker.exceptions import LinkError
+
+__all__ = ['Event', 'EventParser', 'EventStream', 'stream_for']
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the stream at a time, or fewer as they arrive
+CHUNK_SIZE = 1 << 16
+
+Event = collections.namedtuple('Event', 'id type data')
+Event.__doc__ = """ A server-sent event, with `data` as sent. """
+
+_EOL = re.compile(r'\r\n|\r|\n')
+
+
+class EventParser(object):
+    """ Incremental parser of a ``text/event-stream``. """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self._buffer = ''
+        self._id = None
+        self._type = ''
+        self._data = []
+
+        # Id of the last event dispatched
+        self.last_id = None
+
+        # Reconnection time in milliseconds, if set by the server
+        self.retry = None
+
+    def feed(self, chunk):
+        """ Parse the bytes `chunk` and return the list of complete events.
+
+        Lines and events may be split across chunks in any way.
+        """
+        text = self._buffer + self._decoder.decode(chunk)
+        held = ''
+        if text[-1:] == '\r':
+            # May be the first half of a CRLF
+            text, held = text[:-1], '\r'
+        if '\r' in text:
+            lines = _EOL.split(text)
+        else:
+            lines = text.split('\n')
+        self._buffer = lines.pop() + held
+
+        events = []
+        line_ = self._line
+        for line in lines:
+            event = line_(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _line(self, line):
+        if not line:
+            return self._dispatch()
+        if line[0] == ':':
+            return None
+
+        field, sep, value = line.partition(':')
+        if value[:1] == ' ':
+            value = value[1:]
+        if field == 'data':
+            self._data.append(value)
+        elif field == 'event':
+            self._type = value
+        elif field == 'id':
+            if '\0' not in value:
+                self._id = value
+        elif field == 'retry':
+            if value.isdigit():
+                self.retry = int(value)
+        return None
+
+    def _dispatch(self):
+        self.last_id = self._id
+        data, self._data = self._data, []
+        event_type, self._type = self._type, ''
+        if not data:
+            return None
+        return Event(self.last_id, event_type or 'message', '\n'.join(data))
+
+
+class _Subscription(object):
+    """ A DataRep subscribed to an `EventStream`. """
+
+    def __init__(self, stream, datarep, callback):
+        self.stream = stream
+        self.datarep = weakref.ref(datarep)
+        self.callback = callback
+
+    def cancel(self):
+        """ Stop applying events to the DataRep. """
+        self.stream.unsubscribe(self)
+
+
+class EventStream(object):
+    """ A stream of server-sent events applied to subscribed DataReps. """
+
+    # Initial and longest seconds to wait before reconnecting
+    retry = 3.0
+    max_retry = 60.0
+
+    def __init__(self, connection, uri):
+        """ Create a stream from `uri` on `connection`, not yet opened.
+
+        :param connection: the `sleepwalker.connection.Connection`
+        :param uri: URI of the event stream
+
+        """
+        self.connection = connection
+        self.uri = uri
+        self.last_id = None
+
+        # Subscriptions by resource URI
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+        # Held while applying an event to the data of DataReps
+        self.lock = threading.RLock()
+        self._thread = None
+        self._response = None
+        self._stopping = threading.Event()
+
+    def __repr__(self):
+        return '<EventStream %s>' % self.connection.get_url(self.uri)
+
+    def subscribe(self, datarep, callback=None):
+        """ Apply events to the root DataRep `datarep`.
+
+        :param datarep: the DataRep to update
+        :param callback: optional, called with `datarep` and the
+            `Event` after each event for its URI is applied
+
+        Starts the stream if needed.  Returns a subscription whose
+        `cancel()` stops applying events.  The subscription does not
+        keep `datarep` alive.
+        """
+        subscription = _Subscription(self, datarep, callback)
+        with self._lock:
+            self._subscriptions.setdefault(datarep.uri, []).append(
+                subscription)
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for uri, subscriptions in list(self._subscriptions.items()):
+                if subscription in subscriptions:
+                    subscriptions.remove(subscription)
+                    if not subscriptions:
+                        del self._subscriptions[uri]
+
+    def _subscribed(self, uri):
+        """ Return <datarep, callback> for the live subscriptions to `uri`. """
+        with self._lock:
+            subscriptions = self._subscriptions.get(uri)
+            if not subscriptions:
+                return []
+            live = []
+            for subscription in list(subscriptions):
+                dr = subscription.datarep()
+                if dr is None:
+                    subscriptions.remove(subscription)
+                else:
+                    live.append((dr, subscription.callback))
+            if not subscriptions:
+                del self._subscriptions[uri]
+            return live
+
+    def start(self):
+        """ Open the stream in a background thread, unless already open. """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run,
+                                            name='sleepwalker-events',
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """ Close the stream and wait for the thread to finish. """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping.set()
+            response = self._response
+        if response is not None:
+            # Closing alone does not interrupt a read in progress
+            shutdown = getattr(response.raw, 'shutdown', None)
+            if shutdown is not None:
+                shutdown()
+            response.close()
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        failures = 0
+        delay = self.retry
+        connected = False
+        while not self._stopping.is_set():
+            if connected and not self.last_id:
+                # Events may have been missed, with no way to resume
+                with self.lock:
+                    for uri in list(self._subscriptions):
+                        for dr, _ in self._subscribed(uri):
+                            dr._data = dr.UNSET
+            parser = EventParser()
+            try:
+                self.read(parser)
+                failures = 0
+            except Exception:
+                if self._stopping.is_set():
+                    break
+                logger.exception('Event stream %s failed' % self)
+                failures += 1
+            connected = True
+            if parser.retry is not None:
+                delay = parser.retry / 1000.0
+            self._stopping.wait(min(delay * 2 ** failures, self.max_retry))
+
+    def read(self, parser):
+        """ Read events from a new request until the stream ends. """
+        headers = {'Accept': 'text/event-stream', 'Cache-Control': 'no-cache'}
+        if self.last_id:
+            headers['Last-Event-ID'] = self.last_id
+        response = self.connection.stream_request(self.uri, headers)
+        with self._lock:
+            self._response = response
+        try:
+            if self._stopping.is_set():
+                return
+            for chunk in _chunks(response):
+                for event in parser.feed(chunk):
+                    self.dispatch(event)
+                if parser.last_id is not None:
+                    self.last_id = parser.last_id
+        finally:
+            with self._lock:
+                self._response = None
+            response.close()
+
+    def dispatch(self, event):
+        """ Apply `event` to the subscribed DataReps and call back. """
+        try:
+            message = json.loads(event.data)
+            href = message['href']
+        except (ValueError, TypeError, KeyError):
+            logger.debug('Ignoring event %s without href' % (event,))
+            return
+
+        for dr, callback in self._subscribed(_uri_path(href)):
+            with self.lock:
+                if event.type == 'update':
+                    _update(dr, message.get('pointer', ''),
+                            message.get('data'))
+                elif event.type == 'invalidate':
+                    dr._data = dr.UNSET
+            if callback is not None:
+                try:
+                    callback(dr, event)
+                except Exception:
+                    logger.exception('Event callback failed for %s' % dr)
+
+
+def _chunks(response):
+    """ Yield the content of `response` as it arrives. """
+    read1 = getattr(response.raw, 'read1', None)
+    if read1 is None:
+        yield from response.iter_content(None)
+        return
+    while True:
+        chunk = read1(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _uri_path(href):
+    """ Return `href` without scheme and host, as in `DataRep.uri`. """
+    parsed = urllib.parse.urlsplit(href)
+    if not parsed.netloc:
+        return href
+    if parsed.query:
+        return parsed.path + '?' + parsed.query
+    return parsed.path
+
+
+def _update(dr, pointer, value):
+    """ Set the data of root DataRep `dr` at `pointer` to `value`. """
+    if datarep.DECODE_RECORDS:
+        value = records.decode(dr.jsonschema.by_pointer(pointer), value)
+    if not pointer:
+        dr._data = value
+        return
+    if not dr.data_valid() or dr.readonly:
+        dr._data = dr.UNSET
+        return
+    try:
+        dr._set_pointer(pointer, value)
+    except JsonPointerException:
+        dr._data = dr.UNSET
+        return
+    dr._data_changed(pointer)
+
+
+# Streams by connection
+_streams = weakref.WeakKeyDictionary()
+_streams_lock = threading.Lock()
+
+
+def stream_for(service, uri):
+    """ Return the `EventStream` of the connection of `service`.
+
+    :param service: the service of the subscribed resource
+    :param uri: URI of the event stream
+
+    Streams are shared by all services using the same connection, and
+    events are dispatched to subscriptions by resource URI.
+
+    :raises LinkError: if the stream of the connection is from another
+        URI
+    """
+    connection = service._connect()
+    with _streams_lock:
+        stream = _streams.get(connection)
+        if stream is None:
+            stream = _streams[connection] = EventStream(connection, uri)
+        elif stream.uri != uri:
+            raise LinkError('%s streams events from %s, not %s' %
+                            (connection.hostname, stream.uri, uri))
+        return stream
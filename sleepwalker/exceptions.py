@@ -66,6 +66,22 @@ class FragmentError(SleepwalkerException):
     """ Raised if fragment settings are inconsistent. """
 
 
+class SelectorError(SleepwalkerException):
+    """ Raised if a selector expression is invalid. """
+
+
+class DuplicateKeyError(SleepwalkerException):
+    """ Raised if a unique index finds two items with the same key. """
+
+
+class QueryError(SleepwalkerException):
+    """ Raised if a local query is invalid. """
+
+
+class SnapshotError(SleepwalkerException):
+    """ Raised if a snapshot file cannot be read. """
+
+
 #
 # Connection related exceptions
 #
@@ -0,0 +1,126 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements the immutable JSON data held by read-only
+DataReps.
+
+A DataRep bound with ``_readonly=True``, or from a `Service` created
+with ``readonly=True``, holds its data frozen by `freeze()`: objects
+become `FrozenDict` instances and arrays `FrozenList` instances, which
+are dict and list subclasses that raise TypeError on any change.
+Frozen data can be shared across threads and cached without defensive
+copies:
+
+   >>> book = service.bind('book', id=1, _readonly=True)
+   >>> book.data['title'] = 'New title'
+   TypeError: FrozenDict is read-only
+
+Copying or pickling frozen data yields plain dicts and lists, so a
+mutable copy is always one ``copy.deepcopy()`` away.  Records, see
+sleepwalker.records, are frozen as copies of a read-only subclass of
+their record class, and copy back to the record class.
+
+Freezing copies each object, array and record of the data once per
+pull, so that data shared with others is left as is.  This takes
+about twice as long as decoding the response.  Decoding straight into frozen
+objects is no faster, as the ``object_pairs_hook`` of the json module
+runs in Python for every object.  Read-only DataReps pay off when the
+data is shared, each reader saving a defensive deep copy.
+
+"""
+
+from sleepwalker.records import Record
+
+__all__ = ['FrozenDict', 'FrozenList', 'freeze']
+
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError('%s is read-only' % self.__class__.__name__)
+
+
+class FrozenDict(dict):
+    """ An immutable dict. """
+
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class FrozenList(list):
+    """ An immutable list. """
+
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = _readonly
+    sort = reverse = _readonly
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+
+# Frozen variants of record classes by record class
+_record_classes = {}
+
+
+def _frozen_record_class(cls):
+    frozen = _record_classes.get(cls)
+    if frozen is None:
+        frozen = type('Frozen' + cls.__name__, (cls,),
+                      {'__slots__': (),
+                       '__setitem__': _readonly,
+                       '__delitem__': _readonly,
+                       '__copy__': _thaw_record})
+        _record_classes[cls] = frozen
+    return frozen
+
+
+def _thaw_record(record):
+    cls = record.__class__.__bases__[0]
+    copy = cls.__new__(cls)
+    for slot in record._slot_of.values():
+        try:
+            setattr(copy, slot, getattr(record, slot))
+        except AttributeError:
+            pass
+    copy._extra = dict(record._extra) if record._extra else None
+    copy._order = record._order
+    return copy
+
+
+_SCALARS = frozenset([str, int, float, bool, type(None)])
+
+
+def freeze(value):
+    """ Return JSON data `value` with all objects and arrays frozen.
+
+    Objects, arrays and records are copied, and data that is already
+    frozen is returned as is.
+    """
+    cls = value.__class__
+    if cls in _SCALARS:
+        return value
+    if cls is dict:
+        return FrozenDict(zip(value.keys(), map(freeze, value.values())))
+    if cls is list:
+        return FrozenList(map(freeze, value))
+    if isinstance(value, Record) and cls.__setitem__ is not _readonly:
+        frozen_cls = _frozen_record_class(cls)
+        frozen = frozen_cls.__new__(frozen_cls)
+        for slot in cls._slot_of.values():
+            try:
+                setattr(frozen, slot, freeze(getattr(value, slot)))
+            except AttributeError:
+                pass
+        frozen._extra = freeze(value._extra) if value._extra else None
+        frozen._order = value._order
+        return frozen
+    return value
@@ -0,0 +1,190 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module defines the `Index` class, a hash index over the items of
+a `ListDataRep` by the value of a key field.
+
+Indexes are created with `ListDataRep.build_index()`, or declared for
+a resource with `Service.add_index()` so that they are available via
+`ListDataRep.indexes` on every DataRep for that resource:
+
+   >>> books = service.bind('books')
+   >>> by_id = books.build_index('id')
+   >>> by_id[42].follow('full')
+   >>> by_publisher = books.build_index('/publisher/id', unique=False)
+   >>> [b.data['title'] for b in by_publisher[3]]
+
+An index is rebuilt on the next lookup whenever the data of its root
+DataRep is replaced, for example by `pull()` or `push()`.  Setting the
+`data` of a fragment at or below an item, or appending an item by
+setting the fragment just past the end, updates just that item's
+entry.  Changes made in place to raw data objects, such as appending
+to `books.data`, cannot be detected and require `Index.rebuild()`.
+
+"""
+
+import bisect
+
+from jsonpointer import JsonPointer
+
+from sleepwalker.exceptions import DuplicateKeyError
+from sleepwalker.records import MISSING, walk
+
+__all__ = ['Index']
+
+
+class Index(object):
+    """ A hash index over the items of a ListDataRep. """
+
+    def __init__(self, datarep, key, unique=True):
+        """ Create an index over `datarep` by `key`.
+
+        :param datarep: the ListDataRep whose items are indexed
+        :param key: name of a property of each item, or a JSON pointer
+            relative to each item for nested keys
+        :param unique: if True, each key maps to a single item and
+            duplicates raise `DuplicateKeyError`; otherwise each key
+            maps to a list of items
+
+        """
+        self.datarep = datarep
+        self.key = key
+        self.unique = unique
+
+        if key.startswith('/'):
+            self._parts = JsonPointer(key).parts
+        else:
+            self._parts = [key]
+
+        self._root = datarep if datarep.root is None else datarep.root
+        self._prefix = datarep.fragment + '/'
+        self._item = None
+
+        # Version of the root data this index was built from
+        self._version = None
+
+        # Map of key to item position (unique) or list of positions
+        self._map = {}
+
+        # Key of each item by position, MISSING if it has none
+        self._keys = []
+
+    def __repr__(self):
+        return '<%s %s by %s%s>' % (self.__class__.__name__,
+                                    self.datarep.fragment or '#', self.key,
+                                    '' if self.unique else ' (multi)')
+
+    def _key_of(self, item):
+        return walk(item, self._parts)
+
+    def _add(self, key, position):
+        if key is MISSING:
+            return
+        if self.unique:
+            if self._map.setdefault(key, position) != position:
+                raise DuplicateKeyError(
+                    'Duplicate key %r for index %s at %s and %s' %
+                    (key, self.key, self._prefix + str(self._map[key]),
+                     self._prefix + str(position)))
+        else:
+            # Keep positions in array order
+            bisect.insort(self._map.setdefault(key, []), position)
+
+    def _remove(self, key, position):
+        if key is MISSING:
+            return
+        if self.unique:
+            del self._map[key]
+        else:
+            positions = self._map[key]
+            positions.remove(position)
+            if not positions:
+                del self._map[key]
+
+    def rebuild(self):
+        """ Rebuild the index from the current data. """
+        items = self.datarep.data
+        self._version = None
+        self._map = {}
+        self._keys = [self._key_of(item) for item in items]
+        for position, key in enumerate(self._keys):
+            self._add(key, position)
+        self._item = self.datarep._item_factory()
+        self._version = self._root._data_version
+
+    def _refresh(self):
+        if self._version != self._root._data_version:
+            self.rebuild()
+
+    def _changed(self, pointer):
+        """ Update the index after the data at `pointer` was set. """
+        if self._version is None:
+            return
+
+        if pointer.startswith(self._prefix):
+            position = pointer[len(self._prefix):].split('/', 1)[0]
+            try:
+                position = int(position)
+                if position == len(self._keys):
+                    # An item was appended
+                    self._keys.append(MISSING)
+                old = self._keys[position]
+            except (ValueError, IndexError):
+                self._version = None
+                return
+            new = self._key_of(self.datarep.data[position])
+            if new != old:
+                self._remove(old, position)
+                self._keys[position] = new
+                try:
+                    self._add(new, position)
+                except DuplicateKeyError:
+                    # The data is already set, so report the conflict
+                    # when the index is next used.
+                    self._version = None
+
+        elif self._prefix.startswith(pointer + '/'):
+            # The array itself or one of its parents was replaced
+            self._version = None
+
+    def __getitem__(self, key):
+        """ Return the item, or list of items if not unique, for `key`.
+
+        :raises KeyError: if no item has `key`
+        """
+        self._refresh()
+        if self.unique:
+            return self._item(self._map[key])
+        return [self._item(position) for position in self._map[key]]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def position(self, key):
+        """ Return the array position of the item, or list of positions. """
+        self._refresh()
+        found = self._map[key]
+        return found if self.unique else list(found)
+
+    def __contains__(self, key):
+        self._refresh()
+        return key in self._map
+
+    def __len__(self):
+        """ Return the number of distinct keys in the index. """
+        self._refresh()
+        return len(self._map)
+
+    def __iter__(self):
+        self._refresh()
+        return iter(list(self._map))
+
+    def keys(self):
+        return iter(self)
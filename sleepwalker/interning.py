@@ -0,0 +1,213 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements string interning for decoded JSON data, which
+shrinks large collections whose items repeat the same object keys and
+enumerated values.
+
+An `InternTable` is passed to a `Connection`, a `Service`, or both:
+
+   >>> table = InternTable()
+   >>> conn = Connection('https://host.com', intern=table)
+   >>> service = Service(servicedef, 'https://host.com', connection=conn,
+   ...                   intern=table)
+
+A connection decodes JSON responses with object keys taken from the
+table, so that keys are shared across responses rather than only
+within one.  A service also interns the string values of properties
+that its response schemas declare with an ``enum`` or a ``maxLength``
+no longer than `InternTable.max_length`, so that for example a
+``status`` of ``'active'`` is held once for a whole collection.
+
+The table is bounded: once it holds `InternTable.maxsize` strings, new
+strings are no longer added, but those already in the table are still
+shared.  Decoding through a table is slower than plain `json.loads()`,
+so interning suits data that is held rather than read once.
+
+Values of responses kept undecoded in lazy decode mode, see
+sleepwalker.lazyjson, are not interned.
+
+"""
+
+import json
+
+import reschema.jsonschema
+
+__all__ = ['InternTable']
+
+
+class InternTable(object):
+    """ A bounded table of shared strings. """
+
+    def __init__(self, maxsize=65536, max_length=32):
+        """ Create an empty table.
+
+        :param maxsize: maximum number of strings held
+        :param max_length: maximum declared ``maxLength`` of string
+            properties whose values are interned by `values()`
+
+        """
+        self.maxsize = maxsize
+        self.max_length = max_length
+        self._strings = {}
+        # Value interners by schema, see values()
+        self._interners = {}
+
+    def __len__(self):
+        return len(self._strings)
+
+    def __call__(self, value):
+        """ Return the shared copy of string `value`. """
+        strings = self._strings
+        shared = strings.get(value)
+        if shared is None:
+            if len(strings) < self.maxsize:
+                strings[value] = value
+            return value
+        return shared
+
+    def _object(self, pairs):
+        strings = self._strings
+        obj = {}
+        for key, value in pairs:
+            shared = strings.get(key)
+            obj[key if shared is None else shared] = value
+            if shared is None and len(strings) < self.maxsize:
+                strings[key] = key
+        return obj
+
+    def loads(self, content):
+        """ Decode JSON `content` with object keys taken from this table. """
+        return json.loads(content, object_pairs_hook=self._object)
+
+    def values(self, jsonschema, value):
+        """ Intern string values in JSON data `value` per `jsonschema`.
+
+        Objects and arrays in `value` are modified in place, and the
+        result must be used in place of `value` itself.
+        """
+        interner = self._interner(jsonschema)
+        if interner is None:
+            return value
+        if interner is _STRING:
+            return self(value) if value.__class__ is str else value
+        interner(value)
+        return value
+
+    def _interner(self, jsonschema):
+        if isinstance(jsonschema, reschema.jsonschema.DynamicSchema):
+            jsonschema = jsonschema.refschema
+        try:
+            return self._interners[jsonschema]
+        except KeyError:
+            pass
+
+        if isinstance(jsonschema, reschema.jsonschema.String):
+            if jsonschema.enum is not None:
+                for value in jsonschema.enum:
+                    self(value)
+                interner = _STRING
+            elif (jsonschema.maxLength is not None and
+                    jsonschema.maxLength <= self.max_length):
+                interner = _STRING
+            else:
+                interner = None
+        elif isinstance(jsonschema, reschema.jsonschema.Object):
+            interner = _ObjectInterner(self)
+        elif isinstance(jsonschema, reschema.jsonschema.Array):
+            interner = _ArrayInterner(self)
+        else:
+            interner = None
+
+        self._interners[jsonschema] = interner
+        if interner is not None and interner is not _STRING:
+            interner.build(jsonschema)
+            if interner.empty():
+                # Nothing below this schema is interned
+                self._interners[jsonschema] = interner = None
+        return interner
+
+
+# Marker for string schemas whose values are interned
+_STRING = object()
+
+
+class _ObjectInterner(object):
+    def __init__(self, table):
+        self.table = table
+        self.strings = ()
+        self.children = {}
+        self.declared = frozenset()
+        self.extra = None
+
+    def build(self, jsonschema):
+        # Called after registration so that recursive schemas resolve
+        # to this interner.
+        strings = []
+        for name, js in jsonschema.properties.items():
+            interner = self.table._interner(js)
+            if interner is _STRING:
+                strings.append(name)
+            elif interner is not None:
+                self.children[name] = interner
+        self.strings = tuple(strings)
+        self.declared = frozenset(jsonschema.properties)
+        if isinstance(jsonschema.additional_properties,
+                      reschema.jsonschema.Schema):
+            self.extra = self.table._interner(
+                jsonschema.additional_properties)
+
+    def empty(self):
+        return not (self.strings or self.children or self.extra)
+
+    def __call__(self, value):
+        if value.__class__ is not dict:
+            return
+        table = self.table
+        for name in self.strings:
+            v = value.get(name)
+            if v.__class__ is str:
+                value[name] = table(v)
+        for name, interner in self.children.items():
+            v = value.get(name)
+            if v is not None:
+                interner(v)
+        extra = self.extra
+        if extra is not None:
+            for name, v in value.items():
+                if name in self.declared:
+                    continue
+                if extra is _STRING:
+                    if v.__class__ is str:
+                        value[name] = table(v)
+                else:
+                    extra(v)
+
+
+class _ArrayInterner(object):
+    def __init__(self, table):
+        self.table = table
+        self.items = None
+
+    def build(self, jsonschema):
+        self.items = self.table._interner(jsonschema.items)
+
+    def empty(self):
+        return self.items is None
+
+    def __call__(self, value):
+        if value.__class__ is not list:
+            return
+        items = self.items
+        if items is _STRING:
+            table = self.table
+            for i, v in enumerate(value):
+                if v.__class__ is str:
+                    value[i] = table(v)
+        else:
+            for v in value:
+                items(v)
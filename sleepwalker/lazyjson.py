@@ -0,0 +1,188 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements the undecoded JSON responses used by the lazy
+decode mode.
+
+Lazy decode is enabled by setting ``sleepwalker.datarep.DECODE_LAZY``
+to True.  Responses received by `pull()`, `push()`, `execute()` and
+`delete()` are then kept as `LazyJson` objects holding only the raw
+response bytes, and are decoded the first time the data is accessed.
+A resource that is never inspected is never decoded.
+
+Indexing into a resource that is still undecoded, and reading a value
+through the resulting fragment, only decodes what is needed to reach
+that value, as long as the value is not an object or array, which must
+be shared with the full data so that changes to it are kept:
+
+   >>> book = service.bind('book', id=1).pull()
+   >>> book['title'].data      # decodes only the title
+   'My book'
+   >>> book.data['chapters']   # decodes the whole book
+
+The first such access replaces the response bytes with the decoded
+text, so that only one copy of the response is held.  As each access
+scans the response from the start, a resource is decoded in full once
+the partial decodes add up to its size.  If a
+member name appears more than once in an object, a partial decode
+finds the first one whereas a full decode keeps the last.
+
+Lazy decode is not used while ``VALIDATE_RESPONSE`` is set, as
+validation needs the decoded data.
+
+"""
+
+import re
+import json
+import json.decoder
+
+__all__ = ['LazyJson']
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+
+
+class LazyJson(object):
+    """ An undecoded JSON document. """
+
+    __slots__ = ('content', 'intern', 'scanned')
+
+    def __init__(self, content, intern=None):
+        """ Hold the JSON document `content`, as bytes or str.
+
+        If `intern` is passed, an `sleepwalker.interning.InternTable`,
+        object keys are taken from it when decoding the document.
+        """
+        self.content = content
+        self.intern = intern
+        # Characters scanned by decode_pointer() so far
+        self.scanned = 0
+
+    def __repr__(self):
+        return '<LazyJson %d %s>' % (
+            len(self.content),
+            'characters' if isinstance(self.content, str) else 'bytes')
+
+    def _text(self):
+        """ Return the content as str, decoding it in place if needed.
+
+        The decoded text replaces the bytes, so that partial decodes do
+        not hold a second copy of the document.
+        """
+        content = self.content
+        if not isinstance(content, str):
+            content = self.content = content.decode(
+                json.detect_encoding(content), 'surrogatepass')
+        return content
+
+    def decode(self):
+        """ Decode and return the whole document. """
+        if self.intern is not None:
+            return self.intern.loads(self.content)
+        return json.loads(self.content)
+
+    def decode_pointer(self, parts):
+        """ Decode only the scalar value at the JSON pointer `parts`.
+
+        :param parts: the unescaped reference tokens of the pointer
+
+        :raises LookupError: if there is no such value, or if it is an
+            object or array
+        :raises ValueError: if the document is not valid JSON
+
+        In either case the caller should decode the whole document,
+        which then reports errors as usual.
+        """
+        text = self._text()
+        try:
+            pos = _find(text, parts)
+            if text[pos:pos + 1] in ('{', '['):
+                raise LookupError('Not a scalar value')
+            value, end = _DECODER.raw_decode(text, pos)
+        except (LookupError, ValueError):
+            self.scanned = len(self.content)
+            raise
+        self.scanned += end
+        return value
+
+    def has_pointer(self, parts):
+        """ Return True if there is a value at the JSON pointer `parts`.
+
+        :raises ValueError: if the document is not valid JSON
+        """
+        try:
+            self.scanned += _find(self._text(), parts)
+        except LookupError:
+            return False
+        except ValueError:
+            self.scanned = len(self.content)
+            raise
+        return True
+
+    def length(self, parts):
+        """ Return the number of members of the container at `parts`.
+
+        :raises LookupError: if the length is only known by decoding
+            the whole document, which is always the case here, see
+            `sleepwalker.spill.SpilledJson`
+        """
+        raise LookupError('Length unknown until decoded')
+
+    def exhausted(self):
+        """ True once partial decodes have cost as much as a full one. """
+        return self.scanned >= len(self.content)
+
+
+def _skip_ws(text, pos):
+    return _WHITESPACE.match(text, pos).end()
+
+
+def _find(text, parts):
+    """ Return the position of the value at `parts` in `text`. """
+    raw_decode = _DECODER.raw_decode
+    pos = _skip_ws(text, 0)
+    for part in parts:
+        c = text[pos:pos + 1]
+        if c == '{':
+            pos = _skip_ws(text, pos + 1)
+            if text[pos:pos + 1] != '"':
+                raise KeyError(part)
+            while True:
+                key, pos = json.decoder.scanstring(text, pos + 1)
+                pos = _skip_ws(text, pos)
+                if text[pos:pos + 1] != ':':
+                    raise ValueError('Expecting : at %d' % pos)
+                pos = _skip_ws(text, pos + 1)
+                if key == part:
+                    break
+                _, pos = raw_decode(text, pos)
+                pos = _skip_ws(text, pos)
+                if text[pos:pos + 1] != ',':
+                    raise KeyError(part)
+                pos = _skip_ws(text, pos + 1)
+                if text[pos:pos + 1] != '"':
+                    raise ValueError('Expecting a key at %d' % pos)
+
+        elif c == '[':
+            try:
+                index = int(part)
+            except ValueError:
+                raise IndexError(part)
+            pos = _skip_ws(text, pos + 1)
+            if text[pos:pos + 1] == ']':
+                raise IndexError(part)
+            for _ in range(index):
+                _, pos = raw_decode(text, pos)
+                pos = _skip_ws(text, pos)
+                if text[pos:pos + 1] != ',':
+                    raise IndexError(part)
+                pos = _skip_ws(text, pos + 1)
+
+        else:
+            raise KeyError(part)
+
+    return pos
@@ -0,0 +1,199 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements iterating over collections that the server
+returns one page at a time.
+
+A `Pager` describes how a link pages: the parameters that request the
+first page, how the parameters of the next page follow from a page,
+and where the items are within each page.  `OffsetPager` and
+`TokenPager` cover paging by offset and limit and by continuation
+token.  A pager is declared for a link with `Service.add_pager()`, or
+passed to `DataRep.paginate()`, which returns a single iterator of
+fragment DataReps over the items of all pages:
+
+   >>> service.add_pager('books', 'get', OffsetPager(limit=500))
+   >>> for book in service.bind('books').paginate():
+   ...     print(book['title'].data)
+
+Pages are requested as the iteration reaches them.  While the items of
+one page are consumed, the following pages are requested in a
+background thread, up to `prefetch` pages ahead, so that at most
+`prefetch` + 1 pages are held at a time.  With a `prefetch` of 0 each
+page is requested when the previous one is exhausted, in the calling
+thread.  Errors requesting a page are raised when the iteration
+reaches it.  The background thread shares the connection of the
+service, which sends its requests and those of other threads one at a
+time.
+
+"""
+
+import queue
+import threading
+
+from jsonpointer import resolve_pointer
+
+__all__ = ['Pager', 'OffsetPager', 'TokenPager', 'pages', 'items']
+
+
+class Pager(object):
+    """ Base class of pagination strategies. """
+
+    # JSON pointer to the array of items within each page
+    items = ''
+
+    # Names of the parameters set by the pager, which must be
+    # variables of the path of the link
+    params = ()
+
+    def first(self, params):
+        """ Return the parameters requesting the first page.
+
+        :param params: parameters passed by the caller
+        """
+        return params
+
+    def next(self, params, page):
+        """ Return the parameters requesting the page after `page`.
+
+        :param params: the parameters that requested `page`
+        :param page: the page, as the DataRep returned by the link
+
+        Returns None if `page` is the last page.
+        """
+        raise NotImplementedError()
+
+
+class OffsetPager(Pager):
+    """ Pages by offset and limit parameters. """
+
+    def __init__(self, limit=100, offset_param='offset',
+                 limit_param='limit', items=''):
+        """ Create a pager requesting `limit` items per page.
+
+        :param limit: number of items per page, unless set by the
+            caller
+        :param offset_param: name of the offset parameter
+        :param limit_param: name of the limit parameter
+        :param items: JSON pointer to the items within each page
+
+        A page with fewer items than the limit is the last page.
+        """
+        self.limit = limit
+        self.offset_param = offset_param
+        self.limit_param = limit_param
+        self.items = items
+        self.params = (offset_param, limit_param)
+
+    def first(self, params):
+        params = dict(params)
+        params.setdefault(self.offset_param, 0)
+        params.setdefault(self.limit_param, self.limit)
+        return params
+
+    def next(self, params, page):
+        count = len(page.at(self.items) if self.items else page)
+        if count == 0 or count < params[self.limit_param]:
+            return None
+        params = dict(params)
+        params[self.offset_param] += count
+        return params
+
+
+class TokenPager(Pager):
+    """ Pages by a continuation token returned with each page. """
+
+    def __init__(self, token_param='page_token',
+                 next_token='/next_page_token', items='/items'):
+        """ Create a pager passing the token of each page to the next.
+
+        :param token_param: name of the parameter passing the token
+        :param next_token: JSON pointer to the token of the next page
+            within each page
+        :param items: JSON pointer to the items within each page
+
+        A page without a token, or with an empty one, is the last page.
+        """
+        self.token_param = token_param
+        self.next_token = next_token
+        self.items = items
+        self.params = (token_param,)
+
+    def next(self, params, page):
+        token = resolve_pointer(page.data, self.next_token, None)
+        if not token:
+            return None
+        params = dict(params)
+        params[self.token_param] = token
+        return params
+
+
+# Marks the end of the pages produced by the prefetch thread
+_END = object()
+
+
+def pages(fetch, pager, params, prefetch=1):
+    """ Yield each page of a paged link.
+
+    :param fetch: function requesting the page for a dict of parameters
+    :param pager: the `Pager` of the link
+    :param params: parameters passed by the caller
+    :param prefetch: number of pages requested ahead in the background
+
+    """
+    params = pager.first(params)
+    if prefetch < 1:
+        while params is not None:
+            page = fetch(params)
+            yield page
+            params = pager.next(params, page)
+        return
+
+    results = queue.Queue()
+    # Each page requested takes a slot, released as the page is reached
+    slots = threading.Semaphore(prefetch)
+    stopped = threading.Event()
+
+    def produce(params):
+        try:
+            while params is not None:
+                slots.acquire()
+                if stopped.is_set():
+                    return
+                page = fetch(params)
+                params = pager.next(params, page)
+                results.put(page)
+        except Exception as e:
+            results.put(e)
+            return
+        results.put(_END)
+
+    thread = threading.Thread(target=produce, args=(params,),
+                              name='sleepwalker-prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            page = results.get()
+            if page is _END:
+                return
+            if isinstance(page, Exception):
+                raise page
+            slots.release()
+            yield page
+    finally:
+        stopped.set()
+        slots.release()
+
+
+def items(fetch, pager, params, prefetch=1):
+    """ Yield a fragment DataRep for each item of each page.
+
+    Arguments are as for `pages()`.
+    """
+    for page in pages(fetch, pager, params, prefetch):
+        for item in (page.at(pager.items) if pager.items else page):
+            yield item
@@ -0,0 +1,108 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements field projection, which pulls only the fields
+of a resource that are read, for servers whose 'get' link takes a
+query parameter listing the fields to return.
+
+A `Projection` is declared for a resource with
+`Service.add_projection()`.  It records the fields that are read
+through fragment DataReps of the resource, and once any are recorded,
+`pull()` requests only those:
+
+   >>> service.add_projection('books', Projection(param='fields'))
+   >>> books = service.bind('books')
+   >>> [book['title'].data for book in books]   # full pull, records title
+   >>> books.pull()                     # requests ?fields=title
+
+Fields are the properties of each item for arrays, and the properties
+of the resource itself for objects, so reading
+``books[3]['author']['name']`` records ``author``.  Fields are recorded
+for the resource schema, so all DataReps of the resource share them,
+as do the call sites reading them.
+
+Reading a field that is not in the data pulled, or reading a whole
+item, pulls all fields again, and the field is requested by later
+pulls.  Reading whole items, such as ``book.data`` or iterating over
+the keys of an item, turns the projection off for the resource, see
+`Projection.reset()`.  Setting the data of a fragment pulls all fields
+first, and `push()` raises DataNotSetError while the data is
+projected, so that a partial representation is never pushed.
+
+Reading the data of the root DataRep itself, such as ``books.data``,
+reads whole items, so it pulls all fields first if the data is
+projected.  Counting or iterating over the items of a collection
+reads none.  Projected pulls are not revalidated by ETag, see
+`DataRep.pull()`.
+
+"""
+
+__all__ = ['Projection']
+
+
+class Projection(object):
+    """ The fields read from a resource, requested by later pulls. """
+
+    def __init__(self, param='fields', separator=','):
+        """ Create a projection passing fields in the `param` parameter.
+
+        :param param: name of the query parameter of the 'get' link
+            listing the fields to return
+        :param separator: separator of the fields in the parameter
+
+        """
+        self.param = param
+        self.separator = separator
+
+        # Names of the fields read
+        self.fields = set()
+
+        # True once whole items are read, so that no projection applies
+        self.complete = False
+
+    def __repr__(self):
+        if self.complete:
+            return '<Projection complete>'
+        return '<Projection %s>' % sorted(self.fields)
+
+    def record(self, pointer, collection):
+        """ Record a read of the value at JSON `pointer`.
+
+        :param pointer: JSON pointer into the data of the resource
+        :param collection: True if the resource is an array of items
+
+        Returns the field read, or None if the read is of a whole
+        item, which makes the projection complete.
+        """
+        # Find the field without splitting the whole pointer, as this
+        # runs on every read
+        start = pointer.find('/', 1) if collection else 0
+        if start < 0 or start >= len(pointer):
+            self.complete = True
+            return None
+        end = pointer.find('/', start + 1)
+        field = pointer[start + 1:end] if end > 0 else pointer[start + 1:]
+        if '~' in field:
+            field = field.replace('~1', '/').replace('~0', '~')
+        if field not in self.fields:
+            self.fields.add(field)
+        return field
+
+    def reset(self):
+        """ Forget the fields read, so that the next pull is full. """
+        self.fields = set()
+        self.complete = False
+
+    def requested(self):
+        """ Return the fields for the next pull, or None for all fields. """
+        if self.complete or not self.fields:
+            return None
+        return frozenset(self.fields)
+
+    def params(self, fields):
+        """ Return the query parameters requesting `fields`. """
+        return {self.param: self.separator.join(sorted(fields))}
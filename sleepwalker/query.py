@@ -0,0 +1,457 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module defines the `Query` class, which filters, sorts, groups
+and projects the items of a pulled `ListDataRep` locally.
+
+Queries are built with `ListDataRep.query()` and chained methods, each
+of which returns a new `Query`:
+
+   >>> books = service.bind('books')
+   >>> q = (books.query()
+   ...      .where('publisher_id', '==', 3)
+   ...      .where('title', '!=', None)
+   ...      .order_by('-price', 'title'))
+   >>> q.rows()                  # raw item data
+   >>> q.fragments()             # item fragment DataReps
+   >>> q.project('id', 'title').rows()
+   >>> (books.query()
+   ...  .group_by('publisher_id')
+   ...  .aggregate(n=('count', None), total=('sum', 'price'))
+   ...  .rows())
+   [{'publisher_id': 3, 'n': 2, 'total': 42.5}, ...]
+
+Keys are property names of each item, or JSON pointers relative to
+each item for nested values.  A query makes a single pass over the raw
+data without creating DataReps, and only the fragments asked for by
+`fragments()` are created.  Where the item schema declares the type of
+a key, comparisons skip type checks and literals are converted to that
+type.  An equality or ``in`` condition on a key with an index (see
+`ListDataRep.build_index()`) scans only the indexed items.
+
+"""
+
+import copy
+import operator
+import functools
+
+from jsonpointer import JsonPointer
+import reschema.jsonschema
+
+from sleepwalker.exceptions import DuplicateKeyError, QueryError
+from sleepwalker.records import OBJECT_TYPES, MISSING, walk
+
+__all__ = ['Query']
+
+
+def _getter(key):
+    """ Return a function extracting `key` from an item, or MISSING. """
+    if not key.startswith('/'):
+        def get(item):
+            if isinstance(item, OBJECT_TYPES):
+                return item.get(key, MISSING)
+            return MISSING
+        return get
+
+    parts = JsonPointer(key).parts
+    return lambda item: walk(item, parts)
+
+
+def _get_name(key, row):
+    return row.get(key, MISSING)
+
+
+class _Aggregate(object):
+    """ Accumulator for one aggregate column of one group. """
+
+    FUNCTIONS = ('count', 'sum', 'min', 'max', 'avg')
+
+    def __init__(self, func):
+        self.func = func
+        self.count = 0
+        self.value = None
+
+    def add(self, value):
+        if self.func == 'count':
+            if value is not None:
+                self.count += 1
+            return
+        if value is None:
+            return
+        self.count += 1
+        if self.value is None:
+            self.value = value
+        elif self.func in ('sum', 'avg'):
+            self.value += value
+        elif self.func == 'min':
+            if value < self.value:
+                self.value = value
+        elif value > self.value:
+            self.value = value
+
+    def result(self):
+        if self.func == 'count':
+            return self.count
+        if self.func == 'avg':
+            return self.value / self.count if self.count else None
+        return self.value
+
+
+class Query(object):
+    """ A local query over the items of a ListDataRep. """
+
+    OPERATORS = {
+        '==': operator.eq,
+        '!=': operator.ne,
+        '<': operator.lt,
+        '<=': operator.le,
+        '>': operator.gt,
+        '>=': operator.ge,
+        'in': lambda a, b: a in b,
+    }
+
+    # Schema types whose values compare without type checks
+    TYPES = {'integer': (int, float), 'number': (int, float),
+             'string': (str,), 'boolean': (bool,)}
+
+    def __init__(self, datarep):
+        """ Create a query over the items of ListDataRep `datarep`. """
+        self.datarep = datarep
+        self._conditions = []
+        self._filters = []
+        self._order = []
+        self._group = None
+        self._aggregates = None
+        self._projection = None
+        self._limit = None
+        self._item_schema = datarep.jsonschema.by_pointer('/0')
+
+    def __repr__(self):
+        return '<Query %s>' % (self.datarep.fragment or '#')
+
+    def _clone(self):
+        query = copy.copy(self)
+        query._conditions = list(self._conditions)
+        query._filters = list(self._filters)
+        query._order = list(self._order)
+        return query
+
+    def _type_of(self, key):
+        """ Return the schema type name for `key`, or None if unknown. """
+        try:
+            js = self._item_schema.by_pointer(
+                key if key.startswith('/') else '/' + key)
+        except Exception:
+            return None
+        if isinstance(js, reschema.jsonschema.DynamicSchema):
+            js = js.refschema
+        typestr = getattr(js, 'typestr', None)
+        return typestr if typestr in self.TYPES else None
+
+    def _coerce(self, key, typestr, value):
+        if value is None or typestr is None:
+            return value
+        try:
+            if typestr == 'integer' and isinstance(value, str):
+                return int(value)
+            if typestr == 'number' and isinstance(value, str):
+                return float(value)
+        except ValueError:
+            raise QueryError('Invalid %s value %r for %s' %
+                             (typestr, value, key))
+        if typestr == 'string' and not isinstance(value, str):
+            return str(value)
+        return value
+
+    #
+    # Builder methods
+    #
+    def where(self, key, op, value):
+        """ Keep only items for which `key` `op` `value` is true.
+
+        :param key: property name or item-relative JSON pointer
+        :param op: one of ``==``, ``!=``, ``<``, ``<=``, ``>``,
+            ``>=`` or ``in``
+        :param value: value to compare with, or a collection for ``in``
+
+        Items without `key` never match.  Ordering comparisons between
+        values of different types do not match either.
+
+        :raises QueryError: if `op` is unknown, or if a string `value`
+            is not a valid literal of the integer or number type of
+            `key` in the schema
+        """
+        if op not in self.OPERATORS:
+            raise QueryError('Unknown operator %r' % op)
+
+        typestr = self._type_of(key)
+        if op == 'in':
+            value = frozenset(self._coerce(key, typestr, v) for v in value)
+        else:
+            value = self._coerce(key, typestr, value)
+
+        query = self._clone()
+        query._conditions.append((key, op, value, typestr))
+        return query
+
+    def filter(self, predicate):
+        """ Keep only items for which `predicate(item)` is true. """
+        query = self._clone()
+        query._filters.append(predicate)
+        return query
+
+    def order_by(self, *keys):
+        """ Sort by `keys`, in descending order for keys prefixed by '-'.
+
+        Items without a key, or with a null value, sort first.  After
+        `group_by()`, keys name the group keys and aggregates.
+        """
+        query = self._clone()
+        for key in keys:
+            if key.startswith('-'):
+                query._order.append((key[1:], True))
+            else:
+                query._order.append((key, False))
+        return query
+
+    def group_by(self, *keys):
+        """ Group items by the values of `keys`, see `aggregate()`. """
+        query = self._clone()
+        query._group = keys
+        return query
+
+    def aggregate(self, **aggregates):
+        """ Compute aggregates per group, each as ``name=(func, key)``.
+
+        `func` is one of 'count', 'sum', 'min', 'max' or 'avg' and
+        null or missing values are ignored.  Use ``('count', None)``
+        to count the items in each group.
+        """
+        for name, (func, key) in aggregates.items():
+            if func not in _Aggregate.FUNCTIONS:
+                raise QueryError('Unknown aggregate function %r' % func)
+        query = self._clone()
+        query._aggregates = aggregates
+        return query
+
+    def project(self, *keys, **named):
+        """ Return rows with only the given keys.
+
+        Positional keys name themselves, keyword arguments map a row
+        name to a key.  Missing values are returned as None.
+        """
+        projection = [(key, key) for key in keys] + list(named.items())
+        query = self._clone()
+        query._projection = projection
+        return query
+
+    def limit(self, count):
+        """ Return at most `count` results. """
+        query = self._clone()
+        query._limit = count
+        return query
+
+    #
+    # Execution
+    #
+    def _predicate(self, key, op, value, typestr):
+        get = _getter(key)
+        compare = self.OPERATORS[op]
+
+        if op == 'in':
+            def match(item):
+                v = get(item)
+                try:
+                    return v is not MISSING and v in value
+                except TypeError:
+                    # Unhashable values
+                    return False
+        elif typestr is not None and value is not None:
+            # Values of the declared type compare directly
+            types = self.TYPES[typestr]
+
+            def match(item):
+                v = get(item)
+                if v.__class__ in types:
+                    return compare(v, value)
+                return (v is not MISSING and v is not None and
+                        _safe(compare, v, value))
+        else:
+            def match(item):
+                v = get(item)
+                return v is not MISSING and _safe(compare, v, value)
+        return match
+
+    def _candidates(self, data):
+        """ Return positions of the items to scan, using an index if any. """
+        for key, op, value, typestr in self._conditions:
+            if op not in ('==', 'in'):
+                continue
+            index = self.datarep._index(key)
+            if index is None:
+                continue
+
+            values = value if op == 'in' else [value]
+            positions = []
+            for v in values:
+                try:
+                    found = index.position(v)
+                except (KeyError, TypeError):
+                    continue
+                except DuplicateKeyError:
+                    # A unique index that cannot be built is no help,
+                    # the conditions are still checked by the scan
+                    return range(len(data))
+                if index.unique:
+                    positions.append(found)
+                else:
+                    positions.extend(found)
+            return sorted(set(positions)) if op == 'in' else positions
+        return range(len(data))
+
+    def _scan(self):
+        """ Yield (position, item) for each matching item. """
+        data = self.datarep.data
+        predicates = [self._predicate(*c) for c in self._conditions]
+        predicates.extend(self._filters)
+
+        for position in self._candidates(data):
+            item = data[position]
+            for predicate in predicates:
+                if not predicate(item):
+                    break
+            else:
+                yield position, item
+
+    def _sort(self, results, get_row):
+        """ Sort `results` in place by the order_by keys. """
+        # Stable sorts from the last key to the first
+        for key, reverse in reversed(self._order):
+            if self._group is None:
+                get = _getter(key)
+            else:
+                # Grouped rows are keyed by name, even for pointers
+                get = functools.partial(_get_name, key)
+            if self._group is None and self._type_of(key):
+                def sort_key(result):
+                    v = get(get_row(result))
+                    if v is MISSING or v is None:
+                        return (0, 0)
+                    return (1, v)
+            else:
+                def sort_key(result):
+                    v = get(get_row(result))
+                    if v is MISSING or v is None:
+                        return (0, '', 0)
+                    if isinstance(v, (int, float)):
+                        return (1, '', v)
+                    return (1, type(v).__name__, v)
+            results.sort(key=sort_key, reverse=reverse)
+
+    def _grouped(self):
+        group_getters = [(key, _getter(key)) for key in self._group]
+        aggregates = self._aggregates or {}
+        agg_getters = [(name, func, _getter(key) if key else None)
+                       for name, (func, key) in aggregates.items()]
+
+        groups = {}
+        for position, item in self._scan():
+            values = tuple(get(item) for key, get in group_getters)
+            values = tuple(None if v is MISSING else v for v in values)
+            accumulators = groups.get(values)
+            if accumulators is None:
+                accumulators = [_Aggregate(func)
+                                for name, func, get in agg_getters]
+                groups[values] = accumulators
+            for acc, (name, func, get) in zip(accumulators, agg_getters):
+                if get is None:
+                    acc.add(True)
+                else:
+                    v = get(item)
+                    acc.add(None if v is MISSING else v)
+
+        rows = []
+        for values, accumulators in groups.items():
+            row = dict(zip(self._group, values))
+            for acc, (name, func, get) in zip(accumulators, agg_getters):
+                row[name] = acc.result()
+            rows.append(row)
+        return rows
+
+    def _matches(self):
+        """ Return the list of matching (position, item) in result order. """
+        if self._group is not None:
+            raise QueryError('Grouped queries only return rows')
+        if self._order:
+            results = list(self._scan())
+            self._sort(results, operator.itemgetter(1))
+        elif self._limit is not None:
+            results = []
+            if self._limit > 0:
+                for result in self._scan():
+                    results.append(result)
+                    if len(results) >= self._limit:
+                        break
+        else:
+            results = list(self._scan())
+        if self._limit is not None:
+            del results[self._limit:]
+        return results
+
+    def rows(self):
+        """ Return the results as a list of raw data.
+
+        This is the item data itself unless `project()` or `group_by()`
+        was used, in which case each row is a new dict.
+        """
+        if self._group is not None:
+            rows = self._grouped()
+            if self._order:
+                self._sort(rows, lambda row: row)
+            if self._limit is not None:
+                del rows[self._limit:]
+        else:
+            rows = [item for position, item in self._matches()]
+
+        if self._projection is not None:
+            if self._group is None:
+                getters = [(name, _getter(key))
+                           for name, key in self._projection]
+            else:
+                getters = [(name, functools.partial(_get_name, key))
+                           for name, key in self._projection]
+            rows = [dict((name, None if v is MISSING else v)
+                         for name, v in ((name, get(row))
+                                         for name, get in getters))
+                    for row in rows]
+        return rows
+
+    def fragments(self):
+        """ Return the matching items as a list of fragment DataReps.
+
+        :raises QueryError: for queries using `group_by()`
+        """
+        item = self.datarep._item_factory()
+        return [item(position) for position, _ in self._matches()]
+
+    def positions(self):
+        """ Return the array positions of the matching items. """
+        return [position for position, _ in self._matches()]
+
+    def count(self):
+        """ Return the number of results. """
+        if self._group is not None:
+            return len(self.rows())
+        return len(self._matches())
+
+
+def _safe(compare, a, b):
+    try:
+        return compare(a, b)
+    except TypeError:
+        # Ordering values of different types is never true
+        return False
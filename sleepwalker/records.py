@@ -0,0 +1,362 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements the optional record decode mode, in which JSON
+objects described by a reschema `Object` are held in generated record
+classes with ``__slots__`` rather than in dicts.
+
+Record mode is enabled by setting ``sleepwalker.datarep.DECODE_RECORDS``
+to True.  Data received by `pull()`, `push()`, `create()` and
+`execute()` is then converted by `decode()`, and data sent to the
+server is converted back by `encode()`.
+
+Records are mutable mappings, so code indexing into `DataRep.data`,
+fragments and JSON pointers work unchanged:
+
+   >>> book = books[0].full()
+   >>> book.data
+   Record<book>({'id': 1, 'title': 'My book', 'author_ids': [1, 9]})
+   >>> book.data['title']
+   'My book'
+   >>> book['title'].data = 'New title'
+
+Each property declared in the schema is stored in its own slot, and
+any other properties in a per-record dict that is only created when
+needed.  A record class is generated once per schema and shared.
+Records keep the order of their members as dicts do, so `encode()`
+reproduces the decoded JSON exactly, member order included.
+
+"""
+
+import collections.abc
+
+import reschema.jsonschema
+
+__all__ = ['Record', 'record_class', 'decode', 'encode', 'escape', 'walk',
+           'OBJECT_TYPES', 'MISSING']
+
+
+class Record(collections.abc.MutableMapping):
+    """ Base class of generated record classes. """
+
+    # _order holds the keys in member order, or None if the members
+    # are in schema order, followed by other properties
+    __slots__ = ('_extra', '_order')
+
+    # Set on each generated class
+    _schema = None
+    _fields = ()
+    _slot_of = {}
+
+    def __init__(self, *args, **kwargs):
+        self._extra = None
+        self._order = None
+        self.update(*args, **kwargs)
+
+    def __getitem__(self, key):
+        slot = self._slot_of.get(key)
+        if slot is not None:
+            try:
+                return getattr(self, slot)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        added = key not in self
+        if added:
+            keys = tuple(self)
+        slot = self._slot_of.get(key)
+        if slot is not None:
+            setattr(self, slot, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+        if added:
+            # As for a dict, the new member comes last
+            keys += (key,)
+            if self._order is not None or tuple(self._members()) != keys:
+                self._order = keys
+
+    def __delitem__(self, key):
+        slot = self._slot_of.get(key)
+        if slot is not None:
+            try:
+                delattr(self, slot)
+            except AttributeError:
+                raise KeyError(key)
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+        if self._order is not None:
+            self._order = tuple(k for k in self._order if k != key)
+
+    def __contains__(self, key):
+        slot = self._slot_of.get(key)
+        if slot is not None:
+            return hasattr(self, slot)
+        return self._extra is not None and key in self._extra
+
+    def get(self, key, default=None):
+        slot = self._slot_of.get(key)
+        if slot is not None:
+            return getattr(self, slot, default)
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+
+    def __iter__(self):
+        if self._order is not None:
+            return iter(self._order)
+        return self._members()
+
+    def _members(self):
+        """ Yield the keys in schema order, followed by other keys. """
+        for name, slot in self._slot_of.items():
+            if hasattr(self, slot):
+                yield name
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        count = sum(1 for slot in self._slot_of.values()
+                    if hasattr(self, slot))
+        return count + (len(self._extra) if self._extra else 0)
+
+    def __repr__(self):
+        return 'Record<%s>(%r)' % (self._schema.name, self.to_dict())
+
+    def __reduce__(self):
+        # Generated classes cannot be found by name, so copy and pickle
+        # as a plain dict.
+        return (dict, (self.to_dict(),))
+
+    def __copy__(self):
+        record = self.__class__.__new__(self.__class__)
+        for slot in self._slot_of.values():
+            try:
+                setattr(record, slot, getattr(self, slot))
+            except AttributeError:
+                pass
+        record._extra = dict(self._extra) if self._extra else None
+        record._order = self._order
+        return record
+
+    def __deepcopy__(self, memo):
+        return decode(self._schema, encode(self))
+
+    def to_dict(self):
+        """ Return the members of this record as a new dict.
+
+        Nested records are not converted, see `encode()` for that.
+        """
+        return dict(self.items())
+
+
+# Types of decoded JSON objects, for isinstance() checks
+OBJECT_TYPES = (dict, Record)
+
+
+class _Missing(object):
+    """ Marker for a value that does not exist, see `walk()`. """
+
+    def __repr__(self):
+        return 'MISSING'
+
+
+MISSING = _Missing()
+
+
+def escape(key):
+    """ Escape an object key for use in a JSON pointer. """
+    key = str(key)
+    if '~' in key or '/' in key:
+        key = key.replace('~', '~0').replace('/', '~1')
+    return key
+
+
+def walk(value, parts):
+    """ Return the value at `parts` within JSON `value`, or MISSING.
+
+    :param parts: the unescaped reference tokens of a JSON pointer,
+        that is object keys and array indices as strings
+
+    Nothing is raised for paths that do not exist, including indices
+    out of range or into values that are not containers.
+    """
+    for part in parts:
+        if isinstance(value, OBJECT_TYPES):
+            value = value.get(part, MISSING)
+            if value is MISSING:
+                return MISSING
+        elif isinstance(value, list):
+            try:
+                value = value[int(part)]
+            except (ValueError, IndexError):
+                return MISSING
+        else:
+            return MISSING
+    return value
+
+
+# Generated record classes by schema
+_classes = {}
+
+
+def _resolve(jsonschema):
+    if isinstance(jsonschema, reschema.jsonschema.DynamicSchema):
+        return jsonschema.refschema
+    return jsonschema
+
+
+def record_class(jsonschema):
+    """ Return the record class for object schema `jsonschema`. """
+    jsonschema = _resolve(jsonschema)
+    cls = _classes.get(jsonschema)
+    if cls is None:
+        fields = tuple(jsonschema.properties.keys())
+        # Property names need not be identifiers, so number the slots
+        slot_of = dict((name, '_%d' % i) for i, name in enumerate(fields))
+        name = str(jsonschema.name or 'object')
+        cls = type('Record_' + ''.join(c if c.isalnum() else '_'
+                                       for c in name),
+                   (Record,),
+                   {'__slots__': tuple(slot_of.values()),
+                    '_schema': jsonschema,
+                    '_fields': fields,
+                    '_slot_of': slot_of})
+        _classes[jsonschema] = cls
+    return cls
+
+
+class _ObjectDecoder(object):
+    def __init__(self, jsonschema):
+        self.cls = record_class(jsonschema)
+        self.slot_of = self.cls._slot_of
+        self.index_of = dict((name, i)
+                             for i, name in enumerate(self.cls._fields))
+        self.children = {}
+        self.extra = None
+
+        # Member orders other than the schema order, shared by the
+        # records with that order
+        self.orders = {}
+
+    def build(self, jsonschema):
+        # Called after registration so that recursive schemas resolve
+        # to this decoder.
+        for name, js in jsonschema.properties.items():
+            decoder = _decoder(js)
+            if decoder is not None:
+                self.children[name] = decoder
+        if isinstance(jsonschema.additional_properties,
+                      reschema.jsonschema.Schema):
+            self.extra = _decoder(jsonschema.additional_properties)
+
+    def __call__(self, value):
+        if value.__class__ is not dict:
+            return value
+        record = self.cls.__new__(self.cls)
+        extra = None
+        slot_of = self.slot_of
+        index_of = self.index_of
+        children = self.children
+        # Index of the last declared property, or the number of them
+        # once other properties are seen, to check for schema order
+        last = -1
+        ordered = True
+        for key, v in value.items():
+            slot = slot_of.get(key)
+            if slot is not None:
+                index = index_of[key]
+                if index < last:
+                    ordered = False
+                last = index
+                decoder = children.get(key)
+                if decoder is not None:
+                    v = decoder(v)
+                setattr(record, slot, v)
+            else:
+                last = len(index_of)
+                if self.extra is not None:
+                    v = self.extra(v)
+                if extra is None:
+                    extra = {}
+                extra[key] = v
+        record._extra = extra
+        if ordered:
+            record._order = None
+        else:
+            keys = tuple(value)
+            record._order = self.orders.setdefault(keys, keys)
+        return record
+
+
+class _ArrayDecoder(object):
+    def __init__(self, jsonschema):
+        self.items = None
+
+    def build(self, jsonschema):
+        self.items = _decoder(jsonschema.items)
+
+    def __call__(self, value):
+        decoder = self.items
+        if decoder is None or value.__class__ is not list:
+            return value
+        return [decoder(v) for v in value]
+
+
+# Decoders by schema, None for schemas with nothing to decode
+_decoders = {}
+
+
+def _decoder(jsonschema):
+    jsonschema = _resolve(jsonschema)
+    try:
+        return _decoders[jsonschema]
+    except KeyError:
+        pass
+
+    if isinstance(jsonschema, reschema.jsonschema.Object):
+        decoder = _ObjectDecoder(jsonschema)
+    elif isinstance(jsonschema, reschema.jsonschema.Array):
+        decoder = _ArrayDecoder(jsonschema)
+    else:
+        decoder = None
+
+    _decoders[jsonschema] = decoder
+    if decoder is not None:
+        decoder.build(jsonschema)
+    return decoder
+
+
+def decode(jsonschema, value):
+    """ Convert objects in JSON data `value` to records per `jsonschema`.
+
+    `value` itself is not modified.  Objects with no schema, or a
+    schema other than `Object`, such as a ``oneOf``, are left as
+    dicts.
+    """
+    decoder = _decoder(jsonschema)
+    if decoder is None:
+        return value
+    return decoder(value)
+
+
+def encode(value):
+    """ Return JSON data `value` with all records converted to dicts. """
+    if isinstance(value, Record):
+        return dict((k, encode(v)) for k, v in value.items())
+    if value.__class__ is dict:
+        return dict((k, encode(v)) for k, v in value.items())
+    if value.__class__ is list:
+        return [encode(v) for v in value]
+    return value
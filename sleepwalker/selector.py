@@ -0,0 +1,402 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements the small path language used by `DataRep.select()`
+to find values in a tree of JSON data.
+
+A selector is a sequence of steps applied to the data, starting from
+an optional leading ``$``:
+
+=======================  ===============================================
+``.name``, ``['name']``  the ``name`` property of an object
+``.*``, ``[*]``          every property value of an object or item of
+                         an array
+``[2]``, ``[-1]``        a single array item
+``[1:10:2]``             a slice of an array
+``..name``, ``..*``      recursive descent: apply the step to the
+                         current value and to all of its descendants
+``[?(<filter>)]``        every property value or array item for which
+                         the filter is true
+=======================  ===============================================
+
+Filters compare paths relative to the candidate value, written as
+``@`` followed by ``.name`` or ``[index]`` steps, with JSON literals
+(numbers, quoted strings, ``true``, ``false`` and ``null``) using
+``==``, ``!=``, ``<``, ``<=``, ``>`` and ``>=``.  A path on its own
+tests that the value exists and is not ``null``.  Terms may be
+combined with ``&&``, ``||``, ``!`` and parentheses.
+
+Example:
+   >>> books.select('$[?(@.publisher_id == 3 && @.chapters)]')
+   >>> book.select('$..chapters[*].heading')
+
+Selectors are compiled once per expression with `compile()`, which
+caches the result, and run over raw data so that no DataRep objects
+are created for values that do not match.
+
+"""
+
+import re
+import functools
+
+from sleepwalker.exceptions import SelectorError
+from sleepwalker.records import OBJECT_TYPES, MISSING, escape, walk
+
+__all__ = ['Selector', 'compile']
+
+CONTAINER_TYPES = (list,) + OBJECT_TYPES
+
+
+def _children(value, pointer):
+    """ Yield (value, pointer) for each child of a container value. """
+    if isinstance(value, OBJECT_TYPES):
+        for key, child in value.items():
+            yield child, pointer + '/' + escape(key)
+    elif isinstance(value, list):
+        for index, child in enumerate(value):
+            yield child, pointer + '/' + str(index)
+
+
+def _descendants(value, pointer):
+    """ Yield (value, pointer) for `value` and all values below it. """
+    stack = [(value, pointer)]
+    while stack:
+        value, pointer = stack.pop()
+        yield value, pointer
+        if isinstance(value, CONTAINER_TYPES):
+            # Reversed so that values are produced in document order.
+            stack.extend(reversed(list(_children(value, pointer))))
+
+
+class Selector(object):
+    """ A compiled selector expression.
+
+    Use `compile()` rather than instantiating this class directly so
+    that compiled expressions are shared.
+    """
+
+    TOKEN_RE = re.compile(r'''
+        \s*(?:
+          (?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+        | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+        | (?P<name>[A-Za-z_][\w\-]*)
+        | (?P<op>\.\.|==|!=|<=|>=|&&|\|\||\[\?\(|[$@.*\[\]():<>!])
+        )''', re.VERBOSE)
+
+    OPERATORS = {
+        '==': lambda a, b: a == b,
+        '!=': lambda a, b: a != b,
+        '<': lambda a, b: a < b,
+        '<=': lambda a, b: a <= b,
+        '>': lambda a, b: a > b,
+        '>=': lambda a, b: a >= b,
+    }
+
+    LITERALS = {'true': True, 'false': False, 'null': None}
+
+    def __init__(self, expr):
+        self.expr = expr
+        self._tokens = self._tokenize(expr)
+        self._pos = 0
+        self.steps = self._parse_selector()
+        del self._tokens
+
+    def __repr__(self):
+        return '<Selector %r>' % self.expr
+
+    def find(self, data, pointer=''):
+        """ Yield (pointer, value) pairs for each match in `data`.
+
+        :param data: the raw data to search
+        :param pointer: JSON pointer of `data` itself, which is used
+            as the prefix of all pointers yielded
+        """
+        matches = [(data, pointer)]
+        for step in self.steps:
+            matches = step(matches)
+        for value, pointer in matches:
+            yield pointer, value
+
+    #
+    # Tokenizer and parser
+    #
+    def _tokenize(self, expr):
+        tokens = []
+        pos = 0
+        end = len(expr.rstrip())
+        while pos < end:
+            m = self.TOKEN_RE.match(expr, pos)
+            if not m or m.end() == pos:
+                raise SelectorError('Invalid selector %r at position %d' %
+                                    (expr, pos))
+            kind = m.lastgroup
+            tokens.append((kind, m.group(kind)))
+            pos = m.end()
+        return tokens
+
+    def _peek(self, offset=0):
+        index = self._pos + offset
+        if index < len(self._tokens):
+            return self._tokens[index]
+        return (None, None)
+
+    def _next(self):
+        token = self._peek()
+        if token[0] is None:
+            raise SelectorError('Unexpected end of selector %r' % self.expr)
+        self._pos += 1
+        return token
+
+    def _expect(self, value):
+        kind, token = self._next()
+        if kind != 'op' or token != value:
+            raise SelectorError('Expected %r but found %r in selector %r' %
+                                (value, token, self.expr))
+
+    def _accept(self, value):
+        kind, token = self._peek()
+        if kind == 'op' and token == value:
+            self._pos += 1
+            return True
+        return False
+
+    def _parse_selector(self):
+        steps = []
+        self._accept('$')
+        while self._peek()[0] is not None:
+            if self._accept('..'):
+                steps.append(self._recursive(self._parse_child(dotted=True)))
+            elif self._accept('.'):
+                steps.append(self._parse_child(dotted=True))
+            elif self._peek() == ('op', '[') or self._peek() == ('op', '[?('):
+                steps.append(self._parse_child(dotted=False))
+            else:
+                raise SelectorError('Unexpected %r in selector %r' %
+                                    (self._peek()[1], self.expr))
+        return steps
+
+    def _parse_child(self, dotted):
+        """ Parse one step after '.' or '..', or a bracketed step. """
+        kind, token = self._peek()
+        if dotted and kind == 'name':
+            self._pos += 1
+            return self._member(token)
+        if dotted and token == '*':
+            self._pos += 1
+            return self._wildcard()
+        if self._accept('[?('):
+            predicate = self._parse_or()
+            self._expect(')')
+            self._expect(']')
+            return self._filter(predicate)
+        if self._accept('['):
+            step = self._parse_bracket()
+            self._expect(']')
+            return step
+        raise SelectorError('Unexpected %r in selector %r' %
+                            (token, self.expr))
+
+    def _parse_bracket(self):
+        kind, token = self._peek()
+        if self._accept('*'):
+            return self._wildcard()
+        if kind == 'string':
+            self._pos += 1
+            return self._member(self._string(token))
+
+        # An index or a slice: [i], [start:stop], [start:stop:step]
+        parts = [None]
+        while self._peek() != ('op', ']'):
+            if self._accept(':'):
+                parts.append(None)
+                continue
+            kind, token = self._next()
+            if kind != 'number' or parts[-1] is not None:
+                raise SelectorError('Invalid index %r in selector %r' %
+                                    (token, self.expr))
+            try:
+                parts[-1] = int(token)
+            except ValueError:
+                raise SelectorError('Invalid index %r in selector %r' %
+                                    (token, self.expr))
+        if len(parts) == 1:
+            if parts[0] is None:
+                raise SelectorError('Empty index in selector %r' % self.expr)
+            return self._index(parts[0])
+        if len(parts) > 3:
+            raise SelectorError('Invalid slice in selector %r' % self.expr)
+        return self._slice(slice(*parts))
+
+    def _parse_or(self):
+        terms = [self._parse_and()]
+        while self._accept('||'):
+            terms.append(self._parse_and())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda value: any(term(value) for term in terms)
+
+    def _parse_and(self):
+        terms = [self._parse_not()]
+        while self._accept('&&'):
+            terms.append(self._parse_not())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda value: all(term(value) for term in terms)
+
+    def _parse_not(self):
+        if self._accept('!'):
+            term = self._parse_not()
+            return lambda value: not term(value)
+        if self._accept('('):
+            term = self._parse_or()
+            self._expect(')')
+            return term
+        return self._parse_comparison()
+
+    def _parse_comparison(self):
+        left = self._parse_operand()
+        kind, token = self._peek()
+        if kind != 'op' or token not in self.OPERATORS:
+            if left[0] != 'path':
+                raise SelectorError('Expected a comparison in selector %r' %
+                                    self.expr)
+            getter = left[1]
+            return lambda value: getter(value) not in (MISSING, None)
+
+        self._pos += 1
+        right = self._parse_operand()
+        op = self.OPERATORS[token]
+        return self._comparison(op, left, right)
+
+    def _parse_operand(self):
+        kind, token = self._next()
+        if kind == 'op' and token == '@':
+            return ('path', self._parse_path())
+        if kind == 'number':
+            return ('literal', self._number(token))
+        if kind == 'string':
+            return ('literal', self._string(token))
+        if kind == 'name' and token in self.LITERALS:
+            return ('literal', self.LITERALS[token])
+        raise SelectorError('Unexpected %r in selector %r' %
+                            (token, self.expr))
+
+    def _parse_path(self):
+        """ Parse the steps of a relative filter path after '@'. """
+        keys = []
+        while True:
+            if self._accept('.'):
+                kind, token = self._next()
+                if kind == 'name':
+                    keys.append(token)
+                elif kind == 'number' and token.isdigit():
+                    keys.append(int(token))
+                else:
+                    raise SelectorError('Invalid path %r in selector %r' %
+                                        (token, self.expr))
+            elif self._peek() == ('op', '['):
+                self._pos += 1
+                kind, token = self._next()
+                if kind == 'string':
+                    keys.append(self._string(token))
+                elif kind == 'number':
+                    keys.append(int(token))
+                else:
+                    raise SelectorError('Invalid path %r in selector %r' %
+                                        (token, self.expr))
+                self._expect(']')
+            else:
+                break
+
+        parts = [str(key) for key in keys]
+        return lambda value: walk(value, parts)
+
+    def _number(self, token):
+        try:
+            return int(token)
+        except ValueError:
+            return float(token)
+
+    def _string(self, token):
+        return re.sub(r'\\(.)', r'\1', token[1:-1])
+
+    #
+    # Step implementations.  Each step maps an iterable of
+    # (value, pointer) pairs to another such iterable.
+    #
+    def _member(self, name):
+        escaped = '/' + escape(name)
+
+        def step(matches):
+            for value, pointer in matches:
+                if isinstance(value, OBJECT_TYPES) and name in value:
+                    yield value[name], pointer + escaped
+        return step
+
+    def _wildcard(self):
+        def step(matches):
+            for value, pointer in matches:
+                yield from _children(value, pointer)
+        return step
+
+    def _index(self, index):
+        def step(matches):
+            for value, pointer in matches:
+                if isinstance(value, list):
+                    i = index if index >= 0 else len(value) + index
+                    if 0 <= i < len(value):
+                        yield value[i], pointer + '/' + str(i)
+        return step
+
+    def _slice(self, key):
+        def step(matches):
+            for value, pointer in matches:
+                if isinstance(value, list):
+                    for i in range(*key.indices(len(value))):
+                        yield value[i], pointer + '/' + str(i)
+        return step
+
+    def _filter(self, predicate):
+        def step(matches):
+            for value, pointer in matches:
+                for child, child_pointer in _children(value, pointer):
+                    if predicate(child):
+                        yield child, child_pointer
+        return step
+
+    def _recursive(self, inner):
+        def step(matches):
+            for value, pointer in matches:
+                yield from inner(_descendants(value, pointer))
+        return step
+
+    def _comparison(self, op, left, right):
+        def resolve(operand):
+            kind, operand = operand
+            if kind == 'literal':
+                return lambda value: operand
+            return operand
+
+        left, right = resolve(left), resolve(right)
+
+        def compare(value):
+            a = left(value)
+            b = right(value)
+            if a is MISSING or b is MISSING:
+                return False
+            try:
+                return op(a, b)
+            except TypeError:
+                # Ordering values of different types is never true.
+                return False
+        return compare
+
+
+@functools.lru_cache(maxsize=256)
+def compile(expr):
+    """ Return a compiled `Selector` for `expr`, cached by expression. """
+    return Selector(expr)
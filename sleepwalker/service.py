@@ -101,8 +101,9 @@ services:
 .. code-block:: python
 
    # Ask the ServiceManager for the bookstore Service object
-   >>> bookstore = svc_mgr.find_by_name(host='http://bookstore-server.com:8080',
-                                      name='bookstore', version='1.0')
+   >>> bookstore = svc_mgr.find_by_name(
+   ...     host='http://bookstore-server.com:8080',
+   ...     name='bookstore', version='1.0')
 
    # Bind a DataRep to a 'book' instance and retrieve data for this
    # book from the server
@@ -229,12 +230,26 @@ authentication for multiple hosts.
 
 """
 
+import re
 import copy
+import weakref
 import logging
+import urllib.parse
+from collections import OrderedDict
 
+from requests.structures import CaseInsensitiveDict
+import uritemplate
+import reschema.jsonschema
+from reschema.exceptions import MissingParameter
+from reschema.util import uritemplate_required_variables
+
+from sleepwalker import datarep, records, snapshot
 from sleepwalker.datarep import Schema
+from sleepwalker.lazyjson import LazyJson
+from sleepwalker.connection import JsonResult
 from sleepwalker.exceptions import \
-    ServiceException, ResourceException, TypeException
+    ServiceException, ResourceException, TypeException, LinkError, \
+    InvalidParameter
 
 logger = logging.getLogger(__name__)
 
@@ -244,7 +259,13 @@ class ServiceManager(object):
 
     A single `ServiceManager` instance creates `Service` instances as
     needed, caching instances as they are created.  A unique `Service`
-    is identified by the tuple <`service id`, `host`, `instance`>
+    is identified by the tuple <`service id`, `host`, `instance`, `auth`>
+
+    Cached services are held weakly, except for the most recently used
+    `MAX_RECENT_SERVICES` which are also held by a strong reference.  This
+    keeps the cache bounded while guaranteeing that any `Service` still in
+    use (for example by a `DataRep`) is found again rather than recreated.
+    As with `ConnectionManager`, the `auth` object must be hashable.
 
     The `auth` parameter accepted by `find_by_id()` and `find_by_name()`
     is an object representing authentication credentials.  This object
@@ -262,6 +283,11 @@ class ServiceManager(object):
 
     """
 
+    # Number of most recently used `Service` instances that are held
+    # by a strong reference.  Beyond that, instances stay cached only
+    # as long as something else (such as a DataRep) refers to them.
+    MAX_RECENT_SERVICES = 64
+
     def __init__(self, servicedef_manager, connection_manager):
         """ Create a `ServiceManager` to manager `Service` instances
 
@@ -277,6 +303,43 @@ class ServiceManager(object):
         self.servicedef_manager = servicedef_manager
         self.connection_manager = connection_manager
 
+        # Index of services by <service id, host, instance, auth>
+        self.services = weakref.WeakValueDictionary()
+
+        # Bounded LRU of strong references to recently used services
+        self._recent = OrderedDict()
+
+    def reset(self):
+        """ Forget all cached services. """
+        self.services = weakref.WeakValueDictionary()
+        self._recent = OrderedDict()
+
+    def _cached(self, key):
+        service = self.services.get(key)
+        if service is not None:
+            logger.debug("Reusing existing service: %s, %s, %s" %
+                         (key[1], key[0], key[2] or '<no instance>'))
+            self._touch(key, service)
+        return service
+
+    def _touch(self, key, service):
+        recent = self._recent
+        recent[key] = service
+        recent.move_to_end(key)
+        while len(recent) > self.MAX_RECENT_SERVICES:
+            recent.popitem(last=False)
+
+    def _create(self, key, servicedef, host, instance, auth):
+        logger.info('ServiceManager instantiating new service: %s, %s, %s' %
+                    (host, servicedef.id, instance or '<no instance>'))
+        service = Service(servicedef, host=host, instance=instance,
+                          service_manager=self,
+                          connection_manager=self.connection_manager,
+                          auth=auth)
+        self.services[key] = service
+        self._touch(key, service)
+        return service
+
     def find_by_id(self, host, id, instance=None, auth=None):
         """ Find a Service object by service id.
 
@@ -286,15 +349,15 @@ class ServiceManager(object):
             service relative to the same host
         :param auth: object representing authentication credentials
 
-        """
+        Repeated calls with the same arguments return the same
+        `Service` instance.
 
-        logger.info('ServiceManager instantiating new service: %s, %s, %s' %
-                    (host, id, instance or '<no instance>'))
-        servicedef = self.servicedef_manager.find_by_id(id)
-        service = Service(servicedef, host=host, instance=instance,
-                          service_manager=self,
-                          connection_manager=self.connection_manager,
-                          auth=auth)
+        """
+        key = (id, host, instance, auth)
+        service = self._cached(key)
+        if service is None:
+            servicedef = self.servicedef_manager.find_by_id(id)
+            service = self._create(key, servicedef, host, instance, auth)
         return service
 
     def find_by_name(self, host, name, version,
@@ -310,15 +373,43 @@ class ServiceManager(object):
             service relative to the same host
         :param auth: object representing authentication credentials
 
+        Repeated calls with the same arguments return the same
+        `Service` instance.
+
         """
         servicedef = (self.servicedef_manager
                       .find_by_name(name, version, provider))
-        service = Service(servicedef, host=host, instance=instance,
-                          service_manager=self,
-                          connection_manager=self.connection_manager,
-                          auth=auth)
+        key = (servicedef.id, host, instance, auth)
+        service = self._cached(key)
+        if service is None:
+            service = self._create(key, servicedef, host, instance, auth)
         return service
 
+    def snapshot(self, path):
+        """ Write the pulled data of live DataReps to file `path`.
+
+        Only root DataReps whose data was pulled with an ETag and is
+        unchanged since are included, see `sleepwalker.snapshot`.
+        Returns the number of resources written.
+
+        """
+        return snapshot.snapshot(self, path)
+
+    def restore(self, path, auth=None):
+        """ Rebind the resources in snapshot file `path`.
+
+        :param path: a file written by `snapshot()`
+        :param auth: object representing authentication credentials
+            for the services in the snapshot
+
+        :raises SnapshotError: if `path` is not a valid snapshot
+
+        Returns the DataReps bound, which revalidate the data from the
+        snapshot on their first pull, see `sleepwalker.snapshot`.
+
+        """
+        return snapshot.restore(self, path, auth)
+
 
 class Service(object):
     """ Manages all interaction with a server for a particular service.
@@ -340,7 +431,8 @@ class Service(object):
     Once created, most interaction with the server is done indirectly
     via `DataRep` instances associated with this `Service`.  The
     `bind()` method is used to lookup and bind to a resource, yielding
-    a DataRep.
+    a DataRep.  Where only the data is needed, `get_raw()` and
+    `execute_raw()` return responses without creating DataReps.
 
     """
 
@@ -351,7 +443,7 @@ class Service(object):
     def __init__(self, servicedef, host, instance=None,
                  servicepath=None, service_manager=None,
                  connection=None, connection_manager=None,
-                 auth=None):
+                 auth=None, intern=None, readonly=False):
         """ Create a Service object.
 
         :param servicedef: related ServiceDef for this Service
@@ -377,6 +469,12 @@ class Service(object):
         :param auth: object representing authentication credentials
             to use for this service instance
 
+        :param intern: optional `sleepwalker.interning.InternTable`
+            to share short and enumerated string values of responses,
+            as declared by the response schema of each link
+
+        :param readonly: default for the `readonly` argument of `bind()`
+
         The `auth` object is opaque to the service object.  It is
         passed directly to the Connection class when a new connection
         is established.  If ConnectionManager is used, the auth is
@@ -402,6 +500,36 @@ class Service(object):
         self.connection_manager = connection_manager
         self.auth = auth
         self.headers = {}
+        self.intern = intern
+        self.readonly = readonly
+
+        # Compiled relations keyed by <relation, fragment depth>,
+        # maintained by DataRep.follow()
+        self._relation_cache = {}
+
+        # Prepared requests keyed by link, see prepare()
+        self._prepared = {}
+
+        # Compiled links keyed by <resource, link>, see execute_raw()
+        self._raw_links = {}
+
+        # Route index over resource 'self' links, see resolve_uri()
+        self._routes = None
+
+        # Declared indexes by resource schema, see add_index()
+        self._index_defs = {}
+
+        # Declared pagers by <resource schema, link>, see add_pager()
+        self._pagers = {}
+
+        # Declared deltas by <resource schema, link>, see add_delta()
+        self._deltas = {}
+
+        # Declared projections by resource schema, see add_projection()
+        self._projections = {}
+
+        # Declared push windows by resource schema, see add_coalescing()
+        self._coalescing = {}
 
     def __repr__(self):
         return '<Service %s>' % self.servicedef.id
@@ -409,15 +537,79 @@ class Service(object):
     def add_headers(self, headers):
         """ Add headers that are specific to this service. """
         self.headers.update(headers)
+        self._prepared = {}
 
-    def request(self, method, uri, body=None, params=None, headers=None):
-        """ Make request through connection and return result. """
+    def _connect(self):
         if not self.connection:
             if not self.connection_manager:
                 raise ServiceException('No connection defined for service.')
 
             self.connection = self.connection_manager.find(
                 self.host, self.auth)
+        return self.connection
+
+    def prepare(self, link):
+        """ Return the `PreparedRequest` for issuing requests via `link`.
+
+        Prepared requests are cached per link until `add_headers()`
+        is called.
+
+        """
+        connection = self._connect()
+        prepared = self._prepared.get(link)
+        if prepared is None or prepared.connection is not connection:
+            prepared = PreparedRequest(self, connection, link.method)
+            self._prepared[link] = prepared
+        return prepared
+
+    def request(self, method, uri, body=None, params=None, headers=None,
+                link=None, lazy=False, result=False):
+        """ Make request through connection and return result.
+
+        If `link` is passed and no extra `headers` are needed, the
+        request is issued through the prepared request for that link.
+
+        If `lazy` is True and the connection supports it, the result is
+        returned undecoded as a `sleepwalker.lazyjson.LazyJson`.
+
+        If this service has an `intern` table, string values of the
+        result are interned as per the response schema of `link`.
+
+        If `result` is True, a `sleepwalker.connection.JsonResult` is
+        returned, with the status code and headers of this request's
+        response rather than those of the last response on the shared
+        connection.  Connections that do not support results give those
+        of their last response instead, or None if they do not keep it.
+
+        """
+        connection = self._connect()
+        native = result and getattr(connection, 'JSON_RESULTS', False)
+        kwargs = {'result': True} if native else {}
+        if link is not None and headers is None and link.method == method:
+            data = self.prepare(link).send(uri, body, params, lazy=lazy,
+                                           **kwargs)
+        else:
+            data = self._request(method, uri, body, params, headers, lazy,
+                                 **kwargs)
+
+        if native:
+            data, status_code, response_headers = data
+        elif result:
+            last = self.response
+            status_code = getattr(last, 'status_code', None)
+            response_headers = getattr(last, 'headers', None)
+
+        if (self.intern is not None and link is not None and
+                data is not None and not isinstance(data, LazyJson)):
+            response = link.response
+            if response is not None:
+                data = self.intern.values(response, data)
+        if result:
+            return JsonResult(data, status_code, response_headers)
+        return data
+
+    def _request(self, method, uri, body, params, headers, lazy, **kwargs):
+        self._connect()
 
         if headers is None:
             # No passed headers, but service has defined headers, use them
@@ -427,29 +619,273 @@ class Service(object):
             headers = copy.copy(headers)
             headers.update(self.headers)
 
-        return self.connection.json_request(method, uri, body, params, headers)
+        if lazy and getattr(self.connection, 'LAZY_JSON', False):
+            kwargs['lazy'] = True
+        return self.connection.json_request(method, uri, body, params,
+                                            headers, **kwargs)
 
     @property
     def response(self):
-        """ Last response from server. """
-        if self.connection is None or self.connection.response is None:
+        """ Last response from server.
+
+        None if there is none, or if the connection does not keep it.
+        This is the last response of any request on the connection,
+        which may be shared by other threads; pass result=True to
+        `request()` for the response of a given request.
+        """
+        if self.connection is None:
             return None
-        return self.connection.response
+        return getattr(self.connection, 'response', None)
 
-    def bind(self, _resource_name, **kwargs):
+    def bind(self, _resource_name, _readonly=None, **kwargs):
         """ Look up resource `_resource_name`, bind it and return a DataRep.
 
         :param _resource_name: resource to bind
 
+        :param _readonly: if True, return a read-only DataRep, see
+            `sleepwalker.frozen`.  Defaults to the `readonly` setting
+            of this service.
+
         :param kwargs: variables specific to the resource to bind
 
         """
         if self.servicedef is None:
             raise ServiceException("No rest-schema")
 
+        if _readonly is None:
+            _readonly = self.readonly
         jsonschema = self.servicedef.find_resource(_resource_name)
         schema = Schema(self, jsonschema)
-        return schema.bind(**kwargs)
+        return schema.bind(_readonly=_readonly, **kwargs)
+
+    def get_raw(self, _resource_name, **kwargs):
+        """ Retrieve resource `_resource_name` and return the response.
+
+        Equivalent to ``execute_raw(_resource_name, 'get', **kwargs)``.
+
+        """
+        return self.execute_raw(_resource_name, 'get', **kwargs)
+
+    def execute_raw(self, _resource_name, _link_name, _data=None, **kwargs):
+        """ Execute a link of a resource and return the response.
+
+        :param _resource_name: resource defining the link
+        :param _link_name: the link to execute
+        :param _data: request body, or query parameters for GET links
+        :param kwargs: variables of the link path, or of the resource
+            'self' link for links without a path
+
+        This is the same request as ``bind(_resource_name, **kwargs)
+        .execute(_link_name, _data)``, issued through the same
+        connection, headers and validation settings, but without
+        creating any `DataRep`: the decoded JSON response is returned
+        as is, and an HTTPError from the server is raised without
+        a `datarep` attribute.  The link path is compiled once per
+        service, so this suits tight loops over plain data.
+
+        """
+        key = (_resource_name, _link_name)
+        raw = self._raw_links.get(key)
+        if raw is None:
+            if self.servicedef is None:
+                raise ServiceException("No rest-schema")
+            jsonschema = self.servicedef.find_resource(_resource_name)
+            raw = self._raw_links[key] = _RawLink(jsonschema, _link_name)
+
+        link = raw.link
+        uri = self.servicepath + raw.expand(kwargs)[1:]
+
+        if datarep.DECODE_RECORDS:
+            _data = records.encode(_data)
+
+        if datarep.VALIDATE_REQUEST and link.request is not None:
+            link.request.validate(_data)
+
+        if raw.method == 'GET':
+            params, body = _data, None
+        elif raw.method in ('POST', 'PUT'):
+            params, body = None, _data
+        else:
+            params = body = None
+
+        response = self.request(raw.method, uri, body, params, link=link)
+
+        if datarep.VALIDATE_RESPONSE and link.response is not None:
+            link.response.validate(response)
+        return response
+
+    def resolve_uri(self, uri):
+        """ Look up the resource addressed by `uri` and return a DataRep.
+
+        :param uri: an href as returned by the server, either a full
+            URL on this service's host or a path starting with the
+            service path.  Query parameters are bound as path variables.
+
+        :raises ResourceException: if `uri` does not address a resource
+            of this service
+
+        Path variables extracted from `uri` are converted to integers
+        or numbers when the resource schema declares them as such.
+        The lookup goes through an index of all resource 'self' links
+        that is built on first use, so the cost does not grow with the
+        number of resources in the service definition.
+
+        """
+        if self.servicedef is None:
+            raise ServiceException("No rest-schema")
+
+        parsed = urllib.parse.urlsplit(uri)
+        if parsed.netloc and (_host_port(parsed) !=
+                              _host_port(urllib.parse.urlsplit(self.host))):
+            raise ResourceException('%s is not hosted by %s' %
+                                    (uri, self.host))
+
+        path = parsed.path
+        servicepath = self.servicepath
+        if not (path == servicepath or path.startswith(servicepath + '/')):
+            raise ResourceException('%s is not under the service path %s' %
+                                    (uri, servicepath))
+
+        if self._routes is None:
+            self._routes = _RouteIndex(self.servicedef)
+
+        # Unquote each segment rather than the path, so that an encoded
+        # slash stays within its segment
+        segments = [urllib.parse.unquote(segment) for segment in
+                    path[len(servicepath):].split('/')]
+        match = self._routes.match(segments)
+        if match is None:
+            raise ResourceException('No resource matches %s' % uri)
+
+        route, values = match
+        for k, v in urllib.parse.parse_qsl(parsed.query):
+            values[k] = v
+        for k, v in values.items():
+            values[k] = route.convert(k, v)
+
+        return Schema(self, route.jsonschema).bind(_readonly=self.readonly,
+                                                   **values)
+
+    def add_index(self, _resource_name, key, unique=True, fragment=''):
+        """ Declare an index over the items of a resource.
+
+        :param _resource_name: resource whose DataReps are indexed
+        :param key: property name or item-relative JSON pointer, as
+            for `ListDataRep.build_index()`
+        :param unique: if True, each key maps to a single item
+        :param fragment: JSON pointer to the array within the resource,
+            by default the resource itself
+
+        The index is then available in `ListDataRep.indexes` of every
+        DataRep for the array, and is rebuilt as needed after each pull.
+
+        """
+        if self.servicedef is None:
+            raise ServiceException("No rest-schema")
+
+        jsonschema = self.servicedef.find_resource(_resource_name)
+        defs = self._index_defs.setdefault(jsonschema, {})
+        defs[(fragment, key)] = unique
+
+    def declared_indexes(self, jsonschema, fragment=''):
+        """ Return (key, unique) for indexes declared via `add_index()`. """
+        defs = self._index_defs.get(jsonschema)
+        if not defs:
+            return []
+        return [(key, unique) for (frag, key), unique in defs.items()
+                if frag == fragment]
+
+    def add_pager(self, _resource_name, _link_name, pager):
+        """ Declare how a link of a resource pages its results.
+
+        :param _resource_name: resource with the link
+        :param _link_name: the paged link
+        :param pager: a `sleepwalker.paging.Pager`
+
+        `DataRep.paginate()` then iterates over all pages of the link.
+
+        """
+        if self.servicedef is None:
+            raise ServiceException("No rest-schema")
+
+        jsonschema = self.servicedef.find_resource(_resource_name)
+        if _link_name not in jsonschema.links:
+            raise LinkError("%s has no link '%s'"
+                            % (_resource_name, _link_name))
+        self._pagers[(jsonschema, _link_name)] = pager
+
+    def declared_pager(self, jsonschema, link_name):
+        """ Return the pager declared via `add_pager()`, or None. """
+        return self._pagers.get((jsonschema, link_name))
+
+    def add_delta(self, _resource_name, _link_name, delta):
+        """ Declare how a link of a collection returns its changes.
+
+        :param _resource_name: collection resource with the link
+        :param _link_name: the link returning changes
+        :param delta: a `sleepwalker.sync.Delta`
+
+        `ListDataRep.sync()` then requests only the changes of the
+        collection through the link.
+
+        """
+        if self.servicedef is None:
+            raise ServiceException("No rest-schema")
+
+        jsonschema = self.servicedef.find_resource(_resource_name)
+        if _link_name not in jsonschema.links:
+            raise LinkError("%s has no link '%s'"
+                            % (_resource_name, _link_name))
+        self._deltas[(jsonschema, _link_name)] = delta
+
+    def declared_delta(self, jsonschema, link_name):
+        """ Return the delta declared via `add_delta()`, or None. """
+        return self._deltas.get((jsonschema, link_name))
+
+    def add_projection(self, _resource_name, projection):
+        """ Declare that pulls of a resource may request only some fields.
+
+        :param _resource_name: resource whose 'get' link takes the
+            parameter of `projection`
+        :param projection: a `sleepwalker.projection.Projection`
+
+        `DataRep.pull()` then requests only the fields read through
+        fragments of the resource, once any are read.
+
+        """
+        if self.servicedef is None:
+            raise ServiceException("No rest-schema")
+
+        jsonschema = self.servicedef.find_resource(_resource_name)
+        if 'get' not in jsonschema.links:
+            raise LinkError("%s has no link 'get'" % _resource_name)
+        self._projections[jsonschema] = projection
+
+    def declared_projection(self, jsonschema):
+        """ Return the projection declared via `add_projection()`, or None. """
+        return self._projections.get(jsonschema)
+
+    def add_coalescing(self, _resource_name, window):
+        """ Declare that pushes of a resource within `window` coalesce.
+
+        :param _resource_name: resource with a 'set' link
+        :param window: seconds that the first push of a DataRep waits
+            for others before pushing the data once for all
+
+        See `DataRep.coalesce()` and sleepwalker.coalesce.
+
+        """
+        if self.servicedef is None:
+            raise ServiceException("No rest-schema")
+
+        jsonschema = self.servicedef.find_resource(_resource_name)
+        if 'set' not in jsonschema.links:
+            raise LinkError("%s has no link 'set'" % _resource_name)
+        self._coalescing[jsonschema] = window
+
+    def declared_coalescing(self, jsonschema):
+        """ Return the window declared via `add_coalescing()`, or None. """
+        return self._coalescing.get(jsonschema)
 
     def _lookup(self, name, lookup, exception_class):
         if self.servicedef is None:
@@ -471,3 +907,260 @@ class Service(object):
     def lookup_type(self, name):
         """ Look up a type by name, and return a `Schema`. """
         return self._lookup(name, self.servicedef.find_type, TypeException)
+
+
+def _host_port(parsed):
+    """ Return the <host, port> addressed by a urlsplit() result. """
+    port = parsed.port or {'http': 80, 'https': 443}.get(parsed.scheme)
+    return (parsed.hostname, port)
+
+
+class _RawLink(object):
+    """ A resource link compiled for `Service.execute_raw()`. """
+
+    def __init__(self, jsonschema, name):
+        if name not in jsonschema.links:
+            raise LinkError("%s has no link '%s'" % (jsonschema.name, name))
+        self.link = link = jsonschema.links[name]
+        self.method = link.method
+        if self.method is None:
+            raise LinkError("Unable to execute link '%s' of %s, "
+                            "no method defined" % (name, jsonschema.name))
+
+        path = link.path
+        if path is None:
+            path = jsonschema.links['self'].path
+        self.path = path
+        self.template = uritemplate.URITemplate(path.template)
+        self.names = frozenset(self.template.variable_names)
+        self.required = uritemplate_required_variables(path.template)
+
+    def expand(self, values):
+        """ Return the path of the link for variables `values`. """
+        for k in values:
+            if k not in self.names:
+                raise InvalidParameter(
+                    'Invalid parameters "%s" for target link: %s' %
+                    (k, str(self.link)))
+        if not self.required.issubset(values):
+            raise MissingParameter(
+                "Missing parameters for link '%s' path template '%s': %s" %
+                (self.link.name, self.path.template,
+                 list(self.required.difference(values))), self.link)
+        return self.template.expand(dict((k, str(v))
+                                         for k, v in values.items()))
+
+
+class _Route(object):
+    """ A resource 'self' link template registered in a `_RouteIndex`. """
+
+    def __init__(self, jsonschema, extractors):
+        self.jsonschema = jsonschema
+
+        # One entry per path segment: None for literals, a variable
+        # name for whole-segment variables, or a (regex, names) tuple
+        # for segments mixing literals and variables
+        self.extractors = extractors
+        self._converters = {}
+
+    def extract(self, segments):
+        values = {}
+        for segment, extractor in zip(segments, self.extractors):
+            if extractor is None:
+                continue
+            elif isinstance(extractor, str):
+                values[extractor] = segment
+            else:
+                regex, names = extractor
+                values.update(zip(names, regex.match(segment).groups()))
+        return values
+
+    def convert(self, name, value):
+        """ Convert a string value for var `name` per the resource schema. """
+        try:
+            converter = self._converters[name]
+        except KeyError:
+            converter = self._converters[name] = self._converter(name)
+        if converter is None:
+            return value
+        try:
+            return converter(value)
+        except ValueError:
+            return value
+
+    def _converter(self, name):
+        path = self.jsonschema.links['self'].path
+        js = path.var_schemas.get(name)
+        relp = path.vars.get(name)
+        if js is None and relp and relp.startswith('0/'):
+            try:
+                js = self.jsonschema.by_pointer(relp[1:])
+            except Exception:
+                js = None
+
+        if isinstance(js, reschema.jsonschema.DynamicSchema):
+            js = js.refschema
+        if isinstance(js, reschema.jsonschema.Integer):
+            return int
+        elif isinstance(js, reschema.jsonschema.Number):
+            return lambda v: int(v) if v.lstrip('-').isdigit() else float(v)
+        return None
+
+
+class _RouteIndex(object):
+    """ Index mapping URI paths to resources by their 'self' link.
+
+    Templates are split into path segments and stored in a trie, so
+    matching a path costs one dict lookup per segment rather than a
+    regex match per resource.  Literal segments are preferred over
+    variables, backtracking if a literal branch does not match.
+
+    """
+
+    QUERY_EXPR = re.compile(r'{[?&][^}]*}')
+    VAR_EXPR = re.compile(r'{([^}]+)}')
+    PLAIN_VAR = re.compile(r'^[A-Za-z0-9_]+$')
+
+    class Node(object):
+        __slots__ = ('literals', 'patterns', 'var', 'route')
+
+        def __init__(self):
+            self.literals = {}
+            self.patterns = {}
+            self.var = None
+            self.route = None
+
+    def __init__(self, servicedef):
+        self.root = _RouteIndex.Node()
+        for jsonschema in servicedef.resources.values():
+            if 'self' in jsonschema.links:
+                self.add(jsonschema)
+
+    def add(self, jsonschema):
+        """ Add the 'self' link of `jsonschema` to the index. """
+        template = jsonschema.links['self'].path.template
+        if not template.startswith('$'):
+            logger.debug("Not indexing non-relative template %s" % template)
+            return
+
+        node = self.root
+        extractors = []
+        for segment in self.QUERY_EXPR.sub('', template[1:]).split('/'):
+            names = self.VAR_EXPR.findall(segment)
+            if any(not self.PLAIN_VAR.match(n) for n in names):
+                # Reserved and multi-segment expansions are not indexed
+                logger.debug("Not indexing template %s" % template)
+                return
+
+            if not names:
+                extractors.append(None)
+                node = node.literals.setdefault(segment, _RouteIndex.Node())
+            elif segment == '{%s}' % names[0]:
+                extractors.append(names[0])
+                if node.var is None:
+                    node.var = _RouteIndex.Node()
+                node = node.var
+            else:
+                parts = self.VAR_EXPR.split(segment)
+                # Segments are unquoted, so may hold any character
+                regex = re.compile('^%s$' % ''.join(
+                    '(.+)' if i % 2 else re.escape(part)
+                    for i, part in enumerate(parts)), re.DOTALL)
+                extractors.append((regex, names))
+                if regex.pattern not in node.patterns:
+                    node.patterns[regex.pattern] = (regex, _RouteIndex.Node())
+                node = node.patterns[regex.pattern][1]
+
+        # The first resource registered for a given template wins
+        if node.route is None:
+            node.route = _Route(jsonschema, extractors)
+
+    def match(self, segments):
+        """ Return (route, values) for the unquoted `segments` of a path,
+        or None if nothing matches.
+        """
+        route = self._match(self.root, segments, 0)
+        if route is None:
+            return None
+        return route, route.extract(segments)
+
+    def _match(self, node, segments, i):
+        if i == len(segments):
+            return node.route
+
+        segment = segments[i]
+        child = node.literals.get(segment)
+        if child is not None:
+            route = self._match(child, segments, i + 1)
+            if route is not None:
+                return route
+
+        for regex, child in node.patterns.values():
+            if regex.match(segment):
+                route = self._match(child, segments, i + 1)
+                if route is not None:
+                    return route
+
+        if node.var is not None and segment:
+            return self._match(node.var, segments, i + 1)
+
+        return None
+
+
+class PreparedRequest(object):
+    """ A request template for one link of a `Service`.
+
+    Everything about a request that does not depend on the target
+    resource is computed once: the method, the merged service and
+    JSON headers, and the absolute URL prefix for the service path.
+    Sending a prepared request then only needs the resource URI
+    and the body or query parameters.
+
+    Connections that do not provide `prepared_json_request()` are
+    sent the merged headers through their regular `json_request()`.
+
+    """
+
+    def __init__(self, service, connection, method):
+        self.service = service
+        self.connection = connection
+        self.method = method
+        self.servicepath = service.servicepath
+
+        self._send = getattr(connection, 'prepared_json_request', None)
+        self._lazy = getattr(connection, 'LAZY_JSON', False)
+        if self._send is not None:
+            headers = CaseInsensitiveDict(service.headers)
+            headers.update(connection.JSON_HEADERS)
+            self.url_prefix = urllib.parse.urljoin(connection.hostname,
+                                                   self.servicepath)
+        else:
+            headers = dict(service.headers)
+            self.url_prefix = None
+        self.headers = headers
+
+    def __repr__(self):
+        return '<PreparedRequest %s %s>' % (self.method,
+                                            self.url_prefix or
+                                            self.servicepath)
+
+    def send(self, uri, body=None, params=None, lazy=False, result=False):
+        """ Issue this request against `uri` and return the result.
+
+        If `lazy` is True and the connection supports it, the result is
+        returned undecoded.  If `result` is True, the connection must
+        support results and a `sleepwalker.connection.JsonResult` is
+        returned.
+
+        """
+        kwargs = {'lazy': True} if (lazy and self._lazy) else {}
+        if result:
+            kwargs['result'] = True
+        if (self.url_prefix is not None and
+                uri.startswith(self.servicepath)):
+            url = self.url_prefix + uri[len(self.servicepath):]
+            return self._send(self.method, url, body, params, self.headers,
+                              **kwargs)
+
+        return self.connection.json_request(self.method, uri, body, params,
+                                            self.headers, **kwargs)
@@ -0,0 +1,161 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements snapshots of pulled data, so that a process can
+restart with the data it held and revalidate it with the server rather
+than pull it all again.
+
+`ServiceManager.snapshot()` writes the URI, path variables, pulled data
+and ETag of each live root DataRep of the manager's services whose data
+was pulled with an ETag and is unchanged since, see "Revalidation" in
+sleepwalker.datarep:
+
+   >>> service_manager.snapshot('/var/lib/app/sleepwalker.snap')
+
+`ServiceManager.restore()` then rebinds each resource in the snapshot
+without issuing any request, and returns the resulting DataReps:
+
+   >>> books = service_manager.restore('/var/lib/app/sleepwalker.snap')
+
+The first `pull()` of a restored URI, whether through one of these
+DataReps or any other bound to the same URI, sends the ETag from the
+snapshot in an ``If-None-Match`` header.  If the server answers ``304
+Not Modified``, the data from the snapshot is used as is, undecoded
+until accessed as described in sleepwalker.lazyjson.  Restoring does
+not enable revalidation of later pulls, see ``datarep.REVALIDATE``.
+
+A snapshot is a zlib-compressed sequence of entries, each a JSON
+header followed by the data as JSON text.  Authentication is not kept,
+so the `auth` to use for the restored services is passed to `restore()`.
+
+"""
+
+import json
+import zlib
+import struct
+
+from sleepwalker import datarep, records
+from sleepwalker.lazyjson import LazyJson
+from sleepwalker.exceptions import SnapshotError
+
+__all__ = ['snapshot', 'restore']
+
+MAGIC = b'SWSNAP\x01\n'
+
+# Lengths of the header and data of an entry
+_LENGTHS = struct.Struct('>II')
+
+
+def _content(data):
+    """ Return `data` as JSON text in bytes. """
+    if isinstance(data, LazyJson):
+        content = data.content[:]
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        return content
+    return json.dumps(records.encode(data)).encode('utf-8')
+
+
+def _entries(service_manager):
+    """ Yield <key, uri, schema id, path_vars, etag, data> to snapshot. """
+    seen = set()
+    for dr in list(datarep._validated):
+        service = dr.service
+        validator = dr._validator
+        if (service.service_manager is not service_manager or
+                validator is None or dr._data is not validator[1]):
+            continue
+        key = (service.servicedef.id, service.host, service.instance)
+        if (key, dr.uri) in seen:
+            continue
+        seen.add((key, dr.uri))
+        yield (key, dr.uri, dr.jsonschema.id, dr.path_vars,
+               validator[0], validator[1])
+
+    # Restored entries not pulled again yet are kept
+    for service, entries in list(datarep._restored.items()):
+        if service.service_manager is not service_manager:
+            continue
+        key = (service.servicedef.id, service.host, service.instance)
+        for uri, (etag, data, schema_id, path_vars) in list(entries.items()):
+            if (key, uri) not in seen:
+                seen.add((key, uri))
+                yield key, uri, schema_id, path_vars, etag, data
+
+
+def snapshot(service_manager, path):
+    """ Write a snapshot of the data of `service_manager` to `path`.
+
+    Returns the number of resources written.
+    """
+    count = 0
+    compressor = zlib.compressobj()
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        for key, uri, schema_id, path_vars, etag, data in \
+                _entries(service_manager):
+            header = json.dumps([key[0], key[1], key[2], uri, schema_id,
+                                 path_vars, etag], default=str)
+            header = header.encode('utf-8')
+            content = _content(data)
+            f.write(compressor.compress(
+                _LENGTHS.pack(len(header), len(content))))
+            f.write(compressor.compress(header))
+            f.write(compressor.compress(content))
+            count += 1
+        f.write(compressor.flush())
+    return count
+
+
+def _read(path):
+    """ Yield the <header, content> of each entry of the snapshot. """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise SnapshotError('%s is not a snapshot' % path)
+        try:
+            payload = zlib.decompress(f.read())
+        except zlib.error as e:
+            raise SnapshotError('%s is corrupt: %s' % (path, e))
+
+    pos = 0
+    while pos < len(payload):
+        if pos + _LENGTHS.size > len(payload):
+            raise SnapshotError('%s is truncated' % path)
+        hlen, clen = _LENGTHS.unpack_from(payload, pos)
+        pos += _LENGTHS.size
+        end = pos + hlen + clen
+        if end > len(payload):
+            raise SnapshotError('%s is truncated' % path)
+        yield (json.loads(payload[pos:pos + hlen].decode('utf-8')),
+               payload[pos + hlen:end])
+        pos = end
+
+
+def restore(service_manager, path, auth=None):
+    """ Restore a snapshot written by `snapshot()` from `path`.
+
+    :param service_manager: the ServiceManager to find services with
+    :param path: the snapshot file
+    :param auth: authentication for the services in the snapshot
+
+    Returns a list of DataReps, one per resource in the snapshot.
+    """
+    datareps = []
+    for header, content in _read(path):
+        service_id, host, instance, uri, schema_id, path_vars, etag = header
+        service = service_manager.find_by_id(host, service_id, instance,
+                                             auth=auth)
+        entries = datarep._restored.get(service)
+        if entries is None:
+            entries = datarep._restored[service] = {}
+        entries[uri] = (etag, LazyJson(content), schema_id, path_vars)
+
+        jsonschema = service.servicedef.find(schema_id)
+        datareps.append(datarep.DataRep.from_schema(
+            service, uri, jsonschema=jsonschema, path_vars=path_vars,
+            **datarep._readonly_kwargs(service.readonly)))
+    return datareps
@@ -0,0 +1,315 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements spill-to-disk storage for oversized responses
+kept undecoded by the lazy decode mode, see sleepwalker.lazyjson.
+
+A `Connection` created with a `spill_threshold` streams each lazy
+response larger than that many bytes into a temporary file rather than
+holding it in memory, and returns it as a `SpilledJson` that reads the
+file through a read-only memory map:
+
+   >>> conn = Connection('https://host.com', spill_threshold=16 << 20)
+   >>> sleepwalker.datarep.DECODE_LAZY = True
+   >>> report = service.bind('report', id=1).pull()
+   >>> report['rows'][100000]['name'].data
+
+Reading a value through a fragment only decodes that value.  The byte
+offsets of the members of each object or array walked through are
+recorded in an index the first time it is walked, so that later reads
+go straight to the value however large the document is.  The length of
+an array is also known from the index, so indexing and iterating over
+a `ListDataRep` fragment does not decode the array.
+
+Unlike undecoded responses held in memory, objects and arrays read
+through a fragment of a spilled response are decoded on their own and
+returned frozen, see sleepwalker.frozen, since changes to them could
+not be kept.  Changes are made by setting the data of a fragment,
+which, as does accessing the data of the root DataRep, decodes the
+whole response and releases the file.
+
+Spilled responses are expected to be UTF-8, as required for JSON
+exchanged between systems.
+
+"""
+
+import json
+import mmap
+import array
+import tempfile
+import json.decoder
+
+from sleepwalker.frozen import freeze
+from sleepwalker.lazyjson import LazyJson, _skip_ws, _DECODER, _WHITESPACE
+
+__all__ = ['SpilledJson', 'spill']
+
+# Bytes read from the response per chunk while spilling
+CHUNK_SIZE = 1 << 20
+
+# Initial bytes decoded at a time while indexing a container, doubled
+# for members that do not fit
+WINDOW_SIZE = 1 << 20
+
+
+def spill(chunks, threshold, intern=None):
+    """ Return the response read from iterable `chunks` as a LazyJson.
+
+    :param chunks: the response content as an iterable of bytes
+    :param threshold: size in bytes above which the content is kept
+        in a temporary file
+    :param intern: optional `sleepwalker.interning.InternTable`
+
+    Returns a `SpilledJson` if the content is larger than `threshold`,
+    a `LazyJson` otherwise, or None if there is no content.
+    """
+    f = tempfile.TemporaryFile()
+    size = 0
+    for chunk in chunks:
+        f.write(chunk)
+        size += len(chunk)
+
+    if size == 0:
+        f.close()
+        return None
+    if size <= threshold:
+        f.seek(0)
+        content = f.read()
+        f.close()
+        return LazyJson(content, intern)
+
+    f.flush()
+    return SpilledJson(f, intern)
+
+
+class SpilledJson(LazyJson):
+    """ An undecoded JSON document held in a temporary file. """
+
+    __slots__ = ('file', 'index')
+
+    def __init__(self, file, intern=None):
+        """ Hold the JSON document in the open binary file `file`.
+
+        The file is memory-mapped and closed along with this object.
+        """
+        super(SpilledJson, self).__init__(
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), intern)
+        self.file = file
+        # Members of each container walked through, by pointer parts
+        self.index = {}
+
+    def __repr__(self):
+        return '<SpilledJson %d bytes>' % len(self.content)
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """ Release the memory map and the file. """
+        self.content.close()
+        self.file.close()
+
+    def _loads(self, content):
+        if self.intern is not None:
+            return self.intern.loads(content)
+        return json.loads(content)
+
+    def decode(self):
+        """ Decode and return the whole document. """
+        return self._loads(self.content[:])
+
+    def decode_pointer(self, parts):
+        """ Decode only the value at the JSON pointer `parts`.
+
+        Objects and arrays are returned frozen.
+
+        :raises LookupError: if there is no such value
+        :raises ValueError: if the document is not valid JSON
+        """
+        start, end = self._span(parts)
+        return freeze(self._loads(self.content[start:end]))
+
+    def has_pointer(self, parts):
+        """ Return True if there is a value at the JSON pointer `parts`.
+
+        :raises ValueError: if the document is not valid JSON
+        """
+        try:
+            self._span(parts)
+        except LookupError:
+            return False
+        return True
+
+    def length(self, parts):
+        """ Return the number of members of the container at `parts`.
+
+        :raises LookupError: if there is no object or array at `parts`
+        :raises ValueError: if the document is not valid JSON
+        """
+        members = self._members(tuple(parts), self._span(parts))
+        if members.__class__ is dict:
+            return len(members)
+        return len(members) // 2
+
+    def exhausted(self):
+        """ Always False, as reads go through the offset index. """
+        return False
+
+    def _span(self, parts):
+        """ Return the byte offsets of the value at `parts`. """
+        span = (0, len(self.content))
+        for i, part in enumerate(parts):
+            members = self._members(tuple(parts[:i]), span)
+            if members.__class__ is dict:
+                span = members[part]
+            else:
+                try:
+                    index = int(part)
+                except ValueError:
+                    raise IndexError(part)
+                if index < 0:
+                    raise IndexError(part)
+                span = (members[2 * index], members[2 * index + 1])
+        return span
+
+    def _members(self, key, span):
+        """ Return the member index of the container at `span`.
+
+        Objects are indexed as a dict of <start, end> offsets by name,
+        arrays as an array of start and end offsets of each item.
+        """
+        members = self.index.get(key)
+        if members is None:
+            members = self.index[key] = _index(self.content, *span)
+        return members
+
+
+class _Window(object):
+    """ A decoded window of UTF-8 content starting at byte offset `base`. """
+
+    def __init__(self, content, base, end, size):
+        self.content = content
+        self.end = end
+        self.load(base, size)
+
+    def load(self, base, size):
+        self.base = base
+        self.size = size
+        chunk = self.content[base:min(base + size, self.end)]
+        self.text = chunk.decode('utf-8', 'surrogateescape')
+        self.complete = base + size >= self.end
+        self.ascii = len(self.text) == len(chunk)
+        self._mark = (0, base)
+
+    def offset(self, pos):
+        """ Return the byte offset of text position `pos`.
+
+        This is cheapest for positions passed in increasing order.
+        """
+        if self.ascii:
+            return self.base + pos
+        mark, offset = self._mark
+        if pos < mark:
+            mark, offset = 0, self.base
+        offset += len(self.text[mark:pos].encode('utf-8', 'surrogateescape'))
+        self._mark = (pos, offset)
+        return offset
+
+
+class _Truncated(Exception):
+    pass
+
+
+# Characters skipped by _WHITESPACE, plus the empty string at the end
+_WHITESPACE_CHARS = ' \t\n\r'
+
+
+def _index(content, start, end):
+    """ Index the members of the object or array at `content[start:end]`. """
+    w = _Window(content, start, end, WINDOW_SIZE)
+    text = w.text
+    pos = _skip_ws(text, 0)
+    c = text[pos:pos + 1]
+    if c == '{':
+        members, close = {}, '}'
+    elif c == '[':
+        members, close = array.array('q'), ']'
+    else:
+        raise LookupError('Not an object or array')
+    is_object = close == '}'
+
+    # Bound locally as this loop runs once per member
+    scan_once = _DECODER.scan_once
+    scanstring = json.decoder.scanstring
+    skip_ws = _WHITESPACE.match
+    offset = w.offset
+    # Members must end before this position unless the window is complete
+    limit = len(text) if not w.complete else len(text) + 1
+    base = w.base if w.ascii else None
+
+    pos = _skip_ws(text, pos + 1)
+    # True while pos is the first member in the window
+    first = False
+    while True:
+        if not members and text[pos:pos + 1] == close:
+            return members
+        try:
+            name = None
+            p = pos
+            if is_object:
+                if text[p:p + 1] != '"':
+                    raise ValueError('Expecting a key at %d' % offset(p))
+                name, p = scanstring(text, p + 1)
+                p = skip_ws(text, p).end()
+                if text[p:p + 1] != ':':
+                    raise ValueError('Expecting : at %d' % offset(p))
+                p = skip_ws(text, p + 1).end()
+            vstart = p
+            try:
+                _, vend = scan_once(text, p)
+            except StopIteration:
+                raise ValueError('Expecting a value at %d' % offset(p))
+            p = vend
+            if text[p:p + 1] in _WHITESPACE_CHARS:
+                p = skip_ws(text, p).end()
+            if p >= limit:
+                raise _Truncated()
+        except (_Truncated, ValueError):
+            if w.complete:
+                raise
+            # Reload the window from this member, growing it if the
+            # member is what did not fit
+            w.load(offset(pos), w.size * 2 if first else w.size)
+            text = w.text
+            limit = len(text) if not w.complete else len(text) + 1
+            base = w.base if w.ascii else None
+            pos = _skip_ws(text, 0)
+            first = True
+            continue
+
+        if base is not None:
+            vstart += base
+            vend += base
+        else:
+            vstart = offset(vstart)
+            vend = offset(vend)
+        if is_object:
+            members[name] = (vstart, vend)
+        else:
+            members.append(vstart)
+            members.append(vend)
+
+        sep = text[p:p + 1]
+        if sep == ',':
+            pos = p + 1
+            if text[pos:pos + 1] in _WHITESPACE_CHARS:
+                pos = skip_ws(text, pos).end()
+            first = False
+        elif sep == close:
+            return members
+        else:
+            raise ValueError('Expecting , or %s at %d' % (close, offset(p)))
@@ -0,0 +1,202 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements delta sync, which updates the items of a pulled
+collection with only the items changed or deleted on the server since
+the last sync, rather than pulling the whole collection again.
+
+A `Delta` describes how a link returns changes: the parameters or
+headers that ask for the changes since a token, and how to read the
+changed items, deleted keys and the next token from the response.
+`TokenDelta` covers links taking a change token returned with each
+response, and `ModifiedSinceDelta` links honoring ``If-Modified-Since``
+and returning deleted items as tombstones.  A delta is declared for a
+link with `Service.add_delta()`, or passed to `ListDataRep.sync()`:
+
+   >>> service.add_delta('books', 'changes', TokenDelta(key='id'))
+   >>> books = service.bind('books')
+   >>> books.sync()        # pulls all books and keeps the token
+   >>> books.sync()        # requests the changes since
+
+The first sync, or any sync while the data is not set, requests all
+items.  Later syncs merge the changes into the data held: an item
+whose key matches a held item replaces it, other items are appended,
+and items whose key is deleted are removed.  Items are matched through
+the unique index of the collection by the key, see `sleepwalker.index`,
+which is built on first use and kept for later lookups.
+
+Replaced and appended items are set in place like setting the data of
+an item fragment, so indexes are updated for those items only and
+fragments of other items are unaffected.  Removing items, or any
+change to a read-only collection, replaces the data with a new list,
+after which indexes are rebuilt on their next lookup.  Fragments of
+items are positional, so those held across a sync that removes items
+may then address another item.
+
+"""
+
+import bisect
+
+from jsonpointer import resolve_pointer
+
+__all__ = ['Delta', 'TokenDelta', 'ModifiedSinceDelta', 'merge']
+
+
+class Delta(object):
+    """ Base class of delta sync strategies. """
+
+    # Name of the property identifying each item
+    key = 'id'
+
+    # Names of the parameters set by `request()`, which must be
+    # variables of the path of the link
+    params = ()
+
+    def request(self, token):
+        """ Return <params, headers> requesting the changes since `token`.
+
+        :param token: token returned by `changes()` for the last sync,
+            or None to request all items.  `headers` may be None.
+        """
+        raise NotImplementedError()
+
+    def changes(self, response, headers):
+        """ Return <items, deleted, token> from the response to a request.
+
+        :param response: the decoded response, None if there is none
+        :param headers: the headers of the response
+
+        `items` are the changed items, `deleted` the keys of deleted
+        items, and `token` the token of the next sync, or None to keep
+        the current one.
+        """
+        raise NotImplementedError()
+
+
+class TokenDelta(Delta):
+    """ Syncs by a change token passed back to the link. """
+
+    def __init__(self, key='id', token_param='since', items='/items',
+                 deleted='/deleted', next_token='/token'):
+        """ Create a delta passing the token of each sync to the next.
+
+        :param key: name of the property identifying each item
+        :param token_param: name of the parameter passing the token
+        :param items: JSON pointer to the changed items in the response
+        :param deleted: JSON pointer to the keys of the deleted items
+        :param next_token: JSON pointer to the token in the response
+
+        """
+        self.key = key
+        self.token_param = token_param
+        self.items = items
+        self.deleted = deleted
+        self.next_token = next_token
+        self.params = (token_param,)
+
+    def request(self, token):
+        if token is None:
+            return {}, None
+        return {self.token_param: token}, None
+
+    def changes(self, response, headers):
+        if response is None:
+            return [], [], None
+        return (resolve_pointer(response, self.items, []),
+                resolve_pointer(response, self.deleted, []),
+                resolve_pointer(response, self.next_token, None))
+
+
+class ModifiedSinceDelta(Delta):
+    """ Syncs by the ``Last-Modified`` time of the previous response. """
+
+    def __init__(self, key='id', deleted_field='deleted'):
+        """ Create a delta sending ``If-Modified-Since``.
+
+        :param key: name of the property identifying each item
+        :param deleted_field: name of the property that is true for
+            the tombstones of deleted items
+
+        The response is the array of items changed since, and a ``304
+        Not Modified`` response means that none changed.
+        """
+        self.key = key
+        self.deleted_field = deleted_field
+
+    def request(self, token):
+        if token is None:
+            return {}, None
+        return {}, {'If-Modified-Since': token}
+
+    def changes(self, response, headers):
+        if not response:
+            return [], [], headers.get('Last-Modified')
+        items = []
+        deleted = []
+        for item in response:
+            if item.get(self.deleted_field):
+                deleted.append(item.get(self.key))
+            else:
+                items.append(item)
+        return items, deleted, headers.get('Last-Modified')
+
+
+def merge(dr, key, items, deleted):
+    """ Merge changed `items` and `deleted` keys into ListDataRep `dr`.
+
+    :param dr: root DataRep of the collection
+    :param key: name of the property identifying each item
+    :param items: changed items, replacing those with the same key
+    :param deleted: keys of the items to remove
+
+    """
+    index = dr.build_index(key)
+    removed = set()
+    for k in deleted:
+        try:
+            removed.add(index.position(k))
+        except KeyError:
+            pass
+
+    if not removed and not dr.readonly:
+        for item in items:
+            try:
+                position = index.position(item.get(key))
+            except KeyError:
+                position = len(dr.data)
+                dr._set_pointer('/-', item)
+            else:
+                dr._set_pointer('/%d' % position, item)
+            dr._data_changed('/%d' % position)
+        return
+
+    data = [item for position, item in enumerate(dr.data)
+            if position not in removed]
+    # Remaining items move down by the number removed before them
+    removed = sorted(removed)
+    appended = {}
+    for item in items:
+        k = item.get(key)
+        try:
+            position = index.position(k)
+        except KeyError:
+            position = None
+        if position is not None:
+            before = bisect.bisect_left(removed, position)
+            if before < len(removed) and removed[before] == position:
+                # Deleted and then changed again, so back as a new item
+                position = None
+            else:
+                position -= before
+        if position is None:
+            position = appended.get(k)
+        if position is None:
+            appended[k] = len(data)
+            data.append(item)
+        else:
+            data[position] = item
+    dr._data = data
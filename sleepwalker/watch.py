@@ -0,0 +1,309 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+This module implements watching DataReps for changes by polling.
+
+`DataRep.watch()` pulls a resource periodically and calls back with
+the JSON pointers of the values that changed since the last pull:
+
+   >>> def changed(book, pointers):
+   ...     print(pointers)
+   >>> watch = book.watch(changed, interval=30)
+   ['/title', '/chapters/3']
+   >>> watch.cancel()
+
+Pointers are relative to the data of the root resource, as for
+`DataRep.at()`.  A value added or removed is reported by its own
+pointer, and a value whose type changed, for example from an object to
+a string, by the pointer of that value rather than those below it.
+The first pull of a resource whose data is not set yet only sets the
+baseline for later pulls, and is not reported.
+
+Watched DataReps are pulled by a `Watcher`, which schedules the pulls
+of any number of DataReps on one thread pool.  `DataRep.watch()` uses
+a watcher shared by the process, started on first use, unless another
+is passed.  The interval of each watch adapts to how often the
+resource changes: it is halved after each pull that finds a change and
+doubled after each pull that does not, staying between `min_interval`
+and `max_interval`, so that resources that rarely change are pulled
+rarely.  Combined with ``datarep.REVALIDATE``, a pull of an unchanged
+resource costs the server a 304 and the client nothing to compare.
+
+A connection is not safe for concurrent requests, so the pulls of
+DataReps whose services share a connection are made one at a time,
+and only those on distinct connections run in parallel.
+
+"""
+
+import time
+import heapq
+import weakref
+import logging
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sleepwalker.records import OBJECT_TYPES, escape
+
+__all__ = ['diff', 'Watcher', 'Watch', 'default_watcher']
+
+logger = logging.getLogger(__name__)
+
+
+def _differ(old, new):
+    # Check the class so that, for example, 1 and True differ
+    return old.__class__ is not new.__class__ or old != new
+
+
+def diff(old, new, pointer=''):
+    """ Return the JSON pointers of the values that differ in `new`.
+
+    :param old: JSON data before the change
+    :param new: JSON data after the change
+    :param pointer: JSON pointer of `old` and `new`, prefixed to the
+        pointers returned
+
+    Objects and arrays that are shared by `old` and `new`, or that
+    compare equal, are not walked, so a number within them changed to
+    an equal boolean is not reported.
+    """
+    changes = []
+    stack = [(old, new, pointer)]
+    while stack:
+        old, new, pointer = stack.pop()
+        if old is new:
+            continue
+        if isinstance(old, OBJECT_TYPES) and isinstance(new, OBJECT_TYPES):
+            for key, value in new.items():
+                if key in old:
+                    item = old[key]
+                    if item is not value and _differ(item, value):
+                        stack.append((item, value,
+                                      pointer + '/' + escape(key)))
+                else:
+                    changes.append(pointer + '/' + escape(key))
+            for key in old:
+                if key not in new:
+                    changes.append(pointer + '/' + escape(key))
+        elif isinstance(old, list) and isinstance(new, list):
+            common = min(len(old), len(new))
+            for i in range(common):
+                if _differ(old[i], new[i]):
+                    stack.append((old[i], new[i], pointer + '/' + str(i)))
+            for i in range(common, max(len(old), len(new))):
+                changes.append(pointer + '/' + str(i))
+        elif _differ(old, new):
+            changes.append(pointer)
+    changes.sort()
+    return changes
+
+
+class Watch(object):
+    """ A DataRep watched for changes by a `Watcher`. """
+
+    def __init__(self, watcher, datarep, callback, interval,
+                 min_interval, max_interval):
+        self.watcher = watcher
+        self.datarep = datarep
+        self.callback = callback
+
+        # Current interval between pulls, in seconds
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.active = True
+
+        # Number of pulls and of pulls that found a change
+        self.pulls = 0
+        self.changes = 0
+
+    def __repr__(self):
+        return '<Watch %s every %.1fs>' % (self.datarep, self.interval)
+
+    def cancel(self):
+        """ Stop watching, after any pull already in progress. """
+        self.active = False
+
+    def poll(self):
+        """ Pull the DataRep, and call back if its data changed.
+
+        Returns the pointers of the values that changed.
+        """
+        dr = self.datarep
+        root = dr if dr.root is None else dr.root
+        if root._data is root.UNSET:
+            self._pull()
+            return []
+
+        old = dr.data
+        self._pull()
+        changes = diff(old, dr.data, dr.fragment or '')
+        if changes:
+            self.changes += 1
+            self.interval = max(self.interval / 2, self.min_interval)
+            self.callback(dr, changes)
+        else:
+            self.interval = min(self.interval * 2, self.max_interval)
+        return changes
+
+    def _pull(self):
+        with self.watcher._connection_lock(self.datarep.service):
+            self.datarep.pull()
+        self.pulls += 1
+
+
+class Watcher(object):
+    """ Pulls any number of watched DataReps on a shared thread pool. """
+
+    def __init__(self, max_workers=4, clock=time.monotonic):
+        """ Create a watcher, which is not started.
+
+        :param max_workers: number of pulls issued at the same time,
+            on distinct connections
+        :param clock: function returning the current time in seconds
+
+        """
+        self.max_workers = max_workers
+        self.clock = clock
+
+        # Watches by time due, as <time due, sequence, watch>
+        self._due = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self._stopping = False
+
+        # Locks serializing the pulls on each connection, by connection
+        self._locks = weakref.WeakKeyDictionary()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def watch(self, datarep, callback, interval=60, min_interval=None,
+              max_interval=None):
+        """ Start watching `datarep` and return a `Watch`.
+
+        :param datarep: the DataRep to pull
+        :param callback: called with the DataRep and the list of
+            changed JSON pointers after each pull that finds changes
+        :param interval: initial seconds between pulls
+        :param min_interval: shortest interval, by default a quarter
+            of `interval`
+        :param max_interval: longest interval, by default eight times
+            `interval`
+
+        The first pull is due once `interval` has elapsed, or right
+        away if the data of `datarep` is not set yet.
+
+        """
+        if min_interval is None:
+            min_interval = interval / 4
+        if max_interval is None:
+            max_interval = interval * 8
+        watch = Watch(self, datarep, callback, interval,
+                      min_interval, max_interval)
+        root = datarep if datarep.root is None else datarep.root
+        delay = 0 if root._data is root.UNSET else interval
+        self._schedule(watch, self.clock() + delay)
+        return watch
+
+    def _connection_lock(self, service):
+        """ Return the lock for pulls on the connection of `service`. """
+        connection = service._connect()
+        with self._cond:
+            lock = self._locks.get(connection)
+            if lock is None:
+                lock = self._locks[connection] = threading.Lock()
+            return lock
+
+    def _schedule(self, watch, due):
+        with self._cond:
+            heapq.heappush(self._due, (due, next(self._sequence), watch))
+            self._cond.notify()
+
+    def _pop_due(self, now):
+        """ Return the active watches due at `now`, dropping cancelled. """
+        due = []
+        while self._due and self._due[0][0] <= now:
+            watch = heapq.heappop(self._due)[2]
+            if watch.active:
+                due.append(watch)
+        return due
+
+    def _poll(self, watch):
+        try:
+            watch.poll()
+        except Exception:
+            logger.exception('Failed to poll %s' % watch.datarep)
+            watch.interval = min(watch.interval * 2, watch.max_interval)
+        if watch.active:
+            self._schedule(watch, self.clock() + watch.interval)
+
+    def run_pending(self):
+        """ Poll the watches that are due in this thread.
+
+        This is an alternative to `start()` for callers with their own
+        loop.  Returns the number of watches polled.
+        """
+        with self._cond:
+            due = self._pop_due(self.clock())
+        for watch in due:
+            self._poll(watch)
+        return len(due)
+
+    def start(self):
+        """ Start polling watches in the background. """
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._executor = ThreadPoolExecutor(self.max_workers)
+            self._thread = threading.Thread(target=self._run,
+                                            name='sleepwalker-watcher',
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self, wait=True):
+        """ Stop polling, waiting for pulls in progress if `wait`. """
+        with self._cond:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+            executor, self._executor = self._executor, None
+        thread.join()
+        executor.shutdown(wait=wait)
+
+    def _run(self):
+        with self._cond:
+            while not self._stopping:
+                now = self.clock()
+                for watch in self._pop_due(now):
+                    self._executor.submit(self._poll, watch)
+                timeout = self._due[0][0] - now if self._due else None
+                self._cond.wait(timeout)
+
+
+# Watcher used by DataRep.watch() by default, see default_watcher()
+_default_watcher = None
+_default_lock = threading.Lock()
+
+
+def default_watcher():
+    """ Return the watcher shared by the process, starting it if needed. """
+    global _default_watcher
+    with _default_lock:
+        if _default_watcher is None:
+            _default_watcher = Watcher()
+            _default_watcher.start()
+        return _default_watcher
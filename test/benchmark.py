@@ -0,0 +1,944 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+"""
+Micro-benchmarks for sleepwalker hot paths.
+
+These run against the same simulated servers as the unit tests, so
+the numbers reflect client-side overhead only.  Run all benchmarks,
+or a subset by name::
+
+   python -m test.benchmark
+   python -m test.benchmark crossref_follow
+
+Each benchmark sets up its scenario with the helpers below, such as
+`stub_service()` and `allocated()`, and prints its results with
+`report()`.
+
+"""
+
+import sys
+import json
+import time
+import logging
+import tracemalloc
+from collections import OrderedDict
+
+from test.service_loader import SERVICE_MANAGER, TEST_SERVER_MANAGER
+
+logger = logging.getLogger(__name__)
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(func):
+    """ Register `func` as a named benchmark. """
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def timed(func, number, per=1):
+    """ Return the average time in microseconds of `number` calls.
+
+    The time is divided by `per`, such as the items handled per call.
+    """
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - start) / number / per * 1e6
+
+
+def allocated(func):
+    """ Return the result of `func` and the bytes still allocated. """
+    tracemalloc.start()
+    try:
+        result = func()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def report(name, unit='us', **results):
+    print('%-28s %s' % (name, '  '.join('%s=%.1f%s' % (k, v, unit)
+                                         for k, v in results.items())))
+
+
+class _StubResponse(object):
+    """ Minimal stand-in for `requests.Response`. """
+    ok = True
+    raw = None
+
+    def __init__(self, content=b'{"id": 1}', status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        pass
+
+
+def stub_connection(hostname, request=None):
+    """ Return a `Connection` whose session never hits the network.
+
+    :param request: called in place of ``Session.request()``, by
+        default returning a `_StubResponse` for any request
+    """
+    from sleepwalker.connection import Connection
+
+    if request is None:
+        def request(*args, **kwargs):
+            return _StubResponse()
+
+    conn = Connection(hostname)
+    conn.conn.request = request
+    return conn
+
+
+def stub_service(service, request=None):
+    """ Return `service` using a `stub_connection()` to its host. """
+    service.connection = stub_connection(service.host, request)
+    return service
+
+
+def dict_service(service_dict, hostname, request=None):
+    """ Return a `Service` for `service_dict` on a `stub_connection()`. """
+    import reschema
+    from sleepwalker.service import Service
+
+    svcdef = reschema.ServiceDef()
+    svcdef.parse(service_dict)
+    return Service(svcdef, hostname,
+                   connection=stub_connection(hostname, request))
+
+
+def bookstore_service(num_books=100):
+    """ Return a bookstore service populated with `num_books` books. """
+    from test.test_bookstore import BookstoreServer
+
+    bookstore_id = 'http://support.riverbed.com/apis/bookstore/1.0'
+    TEST_SERVER_MANAGER.reset()
+    TEST_SERVER_MANAGER.register_server('http://bookstore-server:80',
+                                        bookstore_id, None,
+                                        BookstoreServer, None)
+    service = SERVICE_MANAGER.find_by_id('http://bookstore-server:80',
+                                         bookstore_id)
+    books = service.bind('books')
+    for i in range(num_books):
+        books.create({'title': 'Book %d' % i, 'publisher_id': i % 7,
+                      'author_ids': [i, i + 1],
+                      'chapters': [{'num': 1, 'heading': 'Intro'}]})
+    return service
+
+
+@benchmark
+def crossref_follow(number=2000):
+    """ Cross-service follow() with and without ServiceManager caching. """
+    from test.test_crossref import CrossRefFooServer, CrossRefBarServer
+
+    foo_id = 'http://support.riverbed.com/apis/crossref.foo/1.0'
+    bar_id = 'http://support.riverbed.com/apis/crossref.bar/1.0'
+    TEST_SERVER_MANAGER.reset()
+    TEST_SERVER_MANAGER.register_server('http://crossref-foo-server', foo_id,
+                                        None, CrossRefFooServer, None)
+    TEST_SERVER_MANAGER.register_server('http://crossref-bar-server', bar_id,
+                                        'instance-1', CrossRefBarServer, None)
+
+    foos = SERVICE_MANAGER.find_by_id('http://crossref-foo-server',
+                                      foo_id).bind('foos')
+    foos.create({'bar_id': 1,
+                 'bar_server': 'http://crossref-bar-server',
+                 'bar_instance': 'instance-1'})
+    foos.pull()
+    foo = foos[0]
+
+    cached = timed(lambda: foo.follow('bar'), number)
+
+    def uncached():
+        SERVICE_MANAGER.reset()
+        foo.service._relation_cache.clear()
+        foo.follow('bar')
+    report('crossref_follow', cached=cached,
+           uncached=timed(uncached, number))
+
+
+@benchmark
+def relation_resolve(number=20):
+    """ follow() across all items of a collection, per relation. """
+    from sleepwalker.datarep import _CompiledRelation
+
+    service = bookstore_service()
+    books = service.bind('books')
+    books.pull()
+    items = list(books)
+    fulldata = books.data
+    relation = items[0].relations['full']
+    n = len(items)
+
+    def follow():
+        for item in items:
+            item.follow('full')
+
+    def reschema_resolve():
+        for item in items:
+            relation.resolve(fulldata, item.fragment)
+
+    def compiled_resolve():
+        for item in items:
+            _CompiledRelation.lookup(service, relation,
+                                     item.fragment).resolve(fulldata,
+                                                            item.fragment)
+    report('relation_resolve',
+           follow=timed(follow, number, per=n),
+           reschema=timed(reschema_resolve, number, per=n),
+           compiled=timed(compiled_resolve, number, per=n))
+
+
+@benchmark
+def prepared_request(number=20000):
+    """ Per-request client overhead with and without prepared requests. """
+    service = stub_service(bookstore_service(0))
+    service.add_headers({'X-Client': 'benchmark'})
+    book = service.bind('book', id=1)
+    link = book.links['get']
+
+    report('prepared_request',
+           unprepared=timed(lambda: service.request('GET', book.uri),
+                            number),
+           prepared=timed(lambda: service.request('GET', book.uri,
+                                                  link=link), number))
+
+
+@benchmark
+def resolve_uri(number=200, num_resources=2000):
+    """ Service.resolve_uri() against a linear regex scan of templates. """
+    import re
+    import uritemplate
+
+    resources = OrderedDict()
+    for i in range(num_resources):
+        resources['item%d' % i] = {
+            'type': 'object',
+            'properties': {'id': {'type': 'integer'}},
+            'links': {'self': {'path': '$/items%d/{id}' % i}}}
+    service = dict_service({
+        '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+        'id': 'http://support.riverbed.com/apis/many/1.0',
+        'provider': 'riverbed', 'name': 'many', 'version': '1.0',
+        'resources': resources}, 'http://many-server')
+    uri = '/api/many/1.0/items%d/42' % (num_resources - 1)
+
+    def linear():
+        # What test/sim_server.py does for each request
+        for r in service.servicedef.resources.values():
+            template = r.links['self'].path.template
+            values = dict((v, '__VAR__')
+                          for v in uritemplate.variables(template))
+            uri_re = uritemplate.expand(template, values)
+            uri_re = '^' + service.servicepath + uri_re[1:] + '$'
+            if re.match(uri_re.replace('__VAR__', '([^/]+)'), uri):
+                return r
+
+    report('resolve_uri (%d)' % num_resources,
+           linear=timed(linear, max(number // 100, 1)),
+           indexed=timed(lambda: service.resolve_uri(uri), number))
+
+
+@benchmark
+def iterate(number=1, num_items=1000000):
+    """ Walking a large array by index, by iterator, and raw. """
+    import reschema
+    from sleepwalker.datarep import DataRep
+    from test.test_datarep import ANY_SERVICE_DEF
+
+    jsonschema = reschema.jsonschema.Schema.parse(
+        {'type': 'array', 'items': {'type': 'integer'}}, name='ints',
+        servicedef=ANY_SERVICE_DEF)
+    array = DataRep.from_schema(object(), 'http://any-server/ints',
+                                jsonschema=jsonschema,
+                                data=list(range(num_items)))
+
+    def indexed():
+        for i in range(len(array)):
+            array[i].data
+
+    def iterator():
+        for item in array:
+            item.data
+
+    def raw():
+        for pointer, value in array.iter_raw():
+            pass
+
+    # Per item
+    report('iterate (%d)' % num_items,
+           indexed=timed(indexed, number, per=num_items),
+           iterator=timed(iterator, number, per=num_items),
+           raw=timed(raw, number, per=num_items))
+
+
+@benchmark
+def to_columns(number=5, num_items=100000):
+    """ ListDataRep.to_columns() against a Python loop over the data. """
+    from sleepwalker.datarep import DataRep
+    from test.test_columns import SAMPLES_SCHEMA, make_samples
+
+    samples = DataRep.from_schema(object(), 'http://any-server/samples',
+                                  jsonschema=SAMPLES_SCHEMA,
+                                  data=make_samples(num_items))
+
+    def loop():
+        columns = dict((k, []) for k in ('timestamp', 'value', 'name'))
+        for item in samples.data:
+            for k, column in columns.items():
+                column.append(item.get(k))
+
+    # Per item
+    report('to_columns (%d)' % num_items,
+           loop=timed(loop, number, per=num_items),
+           columns=timed(lambda: samples.to_columns(
+               'timestamp', 'value', 'name'), number, per=num_items))
+
+
+@benchmark
+def records_memory(num_books=100000):
+    """ Memory held by decoded bookstore books, as dicts and as records. """
+    from sleepwalker import records
+
+    book = bookstore_service(1).bind('book', id=1)
+    text = json.dumps([{'id': i, 'title': 'Book %d' % i,
+                        'publisher_id': i % 7, 'author_ids': [i, i + 1],
+                        'chapters': [{'num': 1, 'heading': 'Intro'}]}
+                       for i in range(num_books)])
+
+    def decode():
+        return [records.decode(book.jsonschema, b) for b in json.loads(text)]
+
+    # Per book
+    report('records_memory (%d)' % num_books, unit='B',
+           dicts=allocated(lambda: json.loads(text))[1] / num_books,
+           records=allocated(decode)[1] / num_books)
+
+
+@benchmark
+def codegen(number=5000):
+    """ Generated client classes against dynamic bind/execute. """
+    import os
+    import types
+    from reschema import ServiceDef
+    from sleepwalker import codegen
+    from test.test_bookstore import TEST_PATH
+
+    module = types.ModuleType('bookstore')
+    exec(codegen.generate(ServiceDef.create_from_file(
+        os.path.join(TEST_PATH, 'Bookstore.yml'))), module.__dict__)
+
+    service = stub_service(bookstore_service(1))
+    book = service.bind('book', id=1)
+    generated = module.Book.bind(service, id=1)
+    book.data = generated.data = {'id': 1, 'title': 'Book',
+                                  'publisher_id': 1, 'author_ids': [1, 2],
+                                  'chapters': [{'num': 1, 'heading': 'a'}]}
+    order = {'num_copies': 2,
+             'shipping_address': {'street': '1 Main St', 'city': 'Here',
+                                  'state': 'CA', 'zip': '94105'}}
+    book_schema = book.jsonschema
+
+    report('codegen bind',
+           dynamic=timed(lambda: service.bind('book', id=1), number),
+           generated=timed(lambda: module.Book.bind(service, id=1), number))
+    report('codegen execute',
+           dynamic=timed(lambda: book.execute('purchase', order), number),
+           generated=timed(lambda: generated.purchase(order), number))
+    report('codegen validate',
+           dynamic=timed(lambda: book._validate(book_schema, book.data),
+                         number),
+           generated=timed(lambda: generated._validate(book_schema,
+                                                       book.data), number))
+
+
+@benchmark
+def lazy_decode(number=20, num_chapters=20000):
+    """ Pull and read one field of a large book, eager against lazy. """
+    from sleepwalker import datarep
+
+    content = json.dumps({
+        'id': 1, 'title': 'Book', 'publisher_id': 1, 'author_ids': [1, 2],
+        'chapters': [{'num': i, 'heading': 'Chapter %d' % i}
+                     for i in range(num_chapters)]}).encode('utf-8')
+
+    service = stub_service(bookstore_service(0),
+                           lambda *args, **kwargs: _StubResponse(content))
+    book = service.bind('book', id=1)
+
+    def title():
+        book.pull()
+        return book['title'].data
+
+    def held():
+        size = allocated(book.pull)[1]
+        book.data = None
+        return size
+
+    results = {}
+    for lazy in (False, True):
+        datarep.DECODE_LAZY = lazy
+        try:
+            name = 'lazy' if lazy else 'eager'
+            results[name] = timed(title, number)
+            results[name + '_memory'] = held()
+        finally:
+            datarep.DECODE_LAZY = False
+
+    report('lazy_decode (%d)' % num_chapters,
+           eager=results['eager'], lazy=results['lazy'])
+    # The response bytes are shared by every pull here, so count them
+    # once against the lazy result
+    report('lazy_decode memory (%d)' % num_chapters, unit='B',
+           eager=results['eager_memory'],
+           lazy=results['lazy_memory'] + len(content))
+
+
+@benchmark
+def interning(num_items=100000, page_size=1000):
+    """ Memory held by a paged collection, with and without interning. """
+    from reschema import ServiceDef
+    from sleepwalker.interning import InternTable
+
+    servicedef = ServiceDef()
+    servicedef.parse({
+        '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+        'id': 'http://support.riverbed.com/apis/benchmark/1.0',
+        'provider': 'riverbed', 'name': 'benchmark', 'version': '1.0',
+        'resources': {'items': {'type': 'array', 'items': {
+            'type': 'object',
+            'properties': dict(
+                [('field_%d' % i, {'type': 'integer'}) for i in range(16)] +
+                [('status', {'type': 'string',
+                             'enum': ['active', 'inactive', 'pending']}),
+                 ('region', {'type': 'string', 'maxLength': 16}),
+                 ('owner', {'type': 'string'}),
+                 ('id', {'type': 'integer'})])}}}})
+    schema = servicedef.find_resource('items')
+    statuses = ['active', 'inactive', 'pending']
+    pages = [json.dumps([
+        dict([('field_%d' % i, n * i) for i in range(16)] +
+             [('status', statuses[n % 3]), ('region', 'us-west-%d' % (n % 4)),
+              ('owner', 'owner %d' % n), ('id', n)])
+        for n in range(start, start + page_size)]).encode('utf-8')
+        for start in range(0, num_items, page_size)]
+
+    def held(decode):
+        return allocated(lambda: [decode(page) for page in pages])[1]
+
+    def interned():
+        table = InternTable()
+        return lambda page: table.values(schema, table.loads(page))
+
+    # Per item.  A single json.loads() already shares keys within one
+    # response, so the key savings show across pages.
+    report('interning (%d items, %d per page)' % (num_items, page_size),
+           unit='B',
+           plain=held(json.loads) / num_items,
+           interned=held(interned()) / num_items)
+    # Per page
+    decode = interned()
+    report('interning decode (%d per page)' % page_size,
+           plain=timed(lambda: json.loads(pages[0]), 20),
+           interned=timed(lambda: decode(pages[0]), 20))
+
+
+@benchmark
+def copy_on_write(number=5, num_books=20000, num_edits=10):
+    """ Editing shared data: defensive deep copy against copy-on-write. """
+    import copy
+    from sleepwalker import datarep
+
+    service = bookstore_service(0)
+    shared = [{'id': i, 'title': 'Book %d' % i, 'author_ids': [i, i + 1]}
+              for i in range(num_books)]
+    books = service.bind('books')
+
+    def edit(data):
+        books.data = data
+        for i in range(num_edits):
+            books[i * 7]['title'].data = 'Title %d' % i
+        return books.data
+
+    def deepcopy():
+        return edit(copy.deepcopy(shared))
+
+    def cow():
+        datarep.COPY_ON_WRITE = True
+        try:
+            return edit(shared)
+        finally:
+            datarep.COPY_ON_WRITE = False
+
+    report('copy_on_write (%d books, %d edits)' % (num_books, num_edits),
+           deepcopy=timed(deepcopy, number), cow=timed(cow, number))
+    report('copy_on_write memory', unit='B',
+           deepcopy=allocated(deepcopy)[1], cow=allocated(cow)[1])
+
+
+@benchmark
+def readonly(number=20000, num_books=20000):
+    """ Read-only binding, and frozen data against defensive copies. """
+    import copy
+    from sleepwalker.exceptions import LinkError
+    from sleepwalker.frozen import freeze
+
+    service = bookstore_service(0)
+    book = service.bind('book', id=1, _readonly=True)
+
+    def push():
+        try:
+            book.push()
+        except LinkError:
+            pass
+
+    report('readonly bind',
+           writable=timed(lambda: service.bind('book', id=1), number),
+           readonly=timed(lambda: service.bind('book', id=1, _readonly=True),
+                          number))
+    report('readonly push rejected', readonly=timed(push, number))
+
+    # Handing the same pulled data to 10 readers
+    data = [{'id': i, 'title': 'Book %d' % i, 'author_ids': [i, i + 1]}
+            for i in range(num_books)]
+    report('readonly share (%d books, 10 readers)' % num_books,
+           deepcopy=timed(lambda: [copy.deepcopy(data) for _ in range(10)],
+                          1),
+           frozen=timed(lambda: [freeze(data)] * 10, 1))
+
+
+@benchmark
+def raw(number=20000):
+    """ Fetching plain data with and without a DataRep. """
+    service = stub_service(bookstore_service(0))
+
+    report('raw get',
+           datarep=timed(lambda: service.bind('book', id=1).pull().data,
+                         number),
+           raw=timed(lambda: service.get_raw('book', id=1), number))
+
+
+@benchmark
+def spill(number=2000, num_chapters=200000):
+    """ Memory held by a large response and random reads from it. """
+    import random
+    from sleepwalker.lazyjson import LazyJson
+    from sleepwalker.spill import spill
+
+    content = json.dumps({
+        'id': 1, 'title': 'Book',
+        'chapters': [{'num': i, 'heading': 'Chapter %d' % i}
+                     for i in range(num_chapters)]}).encode('utf-8')
+    chunks = [content[i:i + (1 << 20)]
+              for i in range(0, len(content), 1 << 20)]
+
+    decoded, decoded_size = allocated(lambda: json.loads(content))
+    spilled, spilled_size = allocated(lambda: spill(chunks, 0))
+    # Indexing the chapters is a one-off cost on the first read
+    _, index_size = allocated(lambda: spilled.length(['chapters']))
+    lazy = LazyJson(content)
+
+    def parts():
+        return ['chapters', str(random.randrange(num_chapters)), 'heading']
+
+    report('spill held (%d)' % num_chapters, unit='B',
+           decoded=decoded_size, lazy=len(content),
+           spilled=spilled_size + index_size)
+    report('spill read (%d)' % num_chapters,
+           lazy=timed(lambda: lazy.decode_pointer(parts()), 20),
+           spilled=timed(lambda: spilled.decode_pointer(parts()), number))
+
+
+@benchmark
+def snapshot(num_books=1000, num_chapters=100):
+    """ Warming up books by pulling them against restoring a snapshot. """
+    import os
+    import tempfile
+    from sleepwalker import datarep
+
+    content = json.dumps({
+        'id': 1, 'title': 'Book', 'publisher_id': 1, 'author_ids': [1, 2],
+        'chapters': [{'num': i, 'heading': 'Chapter %d' % i}
+                     for i in range(num_chapters)]}).encode('utf-8')
+
+    def request(method, url, headers=None, **kwargs):
+        if headers and headers.get('If-None-Match') == '"1"':
+            return _StubResponse(b'', 304, {'ETag': '"1"'})
+        return _StubResponse(content, headers={'ETag': '"1"'})
+
+    service = stub_service(bookstore_service(0), request)
+    manager = service.service_manager
+
+    def cold():
+        books = [service.bind('book', id=i) for i in range(num_books)]
+        for book in books:
+            book.pull()
+        return books
+
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        books = cold()
+        manager.snapshot(path)
+        size = os.path.getsize(path)
+        del books
+        datarep._validated.clear()
+
+        def warm():
+            for book in manager.restore(path):
+                book.pull()
+
+        report('snapshot warm-up (%d books)' % num_books, unit='ms',
+               pull=timed(cold, 1) / 1000, restore=timed(warm, 1) / 1000)
+        report('snapshot bytes (%d books)' % num_books, unit='B',
+               pulled=len(content) * num_books, snapshot=size)
+    finally:
+        os.remove(path)
+
+
+@benchmark
+def watch(number=200, num_chapters=1000, num_books=100, hours=1):
+    """ Diffing pulled books, and pulls made by adaptive watches. """
+    from sleepwalker.watch import diff, Watcher
+
+    old = {'id': 1, 'title': 'Book', 'chapters': [
+        {'num': i, 'heading': 'Chapter %d' % i} for i in range(num_chapters)]}
+    new = json.loads(json.dumps(old))
+    new['chapters'][-1]['heading'] = 'Changed'
+    report('watch diff (%d chapters)' % num_chapters,
+           changed=timed(lambda: diff(old, new), number),
+           shared=timed(lambda: diff(old, old), number))
+
+    # One book in ten changes every minute, the others never do
+    now = [0.0]
+
+    def request(method, url, **kwargs):
+        id = int(url.rsplit('/', 1)[1])
+        version = int(now[0] // 60) if id % 10 == 0 else 0
+        return _StubResponse(json.dumps({
+            'id': id, 'title': 'Book %d' % version, 'publisher_id': 1,
+            'author_ids': [1, 2], 'chapters': []}).encode('utf-8'))
+
+    service = stub_service(bookstore_service(0), request)
+
+    results = {}
+    for name, bounds in (('fixed', (60, 60)), ('adaptive', (15, 480))):
+        watcher = Watcher(clock=lambda: now[0])
+        changes = [0]
+
+        def callback(dr, pointers):
+            changes[0] += 1
+
+        now[0] = 0.0
+        watches = [watcher.watch(service.bind('book', id=i), callback, 60,
+                                 *bounds) for i in range(num_books)]
+        while now[0] < hours * 3600:
+            watcher.run_pending()
+            now[0] += 1
+        results[name] = sum(w.pulls for w in watches)
+        results[name + '_changes'] = changes[0]
+    report('watch pulls (%d books, %dh)' % (num_books, hours), unit='',
+           **results)
+
+
+@benchmark
+def events(num_books=100, num_updates=20000):
+    """ Applying pushed updates against pulling the changed books. """
+    import io
+    import threading
+    from sleepwalker.events import EventStream
+
+    service = stub_service(bookstore_service(0))
+    conn = service.connection
+    books = [service.bind('book', id=i) for i in range(num_books)]
+    book = {'id': 0, 'title': 'Book', 'publisher_id': 1,
+            'author_ids': [1, 2],
+            'chapters': [{'num': i, 'heading': 'Chapter %d' % i}
+                         for i in range(10)]}
+    pulled_content = json.dumps(book).encode('utf-8')
+
+    stream = []
+    for i in range(num_updates):
+        stream.append('id: %d\nevent: update\ndata: %s\n\n' % (i, json.dumps(
+            {'href': books[i % num_books].uri, 'data': book})))
+    content = ''.join(stream).encode('utf-8')
+
+    def pushed():
+        done = threading.Event()
+        count = [0]
+
+        def callback(dr, event):
+            count[0] += 1
+            if count[0] == num_updates:
+                done.set()
+
+        # The stream starts on the first subscription, so hold it
+        # until all books are subscribed
+        subscribed = threading.Event()
+
+        def request(*args, **kwargs):
+            subscribed.wait()
+            response = _StubResponse()
+            response.raw = io.BytesIO(content)
+            return response
+
+        conn.conn.request = request
+        events = EventStream(conn, '/events')
+        events.retry = 60
+        for dr in books:
+            events.subscribe(dr, callback)
+        subscribed.set()
+        done.wait()
+        events.stop()
+
+    def pull(*args, **kwargs):
+        return _StubResponse(pulled_content)
+
+    def pulled():
+        conn.conn.request = pull
+        for i in range(num_updates):
+            books[i % num_books].pull()
+
+    report('events (%d updates)' % num_updates, unit='us',
+           push=timed(pushed, 1, per=num_updates),
+           pull=timed(pulled, 1, per=num_updates))
+    report('events bytes per update', unit='B',
+           push=len(content) / num_updates, pull=len(pulled_content))
+
+
+@benchmark
+def paging(num_items=2000, page_size=100, latency=0.005):
+    """ Iterating a paged collection with and without prefetch. """
+    import urllib.parse
+    from sleepwalker.paging import OffsetPager
+    from test.test_paging import SERVICE_DICT
+
+    def request(method, url, **kwargs):
+        # Server latency per page
+        time.sleep(latency)
+        qs = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        offset, limit = int(qs['offset'][0]), int(qs['limit'][0])
+        end = min(offset + limit, num_items)
+        return _StubResponse(json.dumps(
+            [{'id': i} for i in range(offset, end)]).encode())
+
+    service = dict_service(SERVICE_DICT, 'http://paging-server:80', request)
+    service.add_pager('items', 'get', OffsetPager(limit=page_size))
+    items = service.bind('items')
+
+    def consume(prefetch):
+        for item in items.paginate(prefetch=prefetch):
+            if item.fragment == '/0':
+                # Work on each page as long as the server takes for it
+                time.sleep(latency)
+
+    results = {}
+    for n in (0, 1, 2):
+        results['prefetch_%d' % n] = timed(lambda: consume(n), 3) / 1000
+    report('paging (%d items, %d per page)' % (num_items, page_size),
+           unit='ms', **results)
+
+
+@benchmark
+def sync(number=20, num_items=50000, num_changes=10):
+    """ Refreshing a large collection by full pull and by delta sync. """
+    import urllib.parse
+    from sleepwalker.sync import TokenDelta
+    from test.test_sync import SERVICE_DICT, Server
+
+    server = Server(num_items)
+    sent = []
+
+    def request(method, url, **kwargs):
+        parsed = urllib.parse.urlsplit(url)
+        qs = urllib.parse.parse_qs(parsed.query)
+        if parsed.path.endswith('/changes'):
+            result = server.changes(_Request(qs), None)
+        else:
+            result = [item for item, _ in server.items.values()]
+        response = _StubResponse(json.dumps(result).encode())
+        sent.append(len(response.content))
+        return response
+
+    class _Request(object):
+        def __init__(self, qs):
+            self.qs = qs
+
+    service = dict_service(SERVICE_DICT, 'http://sync-server:80', request)
+    service.add_delta('items', 'changes', TokenDelta())
+    items = service.bind('items')
+    items.sync('changes')
+    item = items.build_index('id')[num_items // 2]
+
+    counter = iter(range(10 ** 9))
+
+    def change():
+        n = next(counter)
+        for i in range(num_changes):
+            id = (n * num_changes + i) % num_items
+            server.change(id, 'changed %d' % n)
+
+    def pull():
+        change()
+        items.pull()
+
+    def delta():
+        change()
+        items.sync('changes')
+
+    def delta_delete():
+        change()
+        n = next(counter)
+        server.delete(n)
+        server.change(n, 'restored')
+        items.sync('changes')
+
+    del sent[:]
+    pull_us = timed(pull, number)
+    pull_bytes = sum(sent) // len(sent)
+    items.sync('changes')
+    del sent[:]
+    sync_us = timed(delta, number)
+    sync_bytes = sum(sent) // len(sent)
+    assert item.data['id'] == num_items // 2
+    delete_us = timed(delta_delete, number)
+    report('sync (%d items, %d changed)' % (num_items, num_changes),
+           unit='us', pull=pull_us, sync=sync_us, sync_delete=delete_us)
+    report('sync response size', unit='B', pull=pull_bytes, sync=sync_bytes)
+
+
+@benchmark
+def projection(number=20, num_items=2000, num_fields=60, num_read=3):
+    """ Pulling all fields vs the fields read through a projection. """
+    from sleepwalker.projection import Projection
+
+    fields = ['field%d' % i for i in range(num_fields)]
+    service_dict = {
+        '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+        'id': 'http://support.riverbed.com/apis/projection/1.0',
+        'provider': 'riverbed',
+        'name': 'projection',
+        'version': '1.0',
+        'resources': {'items': {
+            'type': 'array',
+            'items': {'type': 'object', 'properties': dict(
+                (field, {'type': 'string'}) for field in fields)},
+            'links': {
+                'self': {'path': '$/items'},
+                'get': {'method': 'GET',
+                        'response': {'$ref': '#/resources/items'}},
+            },
+        }},
+    }
+    items = [dict((field, '%s of item %d' % (field, i)) for field in fields)
+             for i in range(num_items)]
+    sent = []
+    # Encoded responses by fields requested, so as to time the client
+    encoded = {}
+
+    def request(method, url, params=None, **kwargs):
+        wanted = params['fields'] if params else None
+        content = encoded.get(wanted)
+        if content is None:
+            result = items
+            if wanted:
+                result = [dict((field, item[field])
+                               for field in wanted.split(','))
+                          for item in items]
+            content = encoded[wanted] = json.dumps(result).encode()
+        sent.append(len(content))
+        return _StubResponse(content)
+
+    def bind(projected):
+        service = dict_service(service_dict, 'http://projection-server:80',
+                               request)
+        if projected:
+            service.add_projection('items', Projection())
+        return service.bind('items')
+
+    def read(dr):
+        for item in dr:
+            for field in fields[:num_read]:
+                item[field].data
+
+    results = {}
+    for name, projected in (('full', False), ('projected', True)):
+        dr = bind(projected)
+        read(dr)
+        dr.pull()
+        results[name + '_bytes'] = sent[-1]
+        results[name + '_pull'] = timed(dr.pull, number)
+        results[name + '_read'] = timed(lambda: read(dr), number)
+    report('projection (%d items, %d of %d fields read)' %
+           (num_items, num_read, num_fields), unit='us',
+           **dict((k, v) for k, v in results.items()
+                  if not k.endswith('_bytes')))
+    report('projection response size', unit='B',
+           full=results['full_bytes'], projected=results['projected_bytes'])
+
+
+@benchmark
+def coalesce(num_threads=4, num_pushes=50, latency=0.002, window=0.005):
+    """ PUTs issued by threads pushing fields, with and without a window. """
+    import threading
+    from test.test_coalesce import SERVICE_DICT, FIELDS
+
+    puts = []
+
+    def request(method, url, data=None, **kwargs):
+        # Server latency per request
+        time.sleep(latency)
+        puts.append(method)
+        return _StubResponse(data.encode())
+
+    service = dict_service(SERVICE_DICT, 'http://coalesce-server:80', request)
+
+    def run(window):
+        item = service.bind('item')
+        item.data = dict((field, 0) for field in FIELDS)
+        item.coalesce(window)
+
+        def loop(field):
+            for i in range(num_pushes):
+                item[field].push(i)
+
+        def pushes():
+            threads = [threading.Thread(target=loop, args=(field,))
+                       for field in FIELDS[:num_threads]]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            item.flush()
+
+        del puts[:]
+        elapsed = timed(pushes, 1) / 1000
+        return len(puts), elapsed
+
+    plain_puts, plain_ms = run(0)
+    coalesced_puts, coalesced_ms = run(window)
+    report('coalesce (%d threads x %d pushes)' % (num_threads, num_pushes),
+           unit='', plain_puts=plain_puts, coalesced_puts=coalesced_puts)
+    report('coalesce elapsed', unit='ms', plain=plain_ms,
+           coalesced=coalesced_ms)
+
+
+def main(names):
+    logging.basicConfig(level=logging.WARNING)
+    for name in (names or BENCHMARKS.keys()):
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
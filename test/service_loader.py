@@ -12,6 +12,8 @@ from requests.structures import CaseInsensitiveDict
 
 from reschema import ServiceDef, ServiceDefManager
 from sleepwalker import ServiceManager, ConnectionManager
+from sleepwalker.connection import Connection
+from sleepwalker.service import Service
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +48,16 @@ SERVICE_MANAGER = ServiceManager(servicedef_manager=SERVICE_DEF_MANAGER,
                                  connection_manager=CONNECTION_MANAGER)
 
 
+def service_from_dict(service_dict, host, **kwargs):
+    """ Return a Service for `service_dict` with a Connection to `host`.
+
+    Keyword arguments are passed to the Connection.
+    """
+    svcdef = ServiceDef()
+    svcdef.parse(service_dict)
+    return Service(svcdef, host, connection=Connection(host, **kwargs))
+
+
 class TestRequest(object):
 
     def __init__(self, conn, method, uri, data, params, headers):
@@ -105,6 +117,7 @@ class TestServerManager(object):
         logger.info("Resetting registered servers")
         TestServerManager.server_map = {}
         self.service_manager.connection_manager.reset()
+        self.service_manager.reset()
 
     def connect(self, host, auth):
         return TestConnection(self, host, auth)
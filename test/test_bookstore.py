@@ -8,6 +8,11 @@ import os
 import logging
 import unittest
 
+from sleepwalker.datarep import _CompiledRelation
+from reschema.exceptions import MissingParameter
+
+from sleepwalker.exceptions import \
+    ResourceException, InvalidParameter, LinkError
 from test.sim_server import SimServer
 from test.service_loader import \
     SERVICE_MANAGER, ServiceDefLoader, TEST_SERVER_MANAGER
@@ -93,6 +98,187 @@ class BookstoreTest(unittest.TestCase):
         freds_books = fred.follow('books')
         self.assertEqual(len(freds_books.data), 6)
 
+    def test_compiled_relations(self):
+        book = self.service.bind('books').create(
+            {'title': 'A book', 'publisher_id': 3, 'author_ids': [7, 9],
+             'chapters': [{'num': 1, 'heading': 'Intro'},
+                          {'num': 2, 'heading': 'Outro'}]})
+
+        # Compiled relations must resolve exactly like reschema does
+        fulldata = book.data
+        for frag in [book, book['author_ids'][0], book['author_ids'][1],
+                     book['chapters'][0], book['chapters'][1]]:
+            for relation in frag.relations.values():
+                compiled = _CompiledRelation.lookup(
+                    self.service, relation, frag.fragment)
+                self.assertEqual(
+                    compiled.resolve(fulldata, frag.fragment),
+                    relation.resolve(fulldata, frag.fragment))
+
+        self.assertEqual(book['author_ids'][1].follow('full').uri,
+                         self.service.servicepath + '/authors/9')
+        chapter = book['chapters'][1].follow('full')
+        self.assertEqual(chapter.uri, self.service.servicepath +
+                         '/books/%d/chapters/2' % book.data['id'])
+        self.assertEqual(chapter.path_vars,
+                         {'bookid': book.data['id'], 'num': 2})
+
+        # One compiled entry per relation and fragment depth, shared by
+        # all items of an array
+        keys = [k for k in self.service._relation_cache
+                if k[0].name == 'full']
+        self.assertEqual(sorted(k[1] for k in keys), [2, 2])
+
+    def test_resolve_uri(self):
+        books = self.service.bind('books')
+        book = books.create({'title': 'A book', 'author_ids': []})
+        path = self.service.servicepath
+
+        found = self.service.resolve_uri(book.uri)
+        self.assertEqual(found.uri, book.uri)
+        self.assertEqual(found.jsonschema, book.jsonschema)
+        self.assertEqual(found.path_vars, {'id': book.data['id']})
+        self.assertEqual(found.data, book.data)
+
+        chapter = self.service.resolve_uri(
+            'http://bookstore-server' + path + '/books/3/chapters/2')
+        self.assertEqual(chapter.jsonschema.name, 'book_chapter')
+        self.assertEqual(chapter.path_vars, {'bookid': 3, 'num': 2})
+
+        filtered = self.service.resolve_uri(path + '/books?author=4')
+        self.assertEqual(filtered.jsonschema.name, 'books')
+        self.assertEqual(filtered.uri, path + '/books?author=4')
+
+        self.assertEqual(self.service.resolve_uri(path + '/info').uri,
+                         path + '/info')
+
+        for uri in [path + '/books/1/unknown', path + '/nothing',
+                    '/api/other/1.0/books/1',
+                    'http://other-server' + path + '/books/1']:
+            with self.assertRaises(ResourceException):
+                self.service.resolve_uri(uri)
+
+        with self.assertRaises(InvalidParameter):
+            self.service.resolve_uri(path + '/books?nosuchparam=1')
+
+    def test_declared_index(self):
+        self.service.add_index('books', 'id')
+        self.service.add_index('books', 'title', unique=False)
+        books = self.service.bind('books')
+        for title in ['A', 'B', 'A']:
+            books.create({'title': title, 'author_ids': []})
+
+        self.assertEqual(sorted(books.indexes), ['id', 'title'])
+        by_id = books.indexes['id']
+        self.assertTrue(by_id.unique)
+        ids = [b['id'] for b in books.data]
+        self.assertEqual(by_id[ids[1]].data['title'], 'B')
+        self.assertEqual(len(books.indexes['title']['A']), 2)
+
+        # Declared for every DataRep of the resource, maintained on pull
+        books.create({'title': 'C', 'author_ids': []})
+        other = self.service.bind('books')
+        self.assertEqual(sorted(other.indexes), ['id', 'title'])
+        self.assertNotIn('C', books.indexes['title'])
+        books.pull()
+        self.assertIn('C', books.indexes['title'])
+        self.assertEqual(by_id[books.data[-1]['id']].follow('full').data,
+                         {'id': books.data[-1]['id'], 'title': 'C',
+                          'author_ids': []})
+
+    def test_records(self):
+        from sleepwalker import datarep, records
+
+        books = self.service.bind('books')
+        created = books.create(
+            {'title': 'A book', 'publisher_id': 3, 'author_ids': [7, 9],
+             'chapters': [{'num': 1, 'heading': 'Intro'}]})
+
+        original = datarep.DECODE_RECORDS
+        datarep.DECODE_RECORDS = True
+        try:
+            book = self.service.bind('book', id=created.data['id'])
+            self.assertIsInstance(book.data, records.Record)
+            self.assertIsInstance(book.data['chapters'][0], records.Record)
+            self.assertEqual(book.data, created.data)
+
+            # Fragments, relations and setting data work unchanged
+            self.assertEqual(book['chapters'][0]['heading'].data, 'Intro')
+            self.assertEqual(book['author_ids'][1].follow('full').uri,
+                             self.service.servicepath + '/authors/9')
+            book['chapters'][0]['heading'].push('Preface')
+
+            books.pull()
+            self.assertIsInstance(books.data[0], records.Record)
+            self.assertEqual(books[0]['title'].data, 'A book')
+        finally:
+            datarep.DECODE_RECORDS = original
+
+        # What was pushed round-trips exactly
+        created.pull()
+        self.assertEqual(created.data,
+                         {'id': created.data['id'], 'title': 'A book',
+                          'publisher_id': 3, 'author_ids': [7, 9],
+                          'chapters': [{'num': 1, 'heading': 'Preface'}]})
+        self.assertIs(type(created.data), dict)
+
+    def test_select(self):
+        books = self.service.bind('books')
+        for title, author_ids in [('A', [1]), ('B', [1, 2]), ('C', [2])]:
+            books.create({'title': title, 'author_ids': author_ids,
+                          'chapters': [{'num': 1, 'heading': title + '1'},
+                                       {'num': 2, 'heading': title + '2'}]})
+        books.pull()
+
+        found = list(books.select('$[?(@.title == "B")]'))
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0].fragment, '/1')
+        self.assertIs(found[0].root, books)
+
+        # Relations work on selected fragments
+        book = found[0].follow('full')
+        self.assertEqual(book.data['author_ids'], [1, 2])
+
+        headings = [c.data for c in book.select('$.chapters[*].heading')]
+        self.assertEqual(headings, ['B1', 'B2'])
+
+        authors = list(book.select('$.author_ids[?(@ > 1)]'))
+        self.assertEqual([a.fragment for a in authors], ['/author_ids/1'])
+        self.assertEqual(authors[0].follow('full').uri,
+                         self.service.servicepath + '/authors/2')
+
+        # Selecting from a fragment yields pointers from the root
+        chapters = list(book['chapters'].select('..[?(@.num == 2)]'))
+        self.assertEqual([c.fragment for c in chapters], ['/chapters/1'])
+        self.assertEqual(chapters[0].follow('full').path_vars,
+                         {'bookid': book.data['id'], 'num': 2})
+
+    def test_raw(self):
+        books = self.service.bind('books')
+        created = books.create({'title': 'A book', 'author_ids': [1]})
+        books.create({'title': 'Another book', 'author_ids': [2]})
+        book_id = created.data['id']
+
+        self.assertEqual(self.service.get_raw('book', id=book_id),
+                         created.data)
+        self.assertEqual(self.service.get_raw('books'), books.pull().data)
+        self.assertEqual(self.service.get_raw('books', author=2),
+                         [{'id': book_id + 1, 'title': 'Another book'}])
+        self.assertEqual(
+            self.service.execute_raw('book', 'purchase', {'num_copies': 2},
+                                     id=book_id),
+            {'delivery_date': 'Oct 1', 'final_cost': 2 * 12.99})
+
+        # Links are compiled once per service
+        self.assertIn(('book', 'get'), self.service._raw_links)
+
+        with self.assertRaises(MissingParameter):
+            self.service.get_raw('book')
+        with self.assertRaises(InvalidParameter):
+            self.service.get_raw('book', id=book_id, bad=1)
+        with self.assertRaises(LinkError):
+            self.service.execute_raw('book', 'nosuch', id=book_id)
+
 
 if __name__ == '__main__':
     logging.basicConfig(filename='test.log', level=logging.DEBUG)
@@ -0,0 +1,206 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import threading
+import time
+
+import mock
+
+import pytest
+import requests_mock
+
+from sleepwalker.exceptions import HTTPError, LinkError
+from test.service_loader import service_from_dict
+from test.test_datarep import ANY_URI
+
+FIELDS = ['a', 'b', 'c', 'd']
+
+SERVICE_DICT = {
+    '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+    'id': 'http://support.riverbed.com/apis/coalesce/1.0',
+    'provider': 'riverbed',
+    'name': 'coalesce',
+    'version': '1.0',
+    'resources': {
+        'item': {
+            'type': 'object',
+            'properties': dict((field, {'type': 'number'})
+                               for field in FIELDS),
+            'links': {
+                'self': {'path': '$/item'},
+                'get': {
+                    'method': 'GET',
+                    'response': {'$ref': '#/resources/item'},
+                },
+                'set': {
+                    'method': 'PUT',
+                    'request': {'$ref': '#/resources/item'},
+                    'response': {'$ref': '#/resources/item'},
+                },
+            },
+        },
+        'other': {
+            'type': 'object',
+            'links': {'self': {'path': '$/other'}},
+        },
+    },
+}
+
+ITEM_URI = ANY_URI + '/api/coalesce/1.0/item'
+
+
+@pytest.fixture
+def service():
+    return service_from_dict(SERVICE_DICT, ANY_URI)
+
+
+def push_all(item, values):
+    """ Push each field of `values` from its own thread at once. """
+    start = threading.Barrier(len(values))
+    results = {}
+
+    def push(field, value):
+        start.wait()
+        try:
+            results[field] = item[field].push(value)
+        except Exception as e:
+            results[field] = e
+
+    threads = [threading.Thread(target=push, args=pair)
+               for pair in values.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_coalesce(service):
+    service.add_coalescing('item', 0.2)
+    item = service.bind('item')
+    with requests_mock.mock() as m:
+        m.get(ITEM_URI, json=dict((field, 0) for field in FIELDS))
+        m.put(ITEM_URI, json=lambda request, context: request.json())
+        item.pull()
+
+        # Pushes return once the one request of the window is sent
+        results = push_all(item, {'a': 1, 'b': 2, 'c': 3})
+        fragments = sorted(r.fragment for r in results.values())
+        assert fragments == ['/a', '/b', '/c']
+        puts = [r for r in m.request_history if r.method == 'PUT']
+        assert len(puts) == 1
+        assert puts[0].json() == {'a': 1, 'b': 2, 'c': 3, 'd': 0}
+        assert item.data == {'a': 1, 'b': 2, 'c': 3, 'd': 0}
+
+        # Every push of the window raises the failure of the request
+        m.put(ITEM_URI, status_code=500, json={})
+        results = push_all(item, {'a': 4, 'b': 5})
+        assert isinstance(results['a'], HTTPError)
+        assert results['a'] is results['b']
+        assert m.call_count == 3
+        item.flush()
+
+        # A DataRep can turn coalescing off
+        m.reset_mock()
+        m.put(ITEM_URI, json=lambda request, context: request.json())
+        item.coalesce(0)
+        push_all(item, {'a': 6, 'b': 7})
+        assert m.call_count == 2
+
+
+def test_window(service):
+    item = service.bind('item')
+    item.coalesce(0.05)
+    with requests_mock.mock() as m:
+        m.put(ITEM_URI, json=lambda request, context: request.json())
+        item.data = dict((field, 0) for field in FIELDS)
+
+        # The timer sends the request at the end of the window
+        start = time.monotonic()
+        assert item['a'].push(1).fragment == '/a'
+        assert time.monotonic() - start >= 0.05
+        assert m.call_count == 1
+
+        # As does the first push after the window, which the pending
+        # pushes join
+        item.coalesce(10)
+        pending = threading.Thread(target=item['a'].push, args=(5,))
+        pending.start()
+        while item._push_batch is None:
+            time.sleep(0.01)
+        with mock.patch.object(time, 'monotonic',
+                               return_value=time.monotonic() + 10):
+            item['b'].push(6)
+        pending.join()
+        assert m.call_count == 2
+        assert m.last_request.json() == {'a': 5, 'b': 6, 'c': 0, 'd': 0}
+
+        # A flush sends pending pushes at once
+        pending = threading.Thread(target=item['c'].push, args=(7,))
+        pending.start()
+        while item._push_batch is None:
+            time.sleep(0.01)
+        item.flush()
+        pending.join()
+        assert m.call_count == 3
+        item.flush()
+        assert m.call_count == 3
+
+        # Failures are raised by the push, and not again by a flush
+        item.coalesce(0.01)
+        m.put(ITEM_URI, status_code=500, json={})
+        with pytest.raises(HTTPError):
+            item['a'].push(8)
+        item.flush()
+        assert m.call_count == 4
+
+
+def test_ordered(service):
+    item = service.bind('item')
+    item.coalesce(10)
+    sending = threading.Event()
+    release = threading.Event()
+    bodies = []
+
+    def put(request, context):
+        bodies.append(request.json())
+        if len(bodies) == 1:
+            sending.set()
+            release.wait(5)
+        return request.json()
+
+    def pushed(value):
+        thread = threading.Thread(target=item['a'].push, args=(value,))
+        thread.start()
+        while item._push_batch is None:
+            time.sleep(0.01)
+        return thread
+
+    with requests_mock.mock() as m:
+        m.put(ITEM_URI, json=put)
+        item.data = {'a': 0}
+        first = pushed(1)
+        threading.Thread(target=item.flush).start()
+        sending.wait(5)
+
+        # The next request waits for the one in progress
+        second = pushed(2)
+        flush = threading.Thread(target=item.flush)
+        flush.start()
+        flush.join(0.2)
+        assert flush.is_alive() and len(bodies) == 1
+        release.set()
+        for thread in (first, second, flush):
+            thread.join()
+
+    # The earlier response did not replace the data pushed later
+    assert bodies == [{'a': 1}, {'a': 2}]
+    assert item.data == {'a': 2}
+
+
+def test_errors(service):
+    with pytest.raises(LinkError):
+        service.add_coalescing('other', 0.1)
@@ -0,0 +1,221 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import os
+import types
+import tempfile
+import unittest
+
+import mock
+from reschema import ServiceDef
+from reschema.exceptions import ValidationError, MissingParameter
+
+from sleepwalker import codegen
+from sleepwalker.datarep import DictDataRep, ListDataRep
+from sleepwalker.exceptions import ServiceException
+from sleepwalker.service import Service
+from test.test_bookstore import TEST_PATH, BookstoreServer
+from test.service_loader import SERVICE_MANAGER, TEST_SERVER_MANAGER
+
+BOOKSTORE_ID = 'http://support.riverbed.com/apis/bookstore/1.0'
+
+OTHER_SERVICE = """
+$schema: "http://support.riverbed.com/apis/service_def/2.2"
+id: "http://support.riverbed.com/apis/other/1.0"
+provider: "riverbed"
+name: "other"
+version: "1.0"
+title: "Other"
+resources:
+   item:
+      type: object
+      properties:
+         id: { type: integer }
+         value:
+            anyOf:
+               - { type: integer }
+               - { type: string }
+         parent: { type: object, properties: { id: { type: integer } } }
+      links:
+         self: { path: "$/items/{id}" }
+         get:
+            method: GET
+            response: { $ref: '#/resources/item' }
+         class:
+            method: POST
+            path: "$/items/{id}/class"
+         move:
+            method: POST
+            path:
+               template: "$/items/{parent}/children/{id}"
+               vars: { parent: "0/parent/id" }
+         path:
+            method: GET
+            path: "$/items{/id}"
+   search:
+      type: array
+      items: { type: string, minLength: 2 }
+      links:
+         self: { path: "$/search/{+query}" }
+"""
+
+
+def load(servicedef):
+    """ Generate and import the client module for `servicedef`. """
+    module = types.ModuleType('generated')
+    exec(compile(codegen.generate(servicedef), module.__name__, 'exec'),
+         module.__dict__)
+    return module
+
+
+class CodegenTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.bookstore = load(ServiceDef.create_from_file(
+            os.path.join(TEST_PATH, 'Bookstore.yml')))
+
+    def setUp(self):
+        TEST_SERVER_MANAGER.reset()
+        TEST_SERVER_MANAGER.register_server(
+            'http://bookstore-server:80', BOOKSTORE_ID, None,
+            BookstoreServer, self)
+        self.service = SERVICE_MANAGER.find_by_id('http://bookstore-server:80',
+                                                  BOOKSTORE_ID)
+
+    def test_classes(self):
+        bookstore = self.bookstore
+        self.assertEqual(bookstore.SERVICE_ID, BOOKSTORE_ID)
+        self.assertIs(bookstore.RESOURCES['book_chapter'],
+                      bookstore.BookChapter)
+        self.assertTrue(issubclass(bookstore.Book, DictDataRep))
+        self.assertTrue(issubclass(bookstore.Books, ListDataRep))
+
+    def test_bind(self):
+        bookstore = self.bookstore
+        book = bookstore.Book.bind(self.service, id=3)
+        self.assertIsInstance(book, bookstore.Book)
+        self.assertEqual(book.uri, self.service.bind('book', id=3).uri)
+        self.assertEqual(book.path_vars, {'id': 3})
+        self.assertIs(book.jsonschema,
+                      self.service.servicedef.find_resource('book'))
+
+        chapter = bookstore.BookChapter.bind(self.service, bookid='a/b',
+                                             num=1)
+        self.assertEqual(chapter.uri,
+                         self.service.bind('book_chapter', bookid='a/b',
+                                           num=1).uri)
+
+        books = bookstore.Books.bind(self.service)
+        self.assertEqual(books.uri, self.service.bind('books').uri)
+        books = bookstore.Books.bind(self.service, author=1)
+        self.assertEqual(books.uri, self.service.bind('books', author=1).uri)
+        self.assertEqual(books.path_vars, {'author': 1})
+
+    def test_standard_links(self):
+        books = self.bookstore.Books.bind(self.service)
+        created = books.create({'title': 'A book', 'author_ids': [1]})
+
+        book = self.bookstore.Book.bind(self.service, id=created.data['id'])
+        self.assertEqual(book.data['title'], 'A book')
+        book['title'].push('Another book')
+        self.assertEqual(self.service.bind('book', id=created.data['id'])
+                         .data['title'], 'Another book')
+        self.assertEqual(book.follow('instances').uri, books.uri)
+
+    def test_link_methods(self):
+        books = self.service.bind('books')
+        created = books.create({'title': 'A book', 'author_ids': [1]})
+        book_id = created.data['id']
+
+        expected = created.execute('purchase', {'num_copies': 2})
+        # From path variables, from data and from arguments
+        book = self.bookstore.Book.bind(self.service, id=book_id)
+        purchase = book.purchase({'num_copies': 2})
+        self.assertEqual(purchase.uri, expected.uri)
+        self.assertEqual(purchase.data, expected.data)
+        book.pull()
+        self.assertEqual(book.purchase({'num_copies': 2}).uri, expected.uri)
+        self.assertEqual(book.purchase({'num_copies': 2}, id=book_id).uri,
+                         expected.uri)
+
+        book = self.bookstore.Book.bind(self.service, id=book_id)
+        book.path_vars = {}
+        with self.assertRaises(MissingParameter):
+            book.purchase({'num_copies': 2})
+
+    def test_validators(self):
+        validators = self.bookstore.VALIDATORS
+        book = validators['#/resources/book']
+        self.assertTrue(book({'id': 1, 'title': 'A', 'author_ids': [1],
+                              'chapters': [{'num': 1, 'heading': 'a'}]}))
+        self.assertFalse(book({'id': True}))
+        self.assertFalse(book({'chapters': [{'num': 1.5}]}))
+        self.assertFalse(book({'other': 1}))
+        self.assertFalse(book([]))
+
+        address = validators['#/resources/book/links/purchase/request']
+        self.assertTrue(address({'shipping_address': {'state': 'CA'}}))
+        self.assertFalse(address({'shipping_address': {'state': 'ca'}}))
+
+        # Invalid values are reported by the schema
+        book = self.bookstore.Book.bind(self.service, id=1)
+        with self.assertRaises(ValidationError):
+            book.purchase({'num_copies': 'two'})
+        request_id = '#/resources/book/links/purchase/request'
+        check = mock.Mock(wraps=validators[request_id])
+        with mock.patch.dict(validators, {request_id: check}):
+            book.purchase({'num_copies': 2})
+        check.assert_called_once_with({'num_copies': 2})
+
+    def test_fallbacks(self):
+        servicedef = ServiceDef.create_from_text(OTHER_SERVICE,
+                                                 format='yaml')
+        module = load(servicedef)
+        service = Service(servicedef, 'http://other-server')
+        item = module.Item.bind(service, id=1)
+
+        # Link names that are keywords get a trailing underscore
+        self.assertTrue(hasattr(module.Item, 'class_'))
+
+        # Pointers into sub-objects are compiled, other expressions
+        # are not
+        with mock.patch.object(module.Item, '_execute_link') as link:
+            item.data = {'id': 1, 'parent': {'id': 7}}
+            item.move()
+            self.assertEqual(link.call_args[0][1],
+                             service.servicepath + '/items/7/children/1')
+        with mock.patch.object(module.Item, 'execute') as execute:
+            item.path(id=2)
+            execute.assert_called_once_with('path', None, id=2)
+
+        search = module.Search.bind(service, query='a/b')
+        self.assertEqual(search.uri, service.servicepath + '/search/a/b')
+
+        validators = module.VALIDATORS
+        self.assertFalse(validators['#/resources/item']({'value': 1}))
+        self.assertTrue(validators['#/resources/item']({'parent': {}}))
+        self.assertFalse(validators['#/resources/search'](['a']))
+        item._validate(servicedef.find_resource('item'), {'value': 1})
+        with self.assertRaises(ValidationError):
+            item._validate(servicedef.find_resource('item'), {'value': 1.5})
+
+    def test_wrong_service(self):
+        servicedef = ServiceDef.create_from_text(OTHER_SERVICE,
+                                                 format='yaml')
+        service = Service(servicedef, 'http://other-server')
+        with self.assertRaises(ServiceException):
+            self.bookstore.Book.bind(service, id=1)
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'bookstore.py')
+            codegen.main([os.path.join(TEST_PATH, 'Bookstore.yml'),
+                          '-o', output])
+            with open(output) as f:
+                source = f.read()
+        compile(source, output, 'exec')
+        self.assertIn('class Book(_Resource, _DictDataRep):', source)
@@ -0,0 +1,126 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import array
+
+import mock
+import pytest
+import reschema
+
+from sleepwalker import columns
+from sleepwalker.datarep import DataRep
+from test.test_datarep import ANY_SERVICE_DEF, ANY_URI
+
+SAMPLES_SCHEMA = reschema.jsonschema.Schema.parse(
+    input={
+        'type': 'array',
+        'items': {
+            'type': 'object',
+            'properties': {
+                'timestamp': {'type': 'integer'},
+                'value': {'type': 'number'},
+                'name': {'type': 'string'},
+                'tags': {'type': 'array', 'items': {'type': 'string'}},
+                'source': {
+                    'type': 'object',
+                    'properties': {'port': {'type': 'integer'}},
+                },
+            },
+        },
+    },
+    name='samples', servicedef=ANY_SERVICE_DEF)
+
+
+def make_samples(count):
+    return [{'timestamp': 1000 + i, 'value': i / 4.0,
+             'name': 'port%d' % (i % 3), 'tags': ['t%d' % i],
+             'source': {'port': 80 + i % 2}}
+            for i in range(count)]
+
+
+@pytest.fixture
+def samples():
+    return DataRep.from_schema(mock.Mock(), ANY_URI,
+                               jsonschema=SAMPLES_SCHEMA,
+                               data=make_samples(10))
+
+
+def test_to_columns(samples):
+    cols = samples.to_columns(numpy=False)
+    assert list(cols) == ['timestamp', 'value', 'name', 'tags', 'source']
+
+    assert cols['timestamp'] == array.array('q', range(1000, 1010))
+    assert cols['value'] == array.array('d', [i / 4.0 for i in range(10)])
+    assert type(cols['name']) is list
+    assert cols['name'][:4] == ['port0', 'port1', 'port2', 'port0']
+    assert cols['tags'][1] == ['t1']
+    assert cols['source'][0] == {'port': 80}
+
+
+def test_to_columns_interns_strings(samples):
+    cols = samples.to_columns('name', numpy=False)
+    assert cols['name'][0] is cols['name'][3]
+
+
+def test_to_columns_keys(samples):
+    cols = samples.to_columns('value', '/source/port', numpy=False)
+    assert list(cols) == ['value', '/source/port']
+    assert cols['/source/port'] == array.array('q', [80, 81] * 5)
+
+
+def test_to_columns_fallback(samples):
+    samples.data[2]['timestamp'] = None
+    del samples.data[3]['value']
+    samples.data[4]['source']['port'] = 'http'
+    cols = samples.to_columns('timestamp', 'value', '/source/port',
+                              numpy=False)
+    assert cols['timestamp'][1:4] == [1001, None, 1003]
+    assert cols['value'][2:5] == [0.5, None, 1.0]
+    assert cols['/source/port'][3:6] == [81, 'http', 81]
+
+
+def test_to_columns_booleans(samples):
+    samples.data[1]['timestamp'] = True
+    samples.data[2]['value'] = False
+    cols = samples.to_columns('timestamp', 'value', numpy=False)
+    assert cols['timestamp'][:3] == [1000, True, 1002]
+    assert cols['value'][:3] == [0.0, 0.25, False]
+    assert cols['value'][2] is False
+
+
+def test_to_columns_untyped_items():
+    schema = reschema.jsonschema.Schema.parse(
+        input={'type': 'array', 'items': {'type': 'object'}},
+        name='untyped', servicedef=ANY_SERVICE_DEF)
+    dr = DataRep.from_schema(mock.Mock(), ANY_URI, jsonschema=schema,
+                             data=[{'a': 1}, {'a': 2.5}])
+    with pytest.raises(ValueError):
+        dr.to_columns()
+    assert dr.to_columns('a', numpy=False) == {'a': [1, 2.5]}
+
+
+def test_iter_columns():
+    dr = DataRep.from_schema(mock.Mock(), ANY_URI,
+                             jsonschema=SAMPLES_SCHEMA,
+                             data=make_samples(25))
+    chunks = list(dr.iter_columns(10, 'timestamp', numpy=False))
+    assert [len(c['timestamp']) for c in chunks] == [10, 10, 5]
+    assert chunks[2]['timestamp'] == array.array('q', range(1020, 1025))
+
+
+def test_numpy_unavailable(samples):
+    with mock.patch.object(columns, '_numpy', None):
+        assert type(samples.to_columns('value')['value']) is array.array
+        with pytest.raises(ImportError):
+            samples.to_columns('value', numpy=True)
+
+
+def test_numpy(samples):
+    numpy = pytest.importorskip('numpy')
+    cols = samples.to_columns('timestamp', 'value', 'name')
+    assert cols['timestamp'].dtype == numpy.int64
+    assert list(cols['value']) == [i / 4.0 for i in range(10)]
+    assert type(cols['name']) is list
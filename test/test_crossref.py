@@ -126,6 +126,57 @@ class FooBarTest(unittest.TestCase):
         self.assertTrue(('http://crossref-bar-server-2', None) in conns)
         self.assertFalse(('http://crossref-bar-server-3', None) in conns)
 
+    def test_follow_reuses_service(self):
+        foo_id = 'http://support.riverbed.com/apis/crossref.foo/1.0'
+        self.foo_service = SERVICE_MANAGER.find_by_id(
+            'http://crossref-foo-server', foo_id)
+        self.assertIs(self.foo_service, SERVICE_MANAGER.find_by_id(
+            'http://crossref-foo-server', foo_id))
+
+        foos = self.foo_service.bind('foos')
+        for i in range(3):
+            foos.create({'bar_id': i + 1,
+                         'bar_server': 'http://crossref-bar-server-1',
+                         'bar_instance': 'instance-1'})
+        foos.pull()
+
+        # Every foo points at the same bar service, so every hop
+        # must land on the same Service instance
+        services = [foo.follow('bar').service for foo in foos]
+        for service in services[1:]:
+            self.assertIs(service, services[0])
+
+        bar_service = foos[0].follow('bar').service
+        bar_service.add_headers({'x-test': 'kept'})
+        self.assertEqual(foos[1].follow('bar').service.headers,
+                         {'x-test': 'kept'})
+
+    def test_follow_target_service(self):
+        foo_id = 'http://support.riverbed.com/apis/crossref.foo/1.0'
+        bar_id = 'http://support.riverbed.com/apis/crossref.bar/1.0'
+        self.foo_service = SERVICE_MANAGER.find_by_id(
+            'http://crossref-foo-server', foo_id)
+        foo = self.foo_service.bind('foos').create(
+            {'bar_id': 1, 'bar_server': '', 'bar_instance': ''})
+
+        local = foo.follow('local_bar').service
+        self.assertEqual(local.host, 'http://crossref-foo-server')
+
+        # $host and $instance passed to follow() pick the service
+        bar = foo.follow('local_bar', **{'$host':
+                                         'http://crossref-bar-server-1',
+                                         '$instance': 'instance-2'})
+        self.assertEqual(bar.service.host, 'http://crossref-bar-server-1')
+        self.assertEqual(bar.service.instance, 'instance-2')
+        self.assertEqual(bar.data, 'Bar-instance-2-1')
+
+        # Services are found through the manager after a reset
+        SERVICE_MANAGER.reset()
+        service = foo.follow('local_bar').service
+        self.assertIsNot(service, local)
+        self.assertIs(service, SERVICE_MANAGER.find_by_id(
+            'http://crossref-foo-server', bar_id))
+
     def test_embed_bar(self):
         id = 'http://support.riverbed.com/apis/crossref.foo/1.0'
         self.foo_service = SERVICE_MANAGER.find_by_id(
@@ -191,14 +242,14 @@ class FooBarAuthSameTest(unittest.TestCase):
         # Now a second connection -- to the bar server as test1
         self.assertEqual(len(connmgr_conns), 2)
 
-        # Follow it again -- we should end up with a *different* service
-        # object, but the same number of connections and same username
+        # Follow it again -- we should end up with the *same* service
+        # object, the same number of connections and same username
         bar = foos[0].follow('bar')
         bar_service_2 = bar.service
         self.assertEqual(bar.data, 'Bar-1')
         self.assertEqual(bar_service_2.auth.username, 'test1')
         self.assertEqual(len(connmgr_conns), 2)
-        self.assertNotEqual(bar_service_1, bar_service_2)
+        self.assertIs(bar_service_1, bar_service_2)
 
         # Now establish switch to user 'test2'
         foo_service_1 = SERVICE_MANAGER.find_by_id(
@@ -218,6 +218,16 @@ def validate_response():
     datarep.VALIDATE_RESPONSE = original_validate_setting
 
 
+@pytest.yield_fixture
+def copy_on_write():
+    '''Set COPY_ON_WRITE to True for testing, then restore original.
+    '''
+    original = datarep.COPY_ON_WRITE
+    datarep.COPY_ON_WRITE = True
+    yield
+    datarep.COPY_ON_WRITE = original
+
+
 @pytest.fixture
 def mock_datarep():
     conn = connection.Connection(ANY_URI)
@@ -997,6 +1007,68 @@ def test_datarep_push_fragment(mock_service):
     assert not fragment.pull.called
 
 
+def test_datarep_copy_on_write(mock_service, copy_on_write):
+    shared = copy.deepcopy(ANY_DATA)
+    root = datarep.DataRep.from_schema(
+        mock_service, ANY_URI, jsonschema=ANY_DATA_SCHEMA, data=shared)
+    other = datarep.DataRep.from_schema(
+        mock_service, ANY_URI, jsonschema=ANY_DATA_SCHEMA, data=shared)
+
+    root['a'][2].data = 42
+    root['x'].data = 'z'
+    assert root.data['a'] == [1, 2, 42]
+    assert root.data['x'] == 'z'
+    assert shared == ANY_DATA
+    assert other.data is shared
+
+    # Only the path to each change is copied, and only once
+    assert root.data['b'] is shared['b']
+    copied = root.data['a']
+    root['a'][0].data = 0
+    assert root.data['a'] is copied
+    assert copied == [0, 2, 42]
+
+    other['b'][0]['d'].data = [1]
+    assert other.data['b'][0]['d'] == [1]
+    assert root.data['b'][0]['d'] == []
+    assert shared == ANY_DATA
+
+
+def test_datarep_copy_on_write_shared_copy(mock_service, copy_on_write):
+    root = datarep.DataRep.from_schema(
+        mock_service, ANY_URI, jsonschema=ANY_DATA_SCHEMA,
+        data=copy.deepcopy(ANY_DATA))
+    root['x'].data = 'z'
+
+    # Data copied by one DataRep is no longer changed in place once
+    # shared with another
+    other = datarep.DataRep.from_schema(
+        mock_service, ANY_URI, jsonschema=ANY_DATA_SCHEMA)
+    other.data = root.data
+    root['x'].data = 'w'
+    assert other.data['x'] == 'z'
+
+    # Nor are values that were set
+    numbers = [5, 6]
+    root['a'].data = numbers
+    root['a'][0].data = 0
+    assert numbers == [5, 6]
+    assert root.data['a'] == [0, 6]
+
+
+def test_datarep_copy_on_write_version(mock_service, copy_on_write):
+    root = datarep.DataRep.from_schema(
+        mock_service, ANY_URI, jsonschema=ANY_DATA_SCHEMA,
+        data=copy.deepcopy(ANY_DATA))
+    version = root._data_version
+    root['a'][1].data = 7
+    # Copying does not invalidate derived state such as indexes
+    assert root._data_version == version
+    root.data = {}
+    assert root._data_version == version + 1
+    assert root._owned is None
+
+
 def test_datarep_getitem(mock_service):
     root = datarep.DataRep.from_schema(service=mock_service,
                                        uri=ANY_URI,
@@ -1053,6 +1125,47 @@ def test_datarep_getitem_negative_stepped_slice(mock_service):
         assert fragment.root == root
 
 
+def test_datarep_getitem_slice_view(mock_service):
+    root = datarep.DataRep.from_schema(service=mock_service,
+                                       uri=ANY_URI,
+                                       jsonschema=ANY_DATA_SCHEMA,
+                                       data={'a': list(range(10))})
+
+    view = root['a'][2:]
+    assert type(view) is datarep.ListDataRep.Slice
+    assert len(view) == 8
+    assert [f.data for f in view] == list(range(2, 10))
+    assert view[0].fragment == '/a/2'
+    assert view[-1].fragment == '/a/9'
+    assert view[0].root is root
+
+    nested = view[1::3]
+    assert len(nested) == 3
+    assert [f.fragment for f in nested] == ['/a/3', '/a/6', '/a/9']
+    assert [f.data for f in nested[::-1]] == [9, 6, 3]
+    assert len(view[100:]) == 0
+
+    with pytest.raises(IndexError):
+        view[8]
+    with pytest.raises(TypeError):
+        view['x']
+
+
+def test_datarep_getitem_slice_is_lazy(mock_service):
+    root = datarep.DataRep.from_schema(service=mock_service,
+                                       uri=ANY_URI,
+                                       jsonschema=ANY_DATA_SCHEMA,
+                                       data={'a': list(range(100000))})
+
+    with mock.patch.object(datarep.DataRep, '_init_fragment',
+                           autospec=True,
+                           side_effect=datarep.DataRep._init_fragment) as init:
+        view = root['a'][:100000][50000:]
+        assert init.call_count == 1
+        assert view[0].data == 50000
+        assert init.call_count == 2
+
+
 def test_datarep_complex_structure(any_datarep_with_object_data):
     drod = any_datarep_with_object_data
     assert type(drod) is datarep.DictDataRep
@@ -1156,6 +1269,61 @@ def test_datarep_array___iter__(any_datarep_fragment_with_array_data):
     assert [x.data for x in iter(drfad)] == drfad.data
 
 
+def test_datarep_array___iter__fragments(any_datarep_with_object_data):
+    drod = any_datarep_with_object_data
+    items = list(drod['b'])
+    assert [x.fragment for x in items] == ['/b/0']
+    assert all(x.root is drod for x in items)
+    assert all(type(x) is datarep.DictDataRep for x in items)
+    assert [x.data for x in items] == drod.data['b']
+
+
+def test_datarep_array___iter__matches_getitem(
+        any_datarep_fragment_with_array_data):
+    drfad = any_datarep_fragment_with_array_data
+    for i, x in enumerate(drfad):
+        expected = drfad[i]
+        assert type(x) is type(expected)
+        assert x.fragment == expected.fragment
+        assert x.jsonschema is expected.jsonschema
+        assert x.links == expected.links
+
+
+def test_datarep_object_values_fragments(any_datarep_with_object_data):
+    drod = any_datarep_with_object_data
+    for key, value in drod['b'][0].items():
+        expected = drod['b'][0][key]
+        assert type(value) is type(expected)
+        assert value.fragment == expected.fragment == '/b/0/' + key
+        assert value.jsonschema is expected.jsonschema
+        assert value.root is drod
+
+
+def test_datarep_array_iter_raw(any_datarep_with_object_data):
+    drod = any_datarep_with_object_data
+    assert (list(drod['a'].iter_raw()) ==
+            [('/a/%d' % i, v) for i, v in enumerate(drod.data['a'])])
+
+
+def test_datarep_object_iter_raw(any_datarep_with_object_data):
+    drod = any_datarep_with_object_data
+    assert (dict(drod.iter_raw()) ==
+            {'/' + k: v for k, v in drod.data.items()})
+    assert (list(drod['b'][0].iter_raw()) ==
+            [('/b/0/c', drod.data['b'][0]['c']), ('/b/0/d', [])])
+
+
+def test_datarep_at(any_datarep_with_object_data):
+    drod = any_datarep_with_object_data
+    for pointer, value in drod['b'].iter_raw():
+        fragment = drod['b'].at(pointer)
+        assert type(fragment) is datarep.DictDataRep
+        assert fragment.fragment == pointer
+        assert fragment.root is drod
+        assert fragment.data == value
+    assert drod['a'].at('') is drod
+
+
 def test_exception():
     s = service.Service(ANY_SERVICE_DEF, ANY_URI)
     dr = datarep.DataRep.from_schema(s, uri=ANY_URI,
@@ -1229,7 +1397,8 @@ def test_datarep_execute_with_data(data_datarep_with_link):
     with mock.patch.object(rep, "_request") as mock_request:
         rep.execute("something")
         mock_request.assert_called_once_with('GET', '/apis/foo/1.0/foo', None,
-                                             None)
+                                             None,
+                                             link=rep.links['something'])
 
 
 def test_datarep_execute_with_data_and_kwargs(data_datarep_with_link):
@@ -1237,7 +1406,8 @@ def test_datarep_execute_with_data_and_kwargs(data_datarep_with_link):
     with mock.patch.object(rep, "_request") as mock_request:
         rep.execute("something", foo="bar")
         mock_request.assert_called_once_with('GET', '/apis/foo/1.0/bar', None,
-                                             None)
+                                             None,
+                                             link=rep.links['something'])
 
 
 def test_datarep_execute(datarep_with_link):
@@ -1245,7 +1415,7 @@ def test_datarep_execute(datarep_with_link):
     with mock.patch.object(rep, "_request") as mock_request:
         rep.execute("toplink", foo="foo")
         mock_request.assert_called_once_with('GET', '/apis/foo/1.0/foo', None,
-                                             None)
+                                             None, link=rep.links['toplink'])
 
 
 def test_datarep_execute_raises(datarep_with_link):
@@ -1294,7 +1464,8 @@ def test_datarep_execute_post(datarep_with_two_links):
     with mock.patch.object(rep, "_request") as mock_request:
         rep.execute("post")
         assert (mock_request.call_args_list ==
-                [mock.call('POST', '/apis/foo/1.0/foo', None, None)])
+                [mock.call('POST', '/apis/foo/1.0/foo', None, None,
+                           link=rep.links['post'])])
 
 
 @pytest.fixture
@@ -1312,4 +1483,48 @@ def test_datarep_with_data_execute_post(data_datarep_with_two_links):
     with mock.patch.object(rep, "_request") as mock_request:
         rep.execute("post")
         assert (mock_request.call_args_list ==
-                [mock.call('POST', '/apis/foo/1.0/foo1', None, None)])
+                [mock.call('POST', '/apis/foo/1.0/foo1', None, None,
+                           link=rep.links['post'])])
+
+
+# ============ Prepared requests ==========================
+
+def test_pull_uses_prepared_request(mock_datarep):
+    return_data = {'id': 42, 'value': 'foobar'}
+    svc_path = 'http://hostname.nbttech.com/api/validate_me/1.0/anything/42'
+    svc = mock_datarep.service
+    svc.add_headers({'X-Test': 'first'})
+
+    with requests_mock.mock() as m:
+        m.get(svc_path, json=return_data)
+        mock_datarep.pull()
+        mock_datarep.pull()
+        assert m.last_request.headers['X-Test'] == 'first'
+        assert m.last_request.headers['Accept'] == 'application/json'
+
+        prepared = svc.prepare(mock_datarep.links['get'])
+        assert prepared is svc.prepare(mock_datarep.links['get'])
+        assert prepared.url_prefix == ('http://hostname.nbttech.com'
+                                       '/api/validate_me/1.0')
+
+        # Adding headers invalidates prepared requests
+        svc.add_headers({'X-Test': 'second'})
+        assert svc.prepare(mock_datarep.links['get']) is not prepared
+        mock_datarep.pull()
+        assert m.last_request.headers['X-Test'] == 'second'
+        assert m.call_count == 3
+
+
+def test_push_uses_prepared_request(mock_datarep):
+    data = {'id': 42, 'value': 'foobar'}
+    svc_path = 'http://hostname.nbttech.com/api/validate_me/1.0/anything/42'
+
+    with requests_mock.mock() as m:
+        m.put(svc_path, json=data)
+        with mock.patch.object(mock_datarep.service.connection,
+                               'json_request') as patched:
+            assert mock_datarep.push(data).data == data
+            assert not patched.called
+        assert m.last_request.json() == data
+        assert (m.last_request.headers['Content-Type'] ==
+                'application/json')
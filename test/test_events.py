@@ -0,0 +1,206 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import json
+import queue
+import threading
+import http.server
+
+import mock
+import pytest
+
+from sleepwalker import events
+from sleepwalker.connection import Connection
+from sleepwalker.events import Event, EventParser
+from sleepwalker.exceptions import LinkError
+from test.service_loader import service_from_dict
+
+SERVICE_DICT = {
+    '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+    'id': 'http://support.riverbed.com/apis/events/1.0',
+    'provider': 'riverbed',
+    'name': 'events',
+    'version': '1.0',
+    'resources': {
+        'item': {
+            'type': 'object',
+            'properties': {
+                'id': {'type': 'number'},
+                'name': {'type': 'string'},
+            },
+            'links': {
+                'self': {'path': '$/items/{id}'},
+                'get': {
+                    'method': 'GET',
+                    'response': {'$ref': '#/resources/item'},
+                },
+                'events': {'method': 'GET', 'path': '$/events'},
+            },
+        },
+        'tag': {
+            'type': 'object',
+            'links': {
+                'self': {'path': '$/tags/{id}'},
+                'get': {
+                    'method': 'GET',
+                    'response': {'$ref': '#/resources/tag'},
+                },
+                'events': {'method': 'GET', 'path': '$/events'},
+            },
+        },
+        'other': {
+            'type': 'object',
+            'links': {'self': {'path': '$/other'}},
+        },
+    },
+}
+
+ITEM_PATH = '/api/events/1.0/items/%d'
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """ Serves items as JSON, and events from the server's queue. """
+
+    def do_GET(self):
+        server = self.server
+        if self.path.endswith('/events'):
+            server.last_event_ids.append(self.headers.get('Last-Event-ID'))
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            self.wfile.write(b'retry: 10\r\n\r\n')
+            self.wfile.flush()
+            while True:
+                message = server.events.get()
+                if message is None:
+                    return
+                self.wfile.write(message)
+                self.wfile.flush()
+
+        id = int(self.path.rsplit('/', 1)[1])
+        body = json.dumps({'id': id, 'name': 'item %d' % id}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.events = queue.Queue()
+    server.last_event_ids = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.events.put(None)
+    server.shutdown()
+    server.server_close()
+
+
+def send(server, event_type, id=None, **message):
+    text = 'event: %s\n' % event_type
+    if id is not None:
+        text += 'id: %s\n' % id
+    text += 'data: %s\n\n' % json.dumps(message)
+    server.events.put(text.encode())
+
+
+def test_parser():
+    parser = EventParser()
+    stream = (b': comment\r\nevent: update\r\nid: 1\r\ndata: {"a":\r\n'
+              b'data:1}\r\n\r\ndata: \xc3\xa9\r\rretry: 50\nid\n'
+              b'data\n\nid: x\0\n\n')
+    events = []
+    # Split at every position, including within CRLF and UTF-8
+    for i in range(len(stream)):
+        events.extend(parser.feed(stream[i:i + 1]))
+    assert events == [Event('1', 'update', '{"a":\n1}'),
+                      Event('1', 'message', 'é'),
+                      Event('', 'message', '')]
+    assert parser.retry == 50 and parser.last_id == ''
+
+
+def test_subscribe(server):
+    host = 'http://127.0.0.1:%d' % server.server_address[1]
+    service = service_from_dict(SERVICE_DICT, host)
+
+    item = service.bind('item', id=1)
+    other = service.bind('item', id=2).pull()
+    assert item.data == {'id': 1, 'name': 'item 1'}
+    received = queue.Queue()
+    item.subscribe(lambda dr, event: received.put((dr, event.type)))
+    name = item['name']
+    name.subscribe(lambda dr, event: received.put((dr, event.type)))
+    stream = events.stream_for(service, '/api/events/1.0/events')
+
+    # All resources on the host share its stream
+    tag = service.bind('tag', id=1).pull()
+    assert tag.subscribe().stream is stream
+    with pytest.raises(LinkError):
+        events.stream_for(service, '/api/events/1.0/tags/events')
+    try:
+        with pytest.raises(LinkError):
+            service.bind('other').subscribe()
+
+        send(server, 'update', 1, href=ITEM_PATH % 1,
+             data={'id': 1, 'name': 'pushed'})
+        assert received.get(timeout=5) == (item, 'update')
+        dr, _ = received.get(timeout=5)
+        assert dr.fragment == '/name' and dr.data == 'pushed'
+        assert item.data == {'id': 1, 'name': 'pushed'}
+
+        send(server, 'update', 2, href=host + ITEM_PATH % 1,
+             pointer='/name', data='renamed')
+        assert received.get(timeout=5)[1] == 'update'
+        assert received.get(timeout=5)[1] == 'update'
+        assert item.data['name'] == 'renamed'
+
+        # Events wait for threads holding the lock of the stream
+        with stream.lock:
+            send(server, 'update', href=ITEM_PATH % 1, pointer='/name',
+                 data='locked')
+            with pytest.raises(queue.Empty):
+                received.get(timeout=0.2)
+            assert item.data['name'] == 'renamed'
+        assert received.get(timeout=5)[1] == 'update'
+        assert received.get(timeout=5)[1] == 'update'
+        assert item.data['name'] == 'locked'
+
+        # Resumes from the last event id after the stream ends
+        server.events.put(None)
+        send(server, 'invalidate', href=ITEM_PATH % 2)
+        send(server, 'invalidate', href='/api/events/1.0/tags/1')
+        send(server, 'invalidate', 3, href=ITEM_PATH % 1)
+        assert received.get(timeout=5)[1] == 'invalidate'
+        assert item.data_unset() and not other.data_unset()
+        assert tag.data_unset()
+        assert server.last_event_ids == [None, '2']
+    finally:
+        stream.stop()
+    assert stream.last_id == '3'
+
+
+def test_stream_request_lock():
+    connection = Connection('http://events-server')
+    acquired = []
+
+    def request(*args, **kwargs):
+        # Try the lock of the connection from another thread
+        thread = threading.Thread(target=lambda: acquired.append(
+            connection._lock.acquire(blocking=False)))
+        thread.start()
+        thread.join()
+        return mock.Mock(ok=True)
+
+    with mock.patch.object(connection.conn, 'request', request):
+        connection.stream_request('/events')
+    assert acquired == [False]
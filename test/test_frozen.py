@@ -0,0 +1,183 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import copy
+import json
+import pickle
+
+import mock
+import pytest
+import requests_mock
+
+from sleepwalker import datarep, records
+from sleepwalker.exceptions import LinkError
+from sleepwalker.frozen import FrozenDict, FrozenList, freeze
+from test.service_loader import service_from_dict
+from test.test_datarep import ANY_URI, ANY_SERVICE_DEF
+from test.test_records import NODE_DATA, NODE_SCHEMA
+
+SERVICE_DICT = {
+    '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+    'id': 'http://support.riverbed.com/apis/frozen/1.0',
+    'provider': 'riverbed',
+    'name': 'frozen',
+    'version': '1.0',
+    'resources': {
+        'item': {
+            'type': 'object',
+            'properties': {
+                'id': {'type': 'number'},
+                'tags': {'type': 'array', 'items': {'type': 'string'}},
+                'other_id': {'type': 'number'},
+            },
+            'relations': {
+                'other': {'resource': '#/resources/item',
+                          'vars': {'id': '0/other_id'}},
+            },
+            'links': {
+                'self': {'path': '$/items/{id}'},
+                'get': {
+                    'method': 'GET',
+                    'response': {'$ref': '#/resources/item'},
+                },
+                'set': {
+                    'method': 'PUT',
+                    'request': {'$ref': '#/resources/item'},
+                    'response': {'$ref': '#/resources/item'},
+                },
+                'delete': {'method': 'DELETE'},
+                'copy': {
+                    'method': 'POST',
+                    'path': '$/items/{id}/copy',
+                    'response': {'$ref': '#/resources/item'},
+                },
+            },
+        },
+        'view': {
+            'type': 'object',
+            'links': {'self': {'path': '$/views{?readonly}'}},
+        },
+    },
+}
+
+ITEM_PATH = ANY_URI + '/api/frozen/1.0/items/'
+
+
+@pytest.fixture
+def node():
+    with mock.patch.dict(ANY_SERVICE_DEF.types, {'node': NODE_SCHEMA}):
+        yield records.decode(NODE_SCHEMA, copy.deepcopy(NODE_DATA))
+
+
+@pytest.fixture
+def service():
+    return service_from_dict(SERVICE_DICT, ANY_URI)
+
+
+def test_freeze():
+    data = {'a': [1, {'b': 'c'}], 'd': None}
+    frozen = freeze(data)
+    assert frozen == data
+    assert type(frozen) is FrozenDict and type(frozen['a']) is FrozenList
+    assert type(frozen['a'][1]) is FrozenDict
+    assert freeze(frozen) is frozen
+    assert json.loads(json.dumps(frozen)) == data
+
+    for change in (lambda: frozen.update(a=1),
+                   lambda: frozen.setdefault('e', 1),
+                   lambda: frozen['a'].append(2),
+                   lambda: frozen['a'].sort(),
+                   lambda: frozen['a'][1].pop('b')):
+        with pytest.raises(TypeError):
+            change()
+    with pytest.raises(TypeError):
+        frozen['a'][0] = 2
+    with pytest.raises(TypeError):
+        del frozen['d']
+    assert frozen == data
+
+
+def test_thaw():
+    frozen = freeze({'a': [1, {'b': 'c'}]})
+    shallow = copy.copy(frozen)
+    assert type(shallow) is dict and shallow['a'] is frozen['a']
+    deep = copy.deepcopy(frozen)
+    assert type(deep) is dict and type(deep['a'][1]) is dict
+    deep['a'].append(2)
+    assert type(pickle.loads(pickle.dumps(frozen))) is dict
+
+
+def test_freeze_records(node):
+    cls = type(node)
+    frozen = freeze(node)
+    assert isinstance(frozen, cls)
+    assert frozen == NODE_DATA
+    assert freeze(frozen) is frozen
+    with pytest.raises(TypeError):
+        frozen['id'] = 2
+    with pytest.raises(TypeError):
+        frozen['children'][0]['id'] = 2
+    with pytest.raises(TypeError):
+        frozen['children'][0]['extra']['free'].append(1)
+
+    # The records frozen are left as is
+    assert type(node) is cls and type(node['children'][0]) is cls
+    node['id'] = 2
+    node['children'][0]['extra']['free'].append(1)
+    assert frozen['id'] == 1
+    assert frozen['children'][0]['extra']['free'] == [1, {'form': True}]
+
+    thawed = copy.copy(frozen)
+    assert type(thawed) is cls
+    thawed['id'] = 2
+    assert records.encode(copy.deepcopy(frozen)) == NODE_DATA
+
+
+def test_readonly(service):
+    item = service.bind('item', id=1, _readonly=True)
+    assert item.readonly
+    with requests_mock.mock() as m:
+        m.get(ITEM_PATH + '1', json={'id': 1, 'tags': ['a'], 'other_id': 2})
+        m.get(ITEM_PATH + '2', json={'id': 2})
+        m.post(ITEM_PATH + '1/copy', json={'id': 3})
+
+        assert type(item.data) is FrozenDict
+        assert item['tags'].readonly
+        with pytest.raises(TypeError):
+            item['tags'].data = []
+        with pytest.raises(TypeError):
+            item.data['tags'].append('b')
+
+        for write in (item.push, item.delete,
+                      lambda: item.create({'id': 4}),
+                      lambda: item['tags'].push(['b'])):
+            with pytest.raises(LinkError):
+                write()
+        assert [r.method for r in m.request_history] == ['GET']
+
+        other = item.follow('other')
+        assert other.readonly and type(other.data) is FrozenDict
+        copied = item.execute('copy')
+        assert copied.readonly and type(copied.data) is FrozenDict
+
+
+def test_readonly_service(service):
+    service.readonly = True
+    assert service.bind('item', id=1).readonly
+    assert service.resolve_uri('/api/frozen/1.0/items/1').readonly
+    assert not service.bind('item', id=1, _readonly=False).readonly
+
+    # A resource variable may be named readonly
+    view = service.bind('view', readonly='yes')
+    assert view.readonly and view.uri.endswith('/views?readonly=yes')
+
+
+def test_readonly_lazy(service):
+    item = service.bind('item', id=1, _readonly=True)
+    with requests_mock.mock() as m, \
+            mock.patch.object(datarep, 'DECODE_LAZY', True):
+        m.get(ITEM_PATH + '1', json={'id': 1, 'tags': ['a']})
+        assert type(item.data['tags']) is FrozenList
@@ -0,0 +1,154 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import copy
+
+import mock
+import pytest
+import reschema
+
+from sleepwalker.datarep import DataRep
+from sleepwalker.exceptions import DuplicateKeyError
+from sleepwalker.index import Index
+from sleepwalker.service import Service
+from test.test_datarep import ANY_SERVICE_DEF, ANY_URI
+
+ITEMS_SCHEMA = reschema.jsonschema.Schema.parse(
+    input={
+        'type': 'object',
+        'properties': {
+            'items': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'id': {'type': 'integer'},
+                        'group': {'type': 'string'},
+                        'owner': {
+                            'type': 'object',
+                            'properties': {'id': {'type': 'integer'}},
+                        },
+                    },
+                },
+            },
+        },
+    },
+    name='items', servicedef=ANY_SERVICE_DEF)
+
+ITEMS_DATA = {
+    'items': [
+        {'id': 10, 'group': 'a', 'owner': {'id': 1}},
+        {'id': 11, 'group': 'b', 'owner': {'id': 2}},
+        {'id': 12, 'group': 'a', 'owner': {'id': 1}},
+        {'group': 'c'},
+    ],
+}
+
+
+@pytest.fixture
+def items():
+    root = DataRep.from_schema(Service(ANY_SERVICE_DEF, ANY_URI), ANY_URI,
+                               jsonschema=ITEMS_SCHEMA,
+                               data=copy.deepcopy(ITEMS_DATA))
+    return root['items']
+
+
+def test_unique(items):
+    by_id = items.build_index('id')
+    assert type(by_id) is Index
+    assert len(by_id) == 3
+    assert 11 in by_id and 13 not in by_id
+    assert sorted(by_id) == [10, 11, 12]
+
+    item = by_id[12]
+    assert item.fragment == '/items/2'
+    assert item.root is items.root
+    assert item.data == ITEMS_DATA['items'][2]
+    assert by_id.position(12) == 2
+
+    with pytest.raises(KeyError):
+        by_id[13]
+    assert by_id.get(13) is None
+
+
+def test_multi(items):
+    by_group = items.build_index('group', unique=False)
+    assert [i.fragment for i in by_group['a']] == ['/items/0', '/items/2']
+    assert [i.fragment for i in by_group['c']] == ['/items/3']
+    assert by_group.position('a') == [0, 2]
+
+
+def test_pointer_key(items):
+    by_owner = items.build_index('/owner/id', unique=False)
+    assert by_owner.position(1) == [0, 2]
+    assert by_owner.position(2) == [1]
+
+
+def test_duplicate(items):
+    with pytest.raises(DuplicateKeyError):
+        items.build_index('group')['a']
+
+
+def test_shared(items):
+    by_id = items.build_index('id')
+    assert items.root['items'].build_index('id') is by_id
+    assert items.build_index('id', unique=False) is not by_id
+    assert items.indexes == {'id': items.build_index('id', unique=False)}
+
+
+def test_rebuilt_when_data_replaced(items):
+    by_id = items.build_index('id')
+    assert by_id.position(12) == 2
+
+    items.root.data = {'items': [{'id': 12}]}
+    assert by_id.position(12) == 0
+    assert 10 not in by_id
+
+    items.data = [{'id': 20}, {'id': 12}]
+    assert by_id.position(12) == 1
+
+
+def test_rebuilt_on_pull(items):
+    by_id = items.build_index('id')
+    assert by_id.position(10) == 0
+
+    def pull():
+        items.root._data = {'items': [{'id': 30}, {'id': 10}]}
+    with mock.patch.object(items.root, 'pull', side_effect=pull):
+        items.pull()
+    assert by_id.position(10) == 1
+
+
+def test_updated_by_fragment_set(items):
+    by_id = items.build_index('id')
+    by_group = items.build_index('group', unique=False)
+    assert by_id.position(11) == 1
+
+    with mock.patch.object(by_id, 'rebuild') as rebuild:
+        items[1]['id'].data = 21
+        assert by_id.position(21) == 1
+        assert 11 not in by_id
+
+        items[3].data = {'id': 11, 'group': 'a'}
+        assert by_id.position(11) == 3
+
+        assert rebuild.call_count == 0
+
+    assert by_group.position('a') == [0, 2, 3]
+    assert 'c' not in by_group
+
+
+def test_duplicate_from_fragment_set(items):
+    by_id = items.build_index('id')
+    assert len(by_id) == 3
+
+    items[0]['id'].data = 11
+    with pytest.raises(DuplicateKeyError):
+        by_id[11]
+
+    items[1]['id'].data = 10
+    assert by_id.position(10) == 1
+    assert by_id.position(11) == 0
@@ -0,0 +1,163 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import json
+
+import mock
+import pytest
+import reschema
+import requests_mock
+
+from sleepwalker import datarep
+from sleepwalker.connection import Connection
+from sleepwalker.interning import InternTable
+from sleepwalker.service import Service
+from test.test_datarep import ANY_URI, ANY_SERVICE_DEF
+
+NODE_SCHEMA = reschema.jsonschema.Schema.parse(
+    input={
+        'type': 'object',
+        'properties': {
+            'status': {'type': 'string', 'enum': ['active', 'idle']},
+            'code': {'type': 'string', 'maxLength': 4},
+            'name': {'type': 'string'},
+            'tags': {'type': 'array',
+                     'items': {'type': 'string', 'maxLength': 8}},
+            'children': {'type': 'array', 'items': {'$ref': '#/types/node'}},
+            'attrs': {'type': 'object',
+                      'properties': {'id': {'type': 'string'}},
+                      'additionalProperties': {'type': 'string',
+                                               'maxLength': 8}},
+        },
+    },
+    name='node', servicedef=ANY_SERVICE_DEF)
+
+SERVICE_DICT = {
+    '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+    'id': 'http://support.riverbed.com/apis/interning/1.0',
+    'provider': 'riverbed',
+    'name': 'interning',
+    'version': '1.0',
+    'resources': {
+        'items': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'id': {'type': 'number'},
+                    'state': {'type': 'string', 'enum': ['on', 'off']},
+                },
+            },
+            'links': {
+                'self': {'path': '$/items'},
+                'get': {
+                    'method': 'GET',
+                    'response': {'$ref': '#/resources/items'},
+                },
+            },
+        },
+    },
+}
+
+SVC_PATH = ANY_URI + '/api/interning/1.0/items'
+
+
+def copies(*values):
+    """ Return distinct but equal copies of strings `values`. """
+    return [json.loads(json.dumps(v)) for v in values]
+
+
+@pytest.fixture
+def node_schema():
+    with mock.patch.dict(ANY_SERVICE_DEF.types, {'node': NODE_SCHEMA}):
+        yield NODE_SCHEMA
+
+
+def test_table():
+    table = InternTable(maxsize=2)
+    a1, a2, b, c1, c2 = copies('a' * 20, 'a' * 20, 'b' * 20,
+                               'c' * 20, 'c' * 20)
+    assert table(a1) is a1
+    assert table(a2) is a1
+    assert table(b) is b
+    # The table is full, so new strings are returned unshared
+    assert table(c1) is c1
+    assert table(c2) is c2
+    assert len(table) == 2
+
+
+def test_loads_keys():
+    table = InternTable()
+    first = table.loads(b'[{"a_long_key": 1}, {"a_long_key": 2}]')
+    second = table.loads('{"nested": {"a_long_key": 3}}')
+    assert second == {'nested': {'a_long_key': 3}}
+    key = next(iter(first[0]))
+    assert next(iter(first[1])) is key
+    assert next(iter(second['nested'])) is key
+
+
+def test_values(node_schema):
+    table = InternTable()
+    data = {'status': copies('active')[0], 'code': 'abcd',
+            'name': 'a name', 'tags': ['x', 'y'],
+            'attrs': {'k': 'value', 'id': 'an id'},
+            'children': [{'status': copies('active')[0],
+                          'code': copies('abcd')[0],
+                          'name': copies('a name')[0],
+                          'tags': copies('x'),
+                          'attrs': {'k': copies('value')[0],
+                                    'id': copies('an id')[0]}}]}
+    assert table.values(node_schema, data) is data
+
+    child = data['children'][0]
+    assert child['status'] is data['status']
+    assert child['code'] is data['code']
+    assert child['tags'][0] is data['tags'][0]
+    assert child['attrs']['k'] is data['attrs']['k']
+    # Unbounded strings are left alone
+    assert child['name'] is not data['name']
+    assert child['attrs']['id'] is not data['attrs']['id']
+
+    # Enum values are shared with the schema
+    assert data['status'] is table('active')
+
+    # Values of the wrong type are skipped
+    assert table.values(node_schema, {'status': 1, 'children': None}) == \
+        {'status': 1, 'children': None}
+    assert table.values(NODE_SCHEMA.by_pointer('/code'), 'abcd') is \
+        data['code']
+
+
+def test_connection():
+    table = InternTable()
+    conn = Connection(ANY_URI, intern=table)
+    with requests_mock.mock() as m:
+        m.get(SVC_PATH, json=[{'item_id': 1}])
+        first = conn.json_request('GET', SVC_PATH)
+        second = conn.json_request('GET', SVC_PATH)
+        assert first == second == [{'item_id': 1}]
+        assert next(iter(first[0])) is next(iter(second[0]))
+        assert conn.json_request('GET', SVC_PATH, lazy=True).decode() == \
+            first
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_service(lazy):
+    svcdef = reschema.ServiceDef()
+    svcdef.parse(SERVICE_DICT)
+    table = InternTable()
+    service = Service(svcdef, ANY_URI, connection=Connection(ANY_URI),
+                      intern=table)
+    items = service.bind('items')
+    with requests_mock.mock() as m, \
+            mock.patch.object(datarep, 'DECODE_LAZY', lazy):
+        m.get(SVC_PATH, json=[{'id': 1, 'state': 'on'},
+                              {'id': 2, 'state': 'on'}])
+        data = items.pull().data
+        assert data == [{'id': 1, 'state': 'on'}, {'id': 2, 'state': 'on'}]
+        if not lazy:
+            assert data[0]['state'] is table('on')
+            assert data[1]['state'] is table('on')
@@ -0,0 +1,209 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import json
+
+import pytest
+import requests_mock
+
+from sleepwalker import datarep, records
+from sleepwalker.lazyjson import LazyJson
+from test.service_loader import service_from_dict
+from test.test_datarep import ANY_URI
+
+DOCUMENT = {
+    'id': 42,
+    'value': 'a "quoted" é value',
+    'nested': {'list': [1, {'x': None}, [2, 3]], 'flag': True},
+    'empty': {},
+    # Long enough for partial decodes to stay cheaper than a full one
+    'tail': ['x' * 100] * 10,
+}
+
+SERVICE_DICT = {
+    '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+    'id': 'http://support.riverbed.com/apis/lazy/1.0',
+    'provider': 'riverbed',
+    'name': 'lazy',
+    'version': '1.0',
+    'resources': {
+        'anything': {
+            'type': 'object',
+            'properties': {
+                'id': {'type': 'number'},
+                'value': {'type': 'string'},
+                'nested': {
+                    'type': 'object',
+                    'properties': {
+                        'list': {'type': 'array', 'items': {}},
+                        'flag': {'type': 'boolean'},
+                    },
+                },
+                'empty': {'type': 'object'},
+            },
+            'links': {
+                'self': {'path': '$/anything/{id}'},
+                'get': {
+                    'method': 'GET',
+                    'response': {'$ref': '#/resources/anything'},
+                },
+                'set': {
+                    'method': 'PUT',
+                    'request': {'$ref': '#/resources/anything'},
+                    'response': {'$ref': '#/resources/anything'},
+                },
+            },
+        },
+    },
+}
+
+SVC_URI = '/api/lazy/1.0/anything/42'
+SVC_PATH = ANY_URI + SVC_URI
+
+
+@pytest.fixture
+def lazy():
+    original = datarep.DECODE_LAZY
+    datarep.DECODE_LAZY = True
+    yield
+    datarep.DECODE_LAZY = original
+
+
+@pytest.fixture
+def service():
+    return service_from_dict(SERVICE_DICT, ANY_URI)
+
+
+@pytest.mark.parametrize('content', [
+    json.dumps(DOCUMENT).encode('utf-8'),
+    json.dumps(DOCUMENT, indent=3, ensure_ascii=False).encode('utf-8'),
+    json.dumps(DOCUMENT).encode('utf-16'),
+])
+def test_decode_pointer(content):
+    doc = LazyJson(content)
+    assert doc.decode_pointer(['id']) == 42
+    assert doc.decode_pointer(['value']) == DOCUMENT['value']
+    assert doc.decode_pointer(['nested', 'flag']) is True
+    assert doc.decode_pointer(['nested', 'list', '0']) == 1
+    assert doc.decode_pointer(['nested', 'list', '1', 'x']) is None
+    assert doc.decode_pointer(['nested', 'list', '2', '1']) == 3
+    assert doc.decode() == DOCUMENT
+
+
+@pytest.mark.parametrize('parts', [
+    ['nosuch'],
+    ['empty', 'x'],
+    ['nested', 'list', '3'],
+    ['id', 'x'],
+    # Objects and arrays are only ever decoded in full
+    ['nested'],
+    ['nested', 'list', '1'],
+])
+def test_decode_pointer_lookup_error(parts):
+    doc = LazyJson(json.dumps(DOCUMENT).encode('utf-8'))
+    with pytest.raises(LookupError):
+        doc.decode_pointer(parts)
+    assert doc.exhausted()
+
+
+def test_has_pointer():
+    doc = LazyJson(json.dumps(DOCUMENT).encode('utf-8'))
+    assert doc.has_pointer(['nested'])
+    assert doc.has_pointer(['nested', 'list', '2', '0'])
+    assert not doc.has_pointer(['nosuch'])
+    assert not doc.has_pointer(['nested', 'list', 'x'])
+    assert not doc.has_pointer(['empty', 'x'])
+    with pytest.raises(ValueError):
+        LazyJson(b'{"a" 1}').has_pointer(['b'])
+
+
+def test_exhausted():
+    doc = LazyJson(json.dumps(DOCUMENT).encode('utf-8'))
+    assert not doc.exhausted()
+    while not doc.exhausted():
+        doc.decode_pointer(['nested', 'flag'])
+        # The content is decoded to text once, in place of the bytes
+        text = doc.content
+        assert type(text) is str
+        assert doc.has_pointer(['id']) and doc.content is text
+    assert doc.scanned >= len(doc.content)
+    assert doc.decode() == DOCUMENT
+
+
+def test_connection(service):
+    with requests_mock.mock() as m:
+        m.get(SVC_PATH, json=DOCUMENT)
+        response = service.request('GET', SVC_URI, lazy=True)
+        assert isinstance(response, LazyJson)
+        assert response.decode() == DOCUMENT
+
+        response = service.request('GET', SVC_URI)
+        assert response == DOCUMENT
+
+
+def test_pull(service, lazy):
+    rep = service.bind('anything', id=42)
+    with requests_mock.mock() as m:
+        m.get(SVC_PATH, json=DOCUMENT)
+        rep.pull()
+        assert isinstance(rep._data, LazyJson)
+        assert rep['id'].data == 42
+        assert rep['nested']['flag'].data is True
+        assert isinstance(rep._data, LazyJson)
+
+        assert rep.data == DOCUMENT
+        assert rep._data is rep.data
+        rep['nested']['flag'].data = False
+        assert rep.data['nested']['flag'] is False
+        assert m.call_count == 1
+
+
+def test_pull_fragment_first(service, lazy):
+    rep = service.bind('anything', id=42)
+    with requests_mock.mock() as m:
+        m.get(SVC_PATH, json=DOCUMENT)
+        # A container is decoded in full, so that changes are kept
+        rep['nested']['list'].data.append(4)
+        assert rep.data['nested']['list'][-1] == 4
+        assert m.call_count == 1
+
+
+def test_push(service, lazy):
+    rep = service.bind('anything', id=42)
+    with requests_mock.mock() as m:
+        m.get(SVC_PATH, json=DOCUMENT)
+        m.put(SVC_PATH, json={'id': 42, 'value': 'new'})
+        rep.pull()
+        rep.push()
+        assert m.last_request.json() == DOCUMENT
+        assert isinstance(rep._data, LazyJson)
+        assert rep.data == {'id': 42, 'value': 'new'}
+
+
+def test_validate_response(service, lazy):
+    datarep.VALIDATE_RESPONSE = True
+    try:
+        rep = service.bind('anything', id=42)
+        with requests_mock.mock() as m:
+            m.get(SVC_PATH, json={'id': 42, 'value': 'v'})
+            rep.pull()
+            assert rep._data == {'id': 42, 'value': 'v'}
+    finally:
+        datarep.VALIDATE_RESPONSE = False
+
+
+def test_records(service, lazy):
+    datarep.DECODE_RECORDS = True
+    try:
+        rep = service.bind('anything', id=42)
+        with requests_mock.mock() as m:
+            m.get(SVC_PATH, json={'id': 42, 'value': 'v'})
+            rep.pull()
+            assert rep['value'].data == 'v'
+            assert isinstance(rep.data, records.Record)
+            assert rep.data == {'id': 42, 'value': 'v'}
+    finally:
+        datarep.DECODE_RECORDS = False
@@ -0,0 +1,200 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import time
+import threading
+
+import mock
+
+import pytest
+import requests_mock
+
+from sleepwalker.exceptions import LinkError, HTTPError
+from sleepwalker.paging import OffsetPager, TokenPager
+from test.service_loader import service_from_dict
+from test.test_datarep import ANY_URI
+
+ITEM = {
+    'type': 'object',
+    'properties': {'id': {'type': 'number'}},
+}
+
+SERVICE_DICT = {
+    '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+    'id': 'http://support.riverbed.com/apis/paging/1.0',
+    'provider': 'riverbed',
+    'name': 'paging',
+    'version': '1.0',
+    'resources': {
+        'items': {
+            'type': 'array',
+            'items': ITEM,
+            'links': {
+                'self': {
+                    'path': '$/items',
+                    'params': {
+                        'offset': {'type': 'number'},
+                        'limit': {'type': 'number'},
+                        'page_token': {'type': 'string'},
+                        'category': {'type': 'number'},
+                    },
+                },
+                'get': {
+                    'method': 'GET',
+                    'response': {'$ref': '#/resources/items'},
+                },
+                'pages': {
+                    'method': 'GET',
+                    'path': '$/pages{?page_token}',
+                    'response': {
+                        'type': 'object',
+                        'properties': {
+                            'items': {'type': 'array', 'items': ITEM},
+                            'next': {'type': 'string'},
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+NUM_ITEMS = 35
+
+
+@pytest.fixture
+def service():
+    return service_from_dict(SERVICE_DICT, ANY_URI)
+
+
+def by_offset(request, context):
+    offset = int(request.qs['offset'][0])
+    if offset >= 30:
+        context.status_code = getattr(by_offset, 'status', 200)
+    limit = int(request.qs['limit'][0])
+    return [{'id': i} for i in range(offset, min(offset + limit, NUM_ITEMS))]
+
+
+def by_token(request, context):
+    start = int(request.qs.get('page_token', ['0'])[0])
+    page = {'items': [{'id': i} for i in range(start, min(start + 10,
+                                                          NUM_ITEMS))]}
+    if start + 10 < NUM_ITEMS:
+        page['next'] = str(start + 10)
+    return page
+
+
+def offsets(m):
+    return [int(r.qs['offset'][0]) for r in m.request_history]
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+def test_offset(service, prefetch):
+    items = service.bind('items')
+    service.add_pager('items', 'get', OffsetPager(limit=10))
+    with requests_mock.mock() as m:
+        m.get(ANY_URI + '/api/paging/1.0/items', json=by_offset)
+        result = list(items.paginate(prefetch=prefetch))
+        assert [item['id'].data for item in result] == list(range(NUM_ITEMS))
+        assert result[12].fragment == '/2'
+        assert offsets(m) == [0, 10, 20, 30]
+
+        # A full last page takes one more request to find the end
+        m.reset_mock()
+        assert len(list(items.paginate(offset=15,
+                                       prefetch=prefetch))) == 20
+        assert offsets(m) == [15, 25, 35]
+
+
+def test_token(service):
+    items = service.bind('items')
+    with requests_mock.mock() as m:
+        m.get(ANY_URI + '/api/paging/1.0/pages', json=by_token)
+        result = items.paginate('pages', pager=TokenPager(next_token='/next'))
+        result = list(result)
+        assert [item['id'].data for item in result] == list(range(NUM_ITEMS))
+        assert result[12].fragment == '/items/2'
+        assert m.call_count == 4
+
+
+def test_prefetch_bounded(service):
+    items = service.bind('items')
+    service.add_pager('items', 'get', OffsetPager(limit=10))
+    with requests_mock.mock() as m:
+        m.get(ANY_URI + '/api/paging/1.0/items', json=by_offset)
+        result = items.paginate(prefetch=2)
+        next(result)
+        deadline = time.time() + 5
+        while m.call_count < 3 and time.time() < deadline:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        assert offsets(m) == [0, 10, 20]
+
+        for _ in range(10):
+            next(result)
+        assert next(result)['id'].data == 11
+        deadline = time.time() + 5
+        while m.call_count < 4 and time.time() < deadline:
+            time.sleep(0.001)
+        result.close()
+        time.sleep(0.05)
+        assert offsets(m) == [0, 10, 20, 30]
+
+
+def test_prefetch_concurrent(service):
+    items = service.bind('items')
+    service.add_pager('items', 'get', OffsetPager(limit=5))
+    session = service.connection.conn
+    send = session.request
+    lock = threading.Lock()
+    active = []
+    overlapped = []
+
+    def request(*args, **kwargs):
+        with lock:
+            active.append(args)
+            overlapped.append(len(active) > 1)
+        time.sleep(0.002)
+        with lock:
+            active.remove(args)
+        return send(*args, **kwargs)
+
+    with requests_mock.mock() as m, \
+            mock.patch.object(session, 'request', request):
+        m.get(ANY_URI + '/api/paging/1.0/items', json=by_offset)
+
+        # Requests of the caller wait for the page being requested
+        result = []
+        for item in items.paginate(prefetch=3):
+            result.append(item['id'].data)
+            service.bind('items', offset=item['id'].data, limit=1).pull()
+        assert result == list(range(NUM_ITEMS))
+        assert len(overlapped) > NUM_ITEMS and not any(overlapped)
+
+
+def test_errors(service):
+    items = service.bind('items')
+    with pytest.raises(LinkError):
+        items.paginate()
+    with pytest.raises(LinkError):
+        items.paginate('nosuch', pager=OffsetPager())
+    with pytest.raises(LinkError):
+        service.add_pager('items', 'nosuch', OffsetPager())
+    with pytest.raises(LinkError):
+        items.paginate('pages', pager=OffsetPager())
+
+    service.add_pager('items', 'get', OffsetPager(limit=10))
+    with requests_mock.mock() as m:
+        m.get(ANY_URI + '/api/paging/1.0/items', json=by_offset)
+        by_offset.status = 500
+        try:
+            result = items.paginate()
+            for _ in range(30):
+                next(result)
+            with pytest.raises(HTTPError):
+                next(result)
+        finally:
+            del by_offset.status
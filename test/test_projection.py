@@ -0,0 +1,161 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import pytest
+import requests_mock
+
+from sleepwalker.exceptions import DataNotSetError, LinkError
+from sleepwalker.projection import Projection
+from test.service_loader import service_from_dict
+from test.test_datarep import ANY_URI
+
+FIELDS = ['id', 'name', 'size', 'owner']
+
+ITEM = {
+    'type': 'object',
+    'properties': dict((field, {'type': 'string'}) for field in FIELDS),
+}
+
+SERVICE_DICT = {
+    '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+    'id': 'http://support.riverbed.com/apis/projection/1.0',
+    'provider': 'riverbed',
+    'name': 'projection',
+    'version': '1.0',
+    'resources': {
+        'items': {
+            'type': 'array',
+            'items': ITEM,
+            'links': {
+                'self': {'path': '$/items'},
+                'get': {
+                    'method': 'GET',
+                    'response': {'$ref': '#/resources/items'},
+                },
+            },
+        },
+        'item': {
+            'type': 'object',
+            'properties': ITEM['properties'],
+            'links': {
+                'self': {'path': '$/items/{id}'},
+                'get': {
+                    'method': 'GET',
+                    'response': {'$ref': '#/resources/item'},
+                },
+                'set': {
+                    'method': 'PUT',
+                    'request': {'$ref': '#/resources/item'},
+                    'response': {'$ref': '#/resources/item'},
+                },
+            },
+        },
+        'other': {
+            'type': 'object',
+            'links': {'self': {'path': '$/other'}},
+        },
+    },
+}
+
+
+def make_item(i, fields=None):
+    return dict((field, '%s %d' % (field, i)) for field in FIELDS
+                if fields is None or field in fields)
+
+
+def project(request, context):
+    fields = request.qs.get('fields', request.qs.get('select'))
+    if fields is not None:
+        fields = fields[0].replace(' ', ',').split(',')
+    if request.path.endswith('/items'):
+        return [make_item(i, fields) for i in range(3)]
+    return make_item(int(request.path.rsplit('/', 1)[1]), fields)
+
+
+def requested(m):
+    return [r.qs.get('fields', [None])[0] for r in m.request_history]
+
+
+@pytest.fixture
+def service():
+    return service_from_dict(SERVICE_DICT, ANY_URI)
+
+
+def test_collection(service):
+    projection = Projection()
+    service.add_projection('items', projection)
+    with requests_mock.mock() as m:
+        m.get(requests_mock.ANY, json=project)
+        items = service.bind('items')
+        assert [item['name'].data for item in items] == \
+            ['name 0', 'name 1', 'name 2']
+        assert projection.fields == {'name'}
+
+        items.pull()
+        assert items[2]['name'].data == 'name 2'
+        assert len(items) == 3
+        assert requested(m) == [None, 'name']
+
+        # Reading another field pulls all fields
+        assert items[0]['size'].data == 'size 0'
+        assert requested(m)[-1] is None
+
+        # Another DataRep of the resource shares the fields read
+        other = service.bind('items').pull()
+        assert other[0]['size'].data == 'size 0'
+        assert requested(m) == [None, 'name', None, 'name,size']
+
+        # Reading a whole item turns the projection off
+        assert other[0].data == make_item(0)
+        assert projection.complete
+        other.pull()
+        assert requested(m)[-2:] == [None, None]
+
+        projection.reset()
+        items.pull()
+        assert requested(m)[-1] is None
+
+        # As does reading the data of the resource, which pulls all
+        # fields if projected
+        assert items[1]['name'].data == 'name 1'
+        items.pull()
+        assert items.data == [make_item(i) for i in range(3)]
+        assert requested(m)[-2:] == ['name', None]
+        assert projection.complete
+
+        # including at once for the first read of a DataRep
+        projection.reset()
+        projection.fields.add('name')
+        assert service.bind('items').data[0] == make_item(0)
+        assert requested(m)[-1] is None
+
+
+def test_object(service):
+    projection = Projection(param='select', separator=' ')
+    service.add_projection('item', projection)
+    with requests_mock.mock() as m:
+        m.get(requests_mock.ANY, json=project)
+        m.put(requests_mock.ANY, json=lambda request, context: request.json())
+        item = service.bind('item', id=1)
+        assert item['size'].data == 'size 1'
+        item['name']
+        item.pull()
+        assert m.last_request.qs['select'] == ['name size']
+        assert item['name'].data == 'name 1'
+
+        with pytest.raises(DataNotSetError):
+            item.push()
+
+        # Setting a field pulls all fields first, so that all are pushed
+        item['size'].data = 'big'
+        assert m.last_request.qs == {}
+        item.push()
+        assert m.last_request.json() == dict(make_item(1), size='big')
+
+
+def test_errors(service):
+    with pytest.raises(LinkError):
+        service.add_projection('other', Projection())
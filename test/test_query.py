@@ -0,0 +1,209 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import copy
+
+import mock
+import pytest
+import reschema
+
+from sleepwalker.datarep import DataRep
+from sleepwalker.exceptions import QueryError
+from sleepwalker.query import Query
+from sleepwalker.service import Service
+from test.test_datarep import ANY_SERVICE_DEF, ANY_URI
+
+BOOKS_SCHEMA = reschema.jsonschema.Schema.parse(
+    input={
+        'type': 'array',
+        'items': {
+            'type': 'object',
+            'properties': {
+                'id': {'type': 'integer'},
+                'title': {'type': 'string'},
+                'price': {'type': 'number'},
+                'publisher': {
+                    'type': 'object',
+                    'properties': {'id': {'type': 'integer'}},
+                },
+            },
+        },
+    },
+    name='books', servicedef=ANY_SERVICE_DEF)
+
+BOOKS_DATA = [
+    {'id': 1, 'title': 'C', 'price': 10, 'publisher': {'id': 1}},
+    {'id': 2, 'title': 'A', 'price': 25.5, 'publisher': {'id': 2}},
+    {'id': 3, 'title': 'B', 'price': 5, 'publisher': {'id': 1}},
+    {'id': 4, 'title': 'D', 'publisher': {'id': 2}},
+    {'id': 5, 'title': 'E', 'price': None, 'extra': [1]},
+]
+
+
+@pytest.fixture
+def books():
+    return DataRep.from_schema(Service(ANY_SERVICE_DEF, ANY_URI), ANY_URI,
+                               jsonschema=BOOKS_SCHEMA,
+                               data=copy.deepcopy(BOOKS_DATA))
+
+
+def ids(query):
+    return [row['id'] for row in query.rows()]
+
+
+def test_all(books):
+    query = books.query()
+    assert type(query) is Query
+    assert query.rows() == BOOKS_DATA
+    assert query.count() == 5
+
+
+def test_where(books):
+    q = books.query()
+    assert ids(q.where('price', '>', 9)) == [1, 2]
+    assert ids(q.where('price', '<=', 10)) == [1, 3]
+    assert ids(q.where('title', '==', 'B')) == [3]
+    assert ids(q.where('title', '!=', 'B')) == [1, 2, 4, 5]
+    assert ids(q.where('price', '==', None)) == [5]
+    assert ids(q.where('id', 'in', [2, 4, 9])) == [2, 4]
+    assert ids(q.where('/publisher/id', '==', 1)) == [1, 3]
+    assert ids(q.where('price', '>', 1).where('/publisher/id', '==', 1)) == \
+        [1, 3]
+
+
+def test_where_coerces_typed_literals(books):
+    assert ids(books.query().where('id', '>=', '4')) == [4, 5]
+    assert ids(books.query().where('id', 'in', ['1', '3'])) == [1, 3]
+
+
+def test_where_untyped(books):
+    assert ids(books.query().where('extra', '==', [1])) == [5]
+    assert ids(books.query().where('extra', '>', 0)) == []
+
+
+def test_where_invalid(books):
+    with pytest.raises(QueryError):
+        books.query().where('id', '~', 1)
+    with pytest.raises(QueryError):
+        books.query().where('id', '==', 'abc')
+    with pytest.raises(QueryError):
+        books.query().where('price', 'in', ['1.5', 'x'])
+
+
+def test_filter(books):
+    q = books.query().filter(lambda item: item['title'] in 'ABC')
+    assert ids(q) == [1, 2, 3]
+
+
+def test_immutable(books):
+    q = books.query().where('price', '>', 1)
+    q.where('id', '==', 1)
+    q.order_by('id')
+    assert ids(q) == [1, 2, 3]
+
+
+def test_order_by(books):
+    assert ids(books.query().order_by('title')) == [2, 3, 1, 4, 5]
+    assert ids(books.query().order_by('-price')) == [2, 1, 3, 4, 5]
+    assert ids(books.query().order_by('price', '-id')) == [5, 4, 3, 1, 2]
+    assert ids(books.query().order_by('/publisher/id', '-title')) == \
+        [5, 1, 3, 4, 2]
+
+
+def test_limit(books):
+    assert ids(books.query().limit(2)) == [1, 2]
+    assert ids(books.query().order_by('-id').limit(2)) == [5, 4]
+    assert books.query().limit(0).rows() == []
+
+
+def test_project(books):
+    rows = books.query().where('id', '<', 3).project(
+        'title', publisher='/publisher/id').rows()
+    assert rows == [{'title': 'C', 'publisher': 1},
+                    {'title': 'A', 'publisher': 2}]
+    assert books.query().where('id', '==', 5).project('price').rows() == \
+        [{'price': None}]
+
+
+def test_fragments(books):
+    fragments = books.query().where('price', '>', 9).order_by(
+        '-price').fragments()
+    assert [f.fragment for f in fragments] == ['/1', '/0']
+    assert all(f.root is books for f in fragments)
+    assert books.query().where('id', '>', 3).positions() == [3, 4]
+
+
+def test_group_by(books):
+    rows = (books.query()
+            .group_by('/publisher/id')
+            .aggregate(n=('count', None), total=('sum', 'price'),
+                       low=('min', 'price'), high=('max', 'price'),
+                       avg=('avg', 'price'), priced=('count', 'price'))
+            .order_by('-n', '/publisher/id')
+            .rows())
+    assert rows == [
+        {'/publisher/id': 1, 'n': 2, 'total': 15, 'low': 5, 'high': 10,
+         'avg': 7.5, 'priced': 2},
+        {'/publisher/id': 2, 'n': 2, 'total': 25.5, 'low': 25.5,
+         'high': 25.5, 'avg': 25.5, 'priced': 1},
+        {'/publisher/id': None, 'n': 1, 'total': None, 'low': None,
+         'high': None, 'avg': None, 'priced': 0},
+    ]
+    grouped = books.query().group_by('/publisher/id')
+    assert grouped.count() == 3
+    with pytest.raises(QueryError):
+        grouped.fragments()
+
+
+def test_group_by_project(books):
+    rows = (books.query()
+            .where('price', '>', 0)
+            .group_by('/publisher/id')
+            .aggregate(total=('sum', 'price'))
+            .project(publisher='/publisher/id', total='total')
+            .order_by('publisher')
+            .rows())
+    assert rows == [{'publisher': 1, 'total': 15},
+                    {'publisher': 2, 'total': 25.5}]
+
+
+def test_aggregate_invalid(books):
+    with pytest.raises(QueryError):
+        books.query().aggregate(x=('median', 'price'))
+
+
+def test_uses_index(books):
+    by_id = books.build_index('id')
+    by_publisher = books.build_index('/publisher/id', unique=False)
+
+    data = books.data
+    with mock.patch.object(books, '_item_factory',
+                           wraps=books._item_factory):
+        # Only the indexed items are scanned
+        scanned = []
+        q = books.query().filter(lambda item: scanned.append(item) or True)
+        assert ids(q.where('id', '==', 3)) == [3]
+        assert scanned == [data[2]]
+
+        del scanned[:]
+        assert ids(q.where('/publisher/id', 'in', [2, 7])) == [2, 4]
+        assert scanned == [data[1], data[3]]
+
+        del scanned[:]
+        assert ids(q.where('id', '==', 9)) == []
+        assert scanned == []
+
+    assert by_id.position(3) == 2
+    assert by_publisher.position(2) == [1, 3]
+
+
+def test_unusable_index(books):
+    # Publishers are not unique, so this index cannot be built
+    by_publisher = books.build_index('/publisher/id')
+
+    assert ids(books.query().where('id', '==', 3)) == [3]
+    assert by_publisher._version is None
+    assert ids(books.query().where('/publisher/id', '==', 2)) == [2, 4]
@@ -0,0 +1,165 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import copy
+import json
+import pickle
+
+import mock
+import pytest
+import reschema
+from jsonpointer import resolve_pointer, set_pointer
+
+from sleepwalker import records
+from sleepwalker.connection import Connection
+from sleepwalker.datarep import DataRep
+from test.test_datarep import ANY_SERVICE_DEF, ANY_URI
+
+NODE_SCHEMA = reschema.jsonschema.Schema.parse(
+    input={
+        'type': 'object',
+        'properties': {
+            'id': {'type': 'integer'},
+            'a-name': {'type': 'string'},
+            'tags': {'type': 'array', 'items': {'type': 'string'}},
+            'children': {
+                'type': 'array',
+                'items': {'$ref': '#/types/node'},
+            },
+            'info': {
+                'type': 'object',
+                'properties': {'x': {'type': 'number'}},
+                'additionalProperties': {
+                    'type': 'object',
+                    'properties': {'y': {'type': 'number'}},
+                },
+            },
+        },
+    },
+    name='node', servicedef=ANY_SERVICE_DEF)
+
+NODE_DATA = {
+    'id': 1,
+    'a-name': 'root',
+    'tags': ['t'],
+    'children': [
+        {'id': 2, 'children': [], 'extra': {'free': [1, {'form': True}]}},
+        {'id': 3, 'info': {'x': 1.5, 'more': {'y': 2}}},
+    ],
+}
+
+
+@pytest.fixture
+def node_schema():
+    with mock.patch.dict(ANY_SERVICE_DEF.types,
+                         {'node': NODE_SCHEMA}):
+        yield NODE_SCHEMA
+
+
+@pytest.fixture
+def node(node_schema):
+    return records.decode(node_schema, copy.deepcopy(NODE_DATA))
+
+
+def test_decode(node, node_schema):
+    assert isinstance(node, records.Record)
+    assert type(node) is records.record_class(node_schema)
+    assert isinstance(node['children'][0], records.Record)
+    assert type(node['children'][0]) is type(node)
+    assert type(node['children'][0]['extra']) is dict
+    assert isinstance(node['children'][1]['info'], records.Record)
+    assert isinstance(node['children'][1]['info']['more'], records.Record)
+    assert node['tags'] == ['t']
+
+
+def test_round_trip(node, node_schema):
+    assert records.encode(node) == NODE_DATA
+    assert json.dumps(records.encode(node)) == json.dumps(NODE_DATA)
+
+    # Members keep their order, which records with the same order share
+    data = {'tags': [], 'more': 1, 'id': 5, 'a-name': 'n'}
+    record = records.decode(node_schema, data)
+    assert list(record) == ['tags', 'more', 'id', 'a-name']
+    assert json.dumps(records.encode(record)) == json.dumps(data)
+    assert records.decode(node_schema, dict(data))._order is record._order
+    assert records.decode(node_schema, {'id': 1, 'x': 2})._order is None
+    assert node == NODE_DATA
+    assert json.loads(json.dumps(node, cls=Connection.JsonEncoder)) == \
+        NODE_DATA
+    assert type(records.encode(node)['children'][1]['info']) is dict
+
+
+def test_mapping(node):
+    child = node['children'][0]
+    assert list(child) == ['id', 'children', 'extra']
+    assert len(child) == 3
+    assert 'id' in child and 'a-name' not in child
+    assert child.get('a-name') is None
+    assert child.get('extra')['free'][0] == 1
+    with pytest.raises(KeyError):
+        child['a-name']
+    with pytest.raises(KeyError):
+        child['nosuch']
+
+    child['a-name'] = 'kid'
+    child['other'] = 7
+    assert child['a-name'] == 'kid'
+    assert list(child) == ['id', 'children', 'extra', 'a-name', 'other']
+
+    del child['id']
+    del child['other']
+    assert 'id' not in child
+    with pytest.raises(KeyError):
+        del child['id']
+    assert dict(child) == {'a-name': 'kid', 'children': [],
+                           'extra': {'free': [1, {'form': True}]}}
+
+
+def test_slots(node):
+    assert not hasattr(node, '__dict__')
+    with pytest.raises(AttributeError):
+        node.something = 1
+
+
+def test_copy(node):
+    shallow = copy.copy(node)
+    assert shallow == node and shallow is not node
+    assert shallow['children'] is node['children']
+
+    deep = copy.deepcopy(node)
+    assert deep == node and type(deep) is type(node)
+    assert deep['children'] is not node['children']
+
+    assert pickle.loads(pickle.dumps(node)) == NODE_DATA
+
+
+def test_json_pointer(node):
+    assert resolve_pointer(node, '/children/1/info/more/y') == 2
+    set_pointer(node, '/children/1/info/x', 3)
+    assert node['children'][1]['info']['x'] == 3
+
+
+def test_walk(node):
+    for value in (node, NODE_DATA):
+        assert records.walk(value, ['children', '1', 'info', 'x']) == 1.5
+        assert records.walk(value, []) is value
+        for parts in (['nosuch'], ['children', '2'], ['children', 'x'],
+                      ['id', 'x'], ['children', '0', 'info', 'x']):
+            assert records.walk(value, parts) is records.MISSING
+    assert records.escape('a/b~c') == 'a~1b~0c'
+
+
+def test_datarep(node, node_schema):
+    dr = DataRep.from_schema(mock.Mock(), ANY_URI, jsonschema=node_schema,
+                             data=node)
+    assert dr['children'][1]['info']['x'].data == 1.5
+    assert [c['id'].data for c in dr['children']] == [2, 3]
+    assert dict(dr['children'][0].iter_raw())['/children/0/id'] == 2
+
+    dr['children'][0]['id'].data = 5
+    assert node['children'][0]['id'] == 5
+    assert [c.fragment for c in dr.select('$..[?(@.id == 3)]')] == \
+        ['/children/1']
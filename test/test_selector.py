@@ -0,0 +1,120 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import pytest
+
+from sleepwalker import selector
+from sleepwalker.exceptions import SelectorError
+
+DATA = {
+    'name': 'store',
+    'books': [
+        {'id': 1, 'title': 'A', 'price': 10, 'tags': ['x', 'y']},
+        {'id': 2, 'title': 'B', 'price': 25.5, 'tags': []},
+        {'id': 3, 'title': 'C', 'price': None},
+    ],
+    'owner': {'name': 'Jo', 'a/b': {'c~d': 1}},
+}
+
+
+def find(expr, data=DATA, pointer=''):
+    return list(selector.compile(expr).find(data, pointer))
+
+
+def pointers(expr, data=DATA):
+    return [p for p, v in find(expr, data)]
+
+
+def test_root():
+    assert find('$') == [('', DATA)]
+    assert find('') == [('', DATA)]
+
+
+def test_member():
+    assert find('$.name') == [('/name', 'store')]
+    assert find("$['owner']['name']") == [('/owner/name', 'Jo')]
+    assert find('$.nosuch') == []
+    assert find('$.name.nosuch') == []
+
+
+def test_member_escaped():
+    assert find("$.owner['a/b']['c~d']") == [('/owner/a~1b/c~0d', 1)]
+
+
+def test_pointer_prefix():
+    assert (find('$[0].title', DATA['books'], '/books') ==
+            [('/books/0/title', 'A')])
+
+
+def test_wildcard():
+    assert pointers('$.books[*].id') == ['/books/0/id', '/books/1/id',
+                                         '/books/2/id']
+    assert pointers('$.owner.*') == ['/owner/name', '/owner/a~1b']
+    assert pointers('$.name.*') == []
+
+
+def test_index_and_slice():
+    assert pointers('$.books[1]') == ['/books/1']
+    assert pointers('$.books[-1]') == ['/books/2']
+    assert pointers('$.books[5]') == []
+    assert pointers('$.books[1:]') == ['/books/1', '/books/2']
+    assert pointers('$.books[::-2]') == ['/books/2', '/books/0']
+    assert pointers('$.books[:1].tags[0]') == ['/books/0/tags/0']
+
+
+def test_recursive():
+    assert pointers('$..name') == ['/name', '/owner/name']
+    assert pointers('$..tags[*]') == ['/books/0/tags/0', '/books/0/tags/1']
+    assert len(pointers('$..*')) == 22
+
+
+def test_filter_comparisons():
+    assert pointers('$.books[?(@.id == 2)]') == ['/books/1']
+    assert pointers('$.books[?(@.id != 2)]') == ['/books/0', '/books/2']
+    assert pointers('$.books[?(@.price > 10)]') == ['/books/1']
+    assert pointers('$.books[?(@.price >= 10)]') == ['/books/0', '/books/1']
+    assert pointers('$.books[?(@.price < 1e2)]') == ['/books/0', '/books/1']
+    assert pointers("$.books[?(@.title == 'C')]") == ['/books/2']
+    assert pointers('$.books[?(@.price == null)]') == ['/books/2']
+    assert pointers('$.books[?(2 == @.id)]') == ['/books/1']
+
+
+def test_filter_exists():
+    assert pointers('$.books[?(@.price)]') == ['/books/0', '/books/1']
+    assert pointers('$.books[?(@.tags[1])]') == ['/books/0']
+    assert pointers('$.books[?(!@.tags)]') == ['/books/2']
+
+
+def test_filter_boolean():
+    assert (pointers('$.books[?(@.id == 1 || @.title == "C")]') ==
+            ['/books/0', '/books/2'])
+    assert pointers('$.books[?(@.id > 1 && @.price)]') == ['/books/1']
+    assert (pointers('$.books[?(!(@.id == 1 || @.id == 3))]') ==
+            ['/books/1'])
+
+
+def test_filter_on_values():
+    assert pointers('$.books[0].tags[?(@ == "y")]') == ['/books/0/tags/1']
+    assert pointers('$..[?(@.id == 3)]') == ['/books/2']
+
+
+def test_filter_mismatched_types():
+    # Ordering comparisons between incompatible types never match
+    assert pointers('$.books[?(@.title > 1)]') == []
+
+
+def test_compile_cached():
+    assert selector.compile('$.books[*]') is selector.compile('$.books[*]')
+
+
+@pytest.mark.parametrize('expr', [
+    '$.', '$[', '$.books[', '$.books[1', '$.books[?(@.id ==)]',
+    '$.books[?(1)]', '$.books[a]', '$.books[1:2:3:4]', '$ books',
+    '$.books[?(@.id == 1]', '#', '$.books[1.5]',
+])
+def test_invalid(expr):
+    with pytest.raises(SelectorError):
+        selector.compile(expr)
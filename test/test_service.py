@@ -144,3 +144,104 @@ def test_lookup_type(any_service):
         ANY_TYPE_NAME,
         any_service.servicedef.find_type,
         TypeException)
+
+
+# ============ ServiceManager tests ============================
+
+@pytest.fixture
+def service_manager():
+    svcdef_mgr = mock.Mock()
+
+    def find_by_id(id_):
+        svcdef = mock.Mock()
+        svcdef.id = id_
+        svcdef.name = ANY_NAME
+        svcdef.version = ANY_VERSION
+        return svcdef
+    svcdef_mgr.find_by_id = mock.Mock(side_effect=find_by_id)
+    svcdef_mgr.find_by_name = mock.Mock(
+        side_effect=lambda name, version, provider: find_by_id(ANY_ID))
+    return service.ServiceManager(svcdef_mgr, mock.Mock())
+
+
+def test_service_manager_find_by_id_cached(service_manager):
+    s1 = service_manager.find_by_id(ANY_HOSTNAME, ANY_ID)
+    s2 = service_manager.find_by_id(ANY_HOSTNAME, ANY_ID)
+    assert s1 is s2
+    service_manager.servicedef_manager.find_by_id.assert_called_once_with(
+        ANY_ID)
+
+
+def test_service_manager_find_by_name_shares_cache(service_manager):
+    s1 = service_manager.find_by_id(ANY_HOSTNAME, ANY_ID)
+    s2 = service_manager.find_by_name(ANY_HOSTNAME, ANY_NAME, ANY_VERSION)
+    assert s1 is s2
+
+
+def test_service_manager_distinct_keys(service_manager):
+    s = service_manager.find_by_id(ANY_HOSTNAME, ANY_ID)
+    assert s is not service_manager.find_by_id(ANY_HOSTNAME, ANY_ID,
+                                               instance='i1')
+    assert s is not service_manager.find_by_id(ANY_HOSTNAME, ANY_ID,
+                                               auth=ANY_AUTH)
+    assert s is not service_manager.find_by_id('http://other', ANY_ID)
+
+
+def test_service_manager_bounded(service_manager):
+    service_manager.MAX_RECENT_SERVICES = 2
+    held = service_manager.find_by_id(ANY_HOSTNAME, ANY_ID, instance=0)
+    for i in range(1, 5):
+        service_manager.find_by_id(ANY_HOSTNAME, ANY_ID, instance=i)
+    assert len(service_manager._recent) == 2
+
+    # Services still referenced elsewhere are found again...
+    assert held is service_manager.find_by_id(ANY_HOSTNAME, ANY_ID,
+                                              instance=0)
+    # ...while unreferenced ones beyond the bound have been dropped
+    assert (ANY_ID, ANY_HOSTNAME, 1, None) not in service_manager.services
+
+
+def test_service_manager_reset(service_manager):
+    s = service_manager.find_by_id(ANY_HOSTNAME, ANY_ID)
+    service_manager.reset()
+    assert s is not service_manager.find_by_id(ANY_HOSTNAME, ANY_ID)
+
+
+# ============ resolve_uri tests ============================
+
+def test_resolve_uri_many_resources():
+    resources = OrderedDict()
+    for i in range(2000):
+        resources['item%d' % i] = {
+            'type': 'object',
+            'properties': {'id': {'type': 'integer'}},
+            'links': {'self': {'path': '$/group%d/items%d/{id}' % (i % 10,
+                                                                   i)}}}
+        resources['file%d' % i] = {
+            'type': 'object',
+            'properties': {'name': {'type': 'string'}},
+            'links': {'self': {'path': '$/files%d/{name}.json' % i}}}
+
+    svcdef = servicedef.ServiceDef()
+    svcdef.parse({
+        '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+        'id': 'http://support.riverbed.com/apis/many/1.0',
+        'provider': 'riverbed', 'name': 'many', 'version': '1.0',
+        'resources': resources})
+    svc = service.Service(svcdef, ANY_HOSTNAME)
+
+    dr = svc.resolve_uri('/api/many/1.0/group7/items1237/42')
+    assert dr.jsonschema is svcdef.resources['item1237']
+    assert dr.path_vars == {'id': 42}
+
+    dr = svc.resolve_uri(ANY_HOSTNAME + '/api/many/1.0/files99/report.json')
+    assert dr.jsonschema is svcdef.resources['file99']
+    assert dr.path_vars == {'name': 'report'}
+
+    # An encoded slash is part of the variable, not a separator
+    dr = svc.resolve_uri('/api/many/1.0/files99/2019%2F01%20q1.json')
+    assert dr.jsonschema is svcdef.resources['file99']
+    assert dr.path_vars == {'name': '2019/01 q1'}
+
+    with pytest.raises(ResourceException):
+        svc.resolve_uri('/api/many/1.0/group7/items1238/42')
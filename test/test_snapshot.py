@@ -0,0 +1,202 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import threading
+
+import mock
+import pytest
+import reschema
+import requests_mock
+from reschema.servicedef import ServiceDefManager
+
+from sleepwalker import datarep
+from sleepwalker.connection import Connection, ConnectionManager
+from sleepwalker.exceptions import SnapshotError
+from sleepwalker.lazyjson import LazyJson
+from sleepwalker.service import ServiceManager
+from test.test_datarep import ANY_URI
+
+SERVICE_DICT = {
+    '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+    'id': 'http://support.riverbed.com/apis/snapshot/1.0',
+    'provider': 'riverbed',
+    'name': 'snapshot',
+    'version': '1.0',
+    'resources': {
+        'item': {
+            'type': 'object',
+            'properties': {
+                'id': {'type': 'number'},
+                'name': {'type': 'string'},
+            },
+            'links': {
+                'self': {'path': '$/items/{id}'},
+                'get': {
+                    'method': 'GET',
+                    'response': {'$ref': '#/resources/item'},
+                },
+            },
+        },
+    },
+}
+
+SERVICE_ID = SERVICE_DICT['id']
+
+
+class Server(object):
+    """ Serves items with ETags, answering 304 when they match. """
+
+    def __init__(self, m):
+        self.items = {}
+        for id in (1, 2, 3):
+            self.set(id, 'item %d' % id)
+        m.get(requests_mock.ANY, json=self.get)
+
+    def set(self, id, name):
+        self.items[id] = ({'id': id, 'name': name}, '"%d-%s"' % (id, name))
+
+    def get(self, request, context):
+        data, etag = self.items[int(request.path.rsplit('/', 1)[1])]
+        context.headers['ETag'] = etag
+        if request.headers.get('If-None-Match') == etag:
+            context.status_code = 304
+            return None
+        return data
+
+
+def service_manager():
+    svcdef = reschema.ServiceDef()
+    svcdef.parse(SERVICE_DICT)
+    servicedef_manager = ServiceDefManager()
+    servicedef_manager.add(svcdef)
+    connection_manager = ConnectionManager()
+    connection_manager.add(ANY_URI, None, Connection(ANY_URI))
+    return ServiceManager(servicedef_manager, connection_manager)
+
+
+def statuses(m):
+    return [(r.path.rsplit('/', 1)[1], 'If-None-Match' in r.headers)
+            for r in m.request_history]
+
+
+@pytest.fixture
+def revalidate():
+    with mock.patch.object(datarep, 'REVALIDATE', True):
+        yield
+
+
+def test_revalidate(revalidate):
+    service = service_manager().find_by_id(ANY_URI, SERVICE_ID)
+    item = service.bind('item', id=1)
+    with requests_mock.mock() as m:
+        server = Server(m)
+        data = item.data
+        assert item.pull().data is data
+        assert item._validator == ('"1-item 1"', data)
+
+        server.set(1, 'changed')
+        assert item.pull().data == {'id': 1, 'name': 'changed'}
+        assert item._validator[0] == '"1-changed"'
+
+        # Changes drop the ETag
+        item['name'].data = 'local'
+        item.pull()
+        item.data = {'id': 1, 'name': 'local'}
+        item.pull()
+        assert statuses(m) == [('1', False), ('1', True), ('1', True),
+                               ('1', False), ('1', False)]
+
+
+def test_revalidate_shared_connection(revalidate):
+    manager = service_manager()
+    connection = manager.connection_manager.find(ANY_URI, None)
+    service = manager.find_by_id(ANY_URI, SERVICE_ID)
+    item = service.bind('item', id=1)
+    other = service.bind('item', id=2)
+    send = connection.prepared_json_request
+
+    def interleaved(method, url, *args, **kwargs):
+        # Another thread's request completes on the shared connection
+        # before this one's result is read
+        result = send(method, url, *args, **kwargs)
+        if url.endswith('/1'):
+            thread = threading.Thread(target=other.pull)
+            thread.start()
+            thread.join()
+        return result
+
+    with requests_mock.mock() as m, \
+            mock.patch.object(connection, 'prepared_json_request',
+                              interleaved):
+        Server(m)
+        data = item.data
+        assert item.pull().data is data
+        assert item._validator == ('"1-item 1"', data)
+        assert other._validator[0] == '"2-item 2"'
+
+
+def test_no_revalidate():
+    service = service_manager().find_by_id(ANY_URI, SERVICE_ID)
+    item = service.bind('item', id=1)
+    with requests_mock.mock() as m:
+        Server(m)
+        item.pull()
+        assert item._validator is not None
+        item.pull()
+        assert statuses(m) == [('1', False), ('1', False)]
+
+
+def test_snapshot_restore(tmp_path):
+    path = str(tmp_path / 'snapshot')
+    manager = service_manager()
+    service = manager.find_by_id(ANY_URI, SERVICE_ID)
+    items = [service.bind('item', id=i) for i in (1, 2, 3)]
+    with requests_mock.mock() as m:
+        server = Server(m)
+        for item in items[:2]:
+            item.pull()
+        # Not pulled, or changed since, so not in the snapshot
+        items[1].data['name'] = 'changed'
+        items[1]['name'].data = 'changed'
+        assert manager.snapshot(path) == 1
+
+        items[1].pull()
+        assert manager.snapshot(path) == 2
+
+    manager = service_manager()
+    restored = manager.restore(path)
+    assert sorted(r.path_vars['id'] for r in restored) == [1, 2]
+    # Restored entries not pulled yet are written to new snapshots
+    assert manager.snapshot(path) == 2
+    restored = manager.restore(path)
+    service = manager.find_by_id(ANY_URI, SERVICE_ID)
+    with requests_mock.mock() as m:
+        server = Server(m)
+        server.set(2, 'changed')
+        first = [r for r in restored if r.path_vars['id'] == 1][0]
+        # Data from the snapshot is decoded when first accessed
+        first.pull()
+        assert isinstance(first._data, LazyJson)
+        assert first.data == {'id': 1, 'name': 'item 1'}
+
+        # The restored ETag is used by any DataRep for the URI, once
+        second = service.bind('item', id=2)
+        assert second.data == {'id': 2, 'name': 'changed'}
+        assert [r for r in restored if r.path_vars['id'] == 2][0].data == \
+            {'id': 2, 'name': 'changed'}
+        assert statuses(m) == [('1', True), ('2', True), ('2', False)]
+
+        assert manager.snapshot(path) == 2
+
+
+def test_restore_invalid(tmp_path):
+    path = tmp_path / 'snapshot'
+    path.write_bytes(b'not a snapshot')
+    with pytest.raises(SnapshotError):
+        service_manager().restore(str(path))
+    path.write_bytes(b'SWSNAP\x01\nxyz')
+    with pytest.raises(SnapshotError):
+        service_manager().restore(str(path))
@@ -0,0 +1,157 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import json
+
+import mock
+import pytest
+import requests_mock
+
+from sleepwalker import datarep, spill
+from sleepwalker.frozen import FrozenDict, FrozenList
+from sleepwalker.lazyjson import LazyJson
+from sleepwalker.spill import SpilledJson
+from test.service_loader import service_from_dict
+from test.test_datarep import ANY_URI
+
+DOCUMENT = {
+    'name': 'a "quoted" é report',
+    'rows': [{'id': i, 'name': 'row %d ü' % i, 'tags': ['t'] * (i % 3)}
+             for i in range(50)],
+    'empty': [],
+    'nested': {'deep': {'value': None}},
+}
+
+SERVICE_DICT = {
+    '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+    'id': 'http://support.riverbed.com/apis/spill/1.0',
+    'provider': 'riverbed',
+    'name': 'spill',
+    'version': '1.0',
+    'resources': {
+        'report': {
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string'},
+                'rows': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'id': {'type': 'number'},
+                            'name': {'type': 'string'},
+                            'tags': {'type': 'array',
+                                     'items': {'type': 'string'}},
+                        },
+                    },
+                },
+            },
+            'links': {
+                'self': {'path': '$/reports/{id}'},
+                'get': {
+                    'method': 'GET',
+                    'response': {'$ref': '#/resources/report'},
+                },
+            },
+        },
+    },
+}
+
+SVC_PATH = ANY_URI + '/api/spill/1.0/reports/1'
+
+
+def spilled(document, chunk=7):
+    """ Return `document` spilled to disk, read in chunks of `chunk`. """
+    content = json.dumps(document, indent=1, ensure_ascii=False)
+    content = content.encode('utf-8')
+    chunks = [content[i:i + chunk] for i in range(0, len(content), chunk)]
+    return spill.spill(chunks, 0)
+
+
+@pytest.fixture(params=[1 << 20, 16])
+def window(request):
+    # A small window forces members to be read across several windows
+    with mock.patch.object(spill, 'WINDOW_SIZE', request.param):
+        yield
+
+
+@pytest.fixture
+def service():
+    with mock.patch.object(datarep, 'DECODE_LAZY', True):
+        yield service_from_dict(SERVICE_DICT, ANY_URI, spill_threshold=100)
+
+
+def test_spill():
+    assert spill.spill([], 10) is None
+    small = spill.spill([b'[1, ', b'2]'], 10)
+    assert type(small) is LazyJson and small.decode() == [1, 2]
+    large = spill.spill([b'[1, ', b'2]'], 5)
+    assert type(large) is SpilledJson and large.decode() == [1, 2]
+    large.close()
+
+
+def test_decode_pointer(window):
+    doc = spilled(DOCUMENT)
+    assert doc.decode_pointer(['rows', '42', 'name']) == 'row 42 ü'
+    assert doc.decode_pointer(['name']) == DOCUMENT['name']
+    assert doc.decode_pointer(['nested', 'deep', 'value']) is None
+
+    row = doc.decode_pointer(['rows', '7'])
+    assert row == DOCUMENT['rows'][7]
+    assert type(row) is FrozenDict and type(row['tags']) is FrozenList
+
+    assert doc.length(['rows']) == 50
+    assert doc.length(['empty']) == 0
+    assert doc.has_pointer(['rows', '49', 'tags'])
+    for parts in (['rows', '50'], ['rows', '-1'], ['rows', 'x'],
+                  ['nosuch'], ['name', 'x'], ['empty', '0']):
+        assert not doc.has_pointer(parts)
+        with pytest.raises(LookupError):
+            doc.decode_pointer(parts)
+    with pytest.raises(LookupError):
+        doc.length(['name'])
+
+    assert not doc.exhausted()
+    assert doc.decode() == DOCUMENT
+
+
+def test_invalid(window):
+    doc = spill.spill([b'{"a": [1, 2 3], "b": 1}'], 0)
+    with pytest.raises(ValueError):
+        doc.has_pointer(['b'])
+    with pytest.raises(ValueError):
+        doc.decode()
+
+
+def test_pull(service):
+    report = service.bind('report', id=1)
+    with requests_mock.mock() as m:
+        m.get(SVC_PATH, json=DOCUMENT)
+        report.pull()
+        assert isinstance(report._data, SpilledJson)
+
+        rows = report['rows']
+        assert len(rows) == 50
+        assert rows[-1]['name'].data == 'row 49 ü'
+        assert rows[3].data == DOCUMENT['rows'][3]
+        assert [row['id'].data for row in rows[10:13]] == [10, 11, 12]
+        assert sum(1 for _ in rows) == 50
+        assert isinstance(report._data, SpilledJson)
+
+        # Changes decode the whole document
+        rows[3]['name'].data = 'changed'
+        assert type(report._data) is dict
+        assert report.data['rows'][3]['name'] == 'changed'
+        assert m.call_count == 1
+
+
+def test_pull_small(service):
+    report = service.bind('report', id=1)
+    with requests_mock.mock() as m:
+        m.get(SVC_PATH, json={'name': 'small'})
+        report.pull()
+        assert type(report._data) is LazyJson
+        assert report.data == {'name': 'small'}
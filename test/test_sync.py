@@ -0,0 +1,220 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import threading
+
+import mock
+import pytest
+import requests_mock
+
+from sleepwalker.exceptions import LinkError, FragmentError
+from sleepwalker.sync import TokenDelta, ModifiedSinceDelta
+from test.service_loader import service_from_dict
+from test.test_datarep import ANY_URI
+
+ITEM = {
+    'type': 'object',
+    'properties': {
+        'id': {'type': 'number'},
+        'name': {'type': 'string'},
+        'deleted': {'type': 'boolean'},
+        'tags': {'type': 'array', 'items': {'type': 'string'}},
+    },
+}
+
+SERVICE_DICT = {
+    '$schema': 'http://support.riverbed.com/apis/service_def/2.2',
+    'id': 'http://support.riverbed.com/apis/sync/1.0',
+    'provider': 'riverbed',
+    'name': 'sync',
+    'version': '1.0',
+    'resources': {
+        'items': {
+            'type': 'array',
+            'items': ITEM,
+            'links': {
+                'self': {'path': '$/items'},
+                'get': {
+                    'method': 'GET',
+                    'response': {'$ref': '#/resources/items'},
+                },
+                'changes': {
+                    'method': 'GET',
+                    'path': '$/changes{?since}',
+                    'response': {
+                        'type': 'object',
+                        'properties': {
+                            'items': {'type': 'array', 'items': ITEM},
+                            'deleted': {'type': 'array',
+                                        'items': {'type': 'number'}},
+                            'token': {'type': 'string'},
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+ITEMS_URI = ANY_URI + '/api/sync/1.0/items'
+CHANGES_URI = ANY_URI + '/api/sync/1.0/changes'
+
+
+class Server(object):
+    """ Items with the version at which each last changed. """
+
+    def __init__(self, count):
+        self.version = 1
+        self.items = dict((i, ({'id': i, 'name': 'item %d' % i}, 1))
+                          for i in range(count))
+        self.deleted = {}
+
+    def change(self, id, name):
+        self.version += 1
+        self.items[id] = ({'id': id, 'name': name}, self.version)
+
+    def delete(self, id):
+        self.version += 1
+        del self.items[id]
+        self.deleted[id] = self.version
+
+    def since(self, version):
+        return [item for item, v in self.items.values() if v > version]
+
+    def changes(self, request, context):
+        since = int(request.qs.get('since', ['0'])[0])
+        return {'items': self.since(since),
+                'deleted': [id for id, v in self.deleted.items()
+                            if v > since and since],
+                'token': str(self.version)}
+
+    def modified(self, request, context):
+        since = int(request.headers.get('If-Modified-Since', 0))
+        context.headers['Last-Modified'] = str(self.version)
+        if since >= self.version:
+            context.status_code = 304
+            return None
+        tombstones = [{'id': id, 'deleted': True}
+                      for id, v in self.deleted.items() if v > since and since]
+        return self.since(since) + tombstones
+
+
+@pytest.fixture
+def service():
+    return service_from_dict(SERVICE_DICT, ANY_URI)
+
+
+def names(items):
+    return [(item['id'], item['name']) for item in items.data]
+
+
+def test_token(service):
+    server = Server(5)
+    service.add_delta('items', 'changes', TokenDelta())
+    items = service.bind('items')
+    with requests_mock.mock() as m:
+        m.get(CHANGES_URI, json=server.changes)
+        items.sync('changes')
+        assert len(items) == 5 and 'since' not in m.last_request.qs
+
+        by_id = items.build_index('id')
+        item = by_id[3]
+        other = by_id[1]
+        server.change(3, 'three')
+        server.change(7, 'seven')
+        items.sync('changes')
+        assert m.last_request.qs['since'] == ['1']
+        assert item.data == {'id': 3, 'name': 'three'}
+        assert by_id[7].fragment == '/5' and other.fragment == '/1'
+        assert items.data[5] == {'id': 7, 'name': 'seven'}
+
+        server.delete(1)
+        server.change(4, 'four')
+        items.sync('changes')
+        assert m.last_request.qs['since'] == ['3']
+        assert names(items) == [(0, 'item 0'), (2, 'item 2'), (3, 'three'),
+                                (4, 'four'), (7, 'seven')]
+        assert 1 not in by_id and by_id[7].fragment == '/4'
+
+        # An item deleted and changed again since is moved to the end
+        server.delete(2)
+        server.change(2, 'two')
+        items.sync('changes')
+        assert names(items)[1:] == [(3, 'three'), (4, 'four'), (7, 'seven'),
+                                    (2, 'two')]
+
+        # Unset data is synced in full again
+        items._data = items.UNSET
+        items.sync('changes')
+        assert 'since' not in m.last_request.qs and len(items) == 5
+        assert items._sync_token == '7'
+
+
+def test_modified_since(service):
+    server = Server(3)
+    items = service.bind('items', _readonly=True)
+    delta = ModifiedSinceDelta()
+    with requests_mock.mock() as m:
+        m.get(ITEMS_URI, json=server.modified)
+        items.sync(delta=delta)
+        assert 'If-Modified-Since' not in m.last_request.headers
+        assert len(items) == 3
+
+        items.sync(delta=delta)
+        assert m.last_request.headers['If-Modified-Since'] == '1'
+        assert len(items) == 3
+
+        server.change(0, 'zero')
+        server.delete(2)
+        server.change(5, 'five')
+        items.sync(delta=delta)
+        assert names(items) == [(0, 'zero'), (1, 'item 1'), (5, 'five')]
+        assert items.build_index('id')[5].fragment == '/2'
+        assert m.last_request.headers['If-Modified-Since'] == '1'
+
+        items.sync(delta=delta)
+        assert m.last_request.headers['If-Modified-Since'] == '4'
+
+
+def test_modified_since_shared_connection(service):
+    server = Server(3)
+    items = service.bind('items', _readonly=True)
+    connection = service.connection
+    send = connection.json_request
+
+    def interleaved(method, uri, *args, **kwargs):
+        # Another thread's request completes on the shared connection
+        # before this one's result is read
+        result = send(method, uri, *args, **kwargs)
+        if uri.endswith('/items'):
+            thread = threading.Thread(target=send, args=('GET', '/other'))
+            thread.start()
+            thread.join()
+        return result
+
+    with requests_mock.mock() as m, \
+            mock.patch.object(connection, 'json_request', interleaved):
+        m.get(ITEMS_URI, json=server.modified)
+        m.get(ANY_URI + '/other', json={}, headers={'Last-Modified': '99'})
+        items.sync(delta=ModifiedSinceDelta())
+        items.sync(delta=ModifiedSinceDelta())
+        assert m.last_request.path == '/other'
+        assert items._sync_token == '1'
+
+
+def test_errors(service):
+    items = service.bind('items')
+    with pytest.raises(LinkError):
+        items.sync()
+    with pytest.raises(LinkError):
+        items.sync('nosuch', delta=TokenDelta())
+    with pytest.raises(LinkError):
+        service.add_delta('items', 'nosuch', TokenDelta())
+    with pytest.raises(LinkError):
+        items.sync(delta=TokenDelta())
+    items._data = [{'id': 0, 'tags': []}]
+    with pytest.raises(FragmentError):
+        items[0]['tags'].sync(delta=ModifiedSinceDelta())
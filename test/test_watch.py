@@ -0,0 +1,152 @@
+# Copyright (c) 2019 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import time
+import threading
+
+import mock
+import requests_mock
+
+from sleepwalker.watch import diff, Watcher
+from test.test_snapshot import Server, service_manager, SERVICE_ID
+from test.test_datarep import ANY_URI
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_diff():
+    old = {'a': 1, 'b': {'c': [1, 2, 3], 'd': 'x'}, 'e/f': True, 'g': None}
+    assert diff(old, old) == []
+    assert diff(old, dict(old)) == []
+    new = {'a': 1, 'b': {'c': [1, 5], 'd': 'x', 'h': 0}, 'e/f': 1, 'i': 2}
+    assert diff(old, new) == ['/b/c/1', '/b/c/2', '/b/h', '/e~1f',
+                              '/g', '/i']
+    assert diff(old, new, '/items/0') == \
+        ['/items/0' + p for p in diff(old, new)]
+    assert diff({'a': {'b': 1}}, {'a': [1]}) == ['/a']
+    assert diff([1, 2], [1, 2, 3]) == ['/2']
+    assert diff(1, 1.5) == ['']
+
+
+def test_watch():
+    clock = Clock()
+    watcher = Watcher(clock=clock)
+    service = service_manager().find_by_id(ANY_URI, SERVICE_ID)
+    item = service.bind('item', id=1)
+    calls = []
+
+    def callback(dr, pointers):
+        calls.append((dr, pointers))
+
+    with requests_mock.mock() as m:
+        server = Server(m)
+        name = service.bind('item', id=2)['name']
+        first = item.watch(callback, interval=10, watcher=watcher)
+        second = name.watch(callback, interval=10, watcher=watcher)
+
+        # The first pull of unset data is due right away, and only
+        # sets the baseline
+        assert watcher.run_pending() == 1
+        assert calls == [] and m.call_count == 2
+        assert watcher.run_pending() == 0
+
+        server.set(1, 'changed')
+        server.set(2, 'changed')
+        clock.now = 10
+        assert watcher.run_pending() == 2
+        assert sorted(calls, key=lambda call: call[0].uri) == \
+            [(item, ['/name']), (name, ['/name'])]
+        assert first.interval == second.interval == 5
+
+        # Unchanged resources back off up to max_interval
+        for now in (15, 25, 45, 85, 165):
+            clock.now = now
+            assert watcher.run_pending() == 2
+        assert first.interval == 80 and first.pulls == 7
+        clock.now = 244
+        assert watcher.run_pending() == 0
+
+        second.cancel()
+        server.set(1, 'again')
+        clock.now = 245
+        assert watcher.run_pending() == 1
+        assert calls[-1] == (item, ['/name'])
+        assert first.interval == 40
+
+
+def test_watch_errors():
+    clock = Clock()
+    watcher = Watcher(clock=clock)
+    service = service_manager().find_by_id(ANY_URI, SERVICE_ID)
+    item = service.bind('item', id=4)
+    with requests_mock.mock() as m:
+        m.get(requests_mock.ANY, status_code=500, json={})
+        watch = watcher.watch(item, None, interval=10)
+        assert watcher.run_pending() == 1
+        assert watch.interval == 20
+        clock.now = 20
+        assert watcher.run_pending() == 1
+
+
+def test_watcher_thread():
+    service = service_manager().find_by_id(ANY_URI, SERVICE_ID)
+    items = [service.bind('item', id=i) for i in (1, 2, 3)]
+    changed = threading.Event()
+
+    def callback(dr, pointers):
+        if dr is items[2]:
+            changed.set()
+
+    with requests_mock.mock() as m:
+        server = Server(m)
+        with Watcher(max_workers=2) as watcher:
+            for item in items:
+                item.pull()
+                watcher.watch(item, callback, interval=0.01)
+            server.set(3, 'changed')
+            assert changed.wait(5)
+
+
+def test_watcher_connection():
+    manager = service_manager()
+    connection = manager.connection_manager.find(ANY_URI, None)
+    service = manager.find_by_id(ANY_URI, SERVICE_ID)
+    items = [service.bind('item', id=i) for i in (1, 2, 3)]
+    send = connection.prepared_json_request
+    lock = threading.Lock()
+    active = []
+    overlapped = []
+    pulled = threading.Semaphore(0)
+
+    def request(*args, **kwargs):
+        with lock:
+            active.append(args)
+            overlapped.append(len(active) > 1)
+        time.sleep(0.01)
+        with lock:
+            active.remove(args)
+        try:
+            return send(*args, **kwargs)
+        finally:
+            pulled.release()
+
+    with requests_mock.mock() as m, \
+            mock.patch.object(connection, 'prepared_json_request', request):
+        Server(m)
+
+        # The services share a connection, so pulls are not concurrent
+        with Watcher(max_workers=3) as watcher:
+            for item in items:
+                watcher.watch(item, None, interval=0.01)
+            for i in range(6):
+                assert pulled.acquire(timeout=5)
+        assert not any(overlapped)